@@ -0,0 +1,210 @@
+"""
+Benchmark: Chroma collections vs. the in-process NumPy flat backend.
+
+For each collection in vector_db the embeddings are exported into flat
+indexes (see scripts/flat_index.py) in every storage variant, then the
+questions from queries.json are run against Chroma and each variant:
+
+- query latency p50/p95 (vector search only, query embedding excluded),
+- recall@k against exact float32 brute force (Chroma's HNSW is approximate too),
+- index size on disk, and in a fresh subprocess per backend the time to
+  open the collection and answer a first query plus the resident memory.
+
+    python backend_bench.py
+    python backend_bench.py --k 10 --json > backends.json
+
+End-to-end recall against the relevance labels for the flat backend:
+FITGENIE_VECTOR_BACKEND=flat python run_benchmarks.py --reuse-db
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "test"))
+
+import app
+from embedding import DEFAULT_MODEL, encode_query
+from flat_index import export_collection, load_flat_index
+from run_benchmarks import percentiles
+
+
+# --- Configuration ---
+QUERIES_FILE = Path(__file__).parent / "queries.json"
+COLLECTIONS = {"fitness": app.FITNESS_COLLECTION, "nutrition": app.NUTRITION_COLLECTION}
+
+# Variant name -> (dtype, keep float32 copy for reranking)
+VARIANTS = {
+    "flat-float16": ("float16", False),
+    "flat-int8": ("int8", False),
+    "flat-int8+rerank": ("int8", True),
+}
+
+
+def directory_size(path):
+    return sum(file.stat().st_size for file in Path(path).rglob("*") if file.is_file())
+
+
+def resident_mb():
+    """Resident set size of this process in MB (Linux), else peak RSS."""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure_open(backend, db_path, collection_name, flat_path, dim):
+    """Child process: open one backend from cold and answer one query."""
+    before = resident_mb()
+    start = time.perf_counter()
+    if backend == "chroma":
+        import chromadb
+        collection = chromadb.PersistentClient(path=db_path).get_collection(name=collection_name)
+    else:
+        collection = load_flat_index(flat_path)
+    opened = time.perf_counter()
+
+    query = np.random.default_rng(0).standard_normal(dim).astype(np.float32)
+    collection.query(query_embeddings=[(query / np.linalg.norm(query)).tolist()], n_results=5)
+    done = time.perf_counter()
+
+    print(json.dumps({
+        "open_ms": round((opened - start) * 1000, 1),
+        "first_query_ms": round((done - opened) * 1000, 2),
+        "rss_mb": round(resident_mb() - before, 1),
+    }))
+
+
+def cold_start(backend, db_path, collection_name, flat_path, dim):
+    output = subprocess.run(
+        [sys.executable, __file__, "--measure-open", backend, "--db", db_path,
+         "--collection", collection_name, "--flat-path", str(flat_path or ""), "--dim", str(dim)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def time_queries(collection, embeddings, k, repeat):
+    seconds, results = [], []
+    for embedding in embeddings:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = collection.query(query_embeddings=[embedding], n_results=k)
+            seconds.append(time.perf_counter() - start)
+        results.append(result["ids"][0])
+    return seconds, results
+
+
+def recall(results, exact_scores, positions, k):
+    """
+    Share of the returned ids that belong to the exact top k. Ties count:
+    an id scoring as high as the exact k-th best is as good as any other.
+    """
+    shares = []
+    for found, scores in zip(results, exact_scores):
+        kth_best = np.partition(scores, -k)[-k] - 1e-6
+        shares.append(sum(scores[positions[doc_id]] >= kth_best for doc_id in found) / k)
+    return statistics.mean(shares)
+
+
+def run(args):
+    client = app.get_chroma_client()
+    queries = json.loads(QUERIES_FILE.read_text())
+    summary = {"k": args.k, "collections": {}}
+
+    with tempfile.TemporaryDirectory(prefix="fitgenie-flat-") as tmp_dir:
+        for label, name in COLLECTIONS.items():
+            try:
+                collection = client.get_collection(name=name)
+            except Exception as e:
+                print(f"⚠️  Skipping {label}: {e}")
+                continue
+
+            model_name = (collection.metadata or {}).get("embedding_model", DEFAULT_MODEL)
+            embeddings = [encode_query(query["query"], model_name=model_name).tolist() for query in queries]
+
+            exported = {}
+            for variant, (dtype, keep_float32) in VARIANTS.items():
+                exported[variant] = export_collection(
+                    collection, Path(tmp_dir) / label / variant, dtype=dtype, keep_float32=keep_float32
+                )
+
+            # Ground truth: exact float32 scores over every stored vector
+            exact = load_flat_index(exported["flat-int8+rerank"])
+            full = np.asarray(exact.full)
+            exact_scores = [full @ np.asarray(embedding, dtype=np.float32) for embedding in embeddings]
+            positions = {doc_id: i for i, doc_id in enumerate(exact.ids)}
+            dim = full.shape[1]
+
+            backends = {"chroma": collection}
+            backends.update({variant: load_flat_index(path) for variant, path in exported.items()})
+
+            rows = {}
+            for backend, handle in backends.items():
+                seconds, results = time_queries(handle, embeddings, args.k, args.repeat)
+                rows[backend] = {
+                    "latency_ms": percentiles(seconds, digits=3),
+                    "recall_at_k": round(recall(results, exact_scores, positions, args.k), 4),
+                    "disk_mb": round(directory_size(exported[backend]) / 2**20, 2) if backend in exported else None,
+                    **cold_start(backend, app.DB_PATH, name, exported.get(backend), dim),
+                }
+            summary["collections"][label] = {"documents": collection.count(), "backends": rows}
+
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare Chroma with the NumPy flat backend")
+    parser.add_argument("--db", default=app.DB_PATH, help="Vector database to read (default: RAG_MODEL/vector_db)")
+    parser.add_argument("--k", type=int, default=5, help="Results per query (default: 5)")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query (default: 20)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON only")
+    # Internal: cold-start measurement in a fresh interpreter
+    parser.add_argument("--measure-open", choices=["chroma", *VARIANTS], help=argparse.SUPPRESS)
+    parser.add_argument("--collection", help=argparse.SUPPRESS)
+    parser.add_argument("--flat-path", help=argparse.SUPPRESS)
+    parser.add_argument("--dim", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.measure_open:
+        measure_open(args.measure_open, args.db, args.collection, args.flat_path, args.dim)
+        return
+
+    app.DB_PATH = args.db
+    summary = run(args)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print("=" * 96)
+    print(f"{'Backend':18} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(args.k):>9} {'disk MB':>8} "
+          f"{'open ms':>8} {'1st q ms':>9} {'RSS MB':>7}")
+    for label, result in summary["collections"].items():
+        print("-" * 96)
+        print(f"{label} ({result['documents']} documents)")
+        for backend, row in result["backends"].items():
+            disk = f"{row['disk_mb']:.2f}" if row["disk_mb"] is not None else "-"
+            print(f"  {backend:16} {row['latency_ms']['p50']:>8.3f} {row['latency_ms']['p95']:>8.3f} "
+                  f"{row['recall_at_k']:>9.3f} {disk:>8} {row['open_ms']:>8.1f} "
+                  f"{row['first_query_ms']:>9.2f} {row['rss_mb']:>7.1f}")
+    print("=" * 96)
+
+
+if __name__ == "__main__":
+    main()
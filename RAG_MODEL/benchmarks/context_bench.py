@@ -0,0 +1,134 @@
+"""
+Benchmark: token-budgeted context assembly vs. verbatim concatenation.
+
+For a fixed set of questions, retrieves once and builds the prompt both
+ways: the old one (all retrieved documents joined verbatim) and the one
+context_builder.py produces (trimmed, deduplicated, packed into a token
+budget). Reports prompt tokens saved and the generation latency delta.
+
+Generation runs against the offline stub LLM by default, whose latency is
+modelled as a fixed cost plus --prefill-ms per 1000 prompt tokens; pass
+--live to time the real Gemini model instead.
+
+    python context_bench.py
+    python context_bench.py --budget 800 --json > context.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "test"))
+
+import app
+from context_builder import SEPARATOR, build_context, estimate_tokens, interleave
+from stub_llm import StubGenerationModel
+
+
+# --- Configuration ---
+QUERIES = [
+    "exercises for chest",
+    "beginner leg workout",
+    "exercises with dumbbells",
+    "how do I do a barbell deadlift",
+    "best stretches for lower back",
+    "kettlebell exercises for shoulders",
+    "high protein foods",
+    "low calorie snacks",
+    "foods with fiber",
+    "what should I eat after a leg workout",
+]
+
+
+def time_generation(model, prompt, repeat):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.generate_content(prompt)
+        seconds.append(time.perf_counter() - start)
+    return statistics.median(seconds)
+
+
+def run(args):
+    if args.live:
+        fitness_collection, nutrition_collection, model = app.initialize_models()
+        if model is None:
+            raise SystemExit("❌ No Gemini model available; run without --live to use the stub LLM")
+    else:
+        fitness_collection, nutrition_collection = app.open_collections()
+        model = StubGenerationModel(latency=args.latency / 1000, prefill_per_1k_tokens=args.prefill_ms / 1000)
+
+    rows = []
+    for query in QUERIES:
+        fitness, nutrition = app.query_collections(query, [fitness_collection, nutrition_collection], k=args.k)
+        verbatim = SEPARATOR.join(fitness["documents"][0] + nutrition["documents"][0])
+        context, stats = build_context(
+            interleave(fitness["documents"][0], nutrition["documents"][0]), token_budget=args.budget
+        )
+
+        before, after = app.build_prompt(query, verbatim), app.build_prompt(query, context)
+        rows.append({
+            "query": query,
+            "docs_before": stats.retrieved,
+            "docs_after": len(stats.kept),
+            "duplicates": stats.duplicates,
+            "empty": stats.empty,
+            "prompt_tokens_before": estimate_tokens(before),
+            "prompt_tokens_after": estimate_tokens(after),
+            "generation_ms_before": time_generation(model, before, args.repeat) * 1000,
+            "generation_ms_after": time_generation(model, after, args.repeat) * 1000,
+        })
+
+    totals = {
+        key: sum(row[key] for row in rows)
+        for key in ("prompt_tokens_before", "prompt_tokens_after", "duplicates")
+    }
+    totals["prompt_tokens_saved_pct"] = 100 * (1 - totals["prompt_tokens_after"] / max(totals["prompt_tokens_before"], 1))
+    totals["generation_ms_delta_median"] = statistics.median(
+        row["generation_ms_after"] - row["generation_ms_before"] for row in rows
+    )
+    return {
+        "k": args.k, "budget": args.budget,
+        "llm": "gemini" if args.live else f"stub ({args.latency:g} ms + {args.prefill_ms:g} ms/1k tokens)",
+        "queries": rows, "totals": totals,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark token-budgeted context assembly")
+    parser.add_argument("--k", type=int, default=5, help="Results per collection (default: 5)")
+    parser.add_argument("--budget", type=int, default=app.CONTEXT_TOKEN_BUDGET, help="Context token budget")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed generations per prompt (default: 3)")
+    parser.add_argument("--latency", type=float, default=50, help="Stub LLM fixed latency in ms (default: 50)")
+    parser.add_argument("--prefill-ms", type=float, default=150, help="Stub LLM ms per 1000 prompt tokens (default: 150)")
+    parser.add_argument("--live", action="store_true", help="Time the real Gemini model instead of the stub")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON only")
+    args = parser.parse_args()
+
+    summary = run(args)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print("=" * 84)
+    print(f"{'Query':38} {'docs':>7} {'tokens':>13} {'gen ms':>15}")
+    print("-" * 84)
+    for row in summary["queries"]:
+        print(f"{row['query'][:38]:38} {row['docs_before']:>3}→{row['docs_after']:<3} "
+              f"{row['prompt_tokens_before']:>6}→{row['prompt_tokens_after']:<6} "
+              f"{row['generation_ms_before']:>7.0f}→{row['generation_ms_after']:<7.0f}")
+    print("-" * 84)
+    totals = summary["totals"]
+    print(f"Prompt tokens: {totals['prompt_tokens_before']} → {totals['prompt_tokens_after']} "
+          f"({totals['prompt_tokens_saved_pct']:.0f}% saved, {totals['duplicates']} near-duplicates dropped)")
+    print(f"Generation latency delta (median, {summary['llm']}): {totals['generation_ms_delta_median']:+.0f} ms")
+    print("=" * 84)
+
+
+if __name__ == "__main__":
+    main()
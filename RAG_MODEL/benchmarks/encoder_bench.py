@@ -0,0 +1,148 @@
+"""
+Benchmark: one encoder call per question vs. the micro-batching QueryEncoder
+(see scripts/query_encoder.py).
+
+--concurrency threads each encode their share of --requests distinct
+questions (the queries.json questions with a numbered suffix, so nothing is
+served from the embedding cache, which is disabled anyway):
+
+- direct: every question is its own encode() call, as embed_query did before;
+- batched: questions go through a QueryEncoder with --max-wait-ms and
+  --max-batch, once per --backends entry ("torch", "onnx", "onnx-int8").
+
+Reported per concurrency level: encodes/sec, latency percentiles per
+question, the mean batch size and the mean/max time a question waited in
+the queue before its batch started.
+
+    python encoder_bench.py
+    python encoder_bench.py --concurrency 1,8,32 --backends torch,onnx-int8 --json
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import metrics
+from embedding import DEFAULT_MODEL, load_encoder
+from query_encoder import DEFAULT_MAX_BATCH, DEFAULT_MAX_WAIT_MS, QueryEncoder
+from run_benchmarks import percentiles
+
+
+# --- Configuration ---
+QUERIES_FILE = Path(__file__).parent / "queries.json"
+
+
+def questions(path, count):
+    """count distinct question texts built from the labelled queries."""
+    base = [query["query"] for query in json.loads(Path(path).read_text(encoding="utf-8"))]
+    return [f"{base[i % len(base)]} #{i}" for i in range(count)]
+
+
+def measure(encode, texts, concurrency):
+    """Encode texts from `concurrency` threads: (wall seconds, per-question seconds)."""
+    def timed(text):
+        start = time.perf_counter()
+        encode(text)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, texts))
+    return time.perf_counter() - start, latencies
+
+
+def run(args):
+    texts = questions(args.queries, args.requests)
+    model = load_encoder(args.model)
+    direct = lambda text: model.encode([text], convert_to_numpy=True, normalize_embeddings=True,
+                                       show_progress_bar=False)[0]
+    direct(texts[0])  # Model load and first-call setup are not per-question costs
+
+    summary = {
+        "model": args.model, "requests": args.requests, "max_batch": args.max_batch,
+        "max_wait_ms": args.max_wait_ms, "levels": {},
+    }
+    for concurrency in args.concurrency:
+        rows = {}
+        seconds, latencies = measure(direct, texts, concurrency)
+        rows["direct"] = {"encodes_per_sec": round(len(texts) / seconds, 1), "latency_ms": percentiles(latencies)}
+
+        for backend in args.backends:
+            encoder = QueryEncoder(args.model, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+                                   backend=backend, cache=False)
+            encoder.warm_up()
+            seconds, latencies = measure(encoder.encode, texts, concurrency)
+            stats = encoder.stats()
+            encoder.close()
+            rows[f"batched/{backend}"] = {
+                "encodes_per_sec": round(len(texts) / seconds, 1), "latency_ms": percentiles(latencies),
+                "mean_batch": stats["mean_batch"], "mean_wait_ms": stats["mean_wait_ms"],
+                "max_wait_ms": stats["max_wait_ms"],
+            }
+        summary["levels"][concurrency] = rows
+
+    # Batched vectors must match the single-text ones (up to float rounding, for the same backend)
+    encoder = QueryEncoder(args.model, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, cache=False)
+    sample = texts[:args.max_batch]
+    with ThreadPoolExecutor(max_workers=len(sample)) as pool:
+        batched = list(pool.map(encoder.encode, sample))
+    encoder.close()
+    summary["max_abs_difference"] = float(max(np.abs(b - direct(t)).max() for t, b in zip(sample, batched)))
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Encoder throughput with and without query micro-batching")
+    parser.add_argument("--queries", default=str(QUERIES_FILE), help="Labelled queries (default: queries.json)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Embedding model (default: {DEFAULT_MODEL})")
+    parser.add_argument("--requests", type=int, default=512, help="Questions per run (default: 512)")
+    parser.add_argument("--concurrency", default="1,4,16,32",
+                        help="Comma-separated numbers of concurrent callers (default: 1,4,16,32)")
+    parser.add_argument("--backends", default="torch", help="Comma-separated QueryEncoder backends (default: torch)")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH,
+                        help=f"Largest batch (default: {DEFAULT_MAX_BATCH})")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help=f"Batching window in ms (default: {DEFAULT_MAX_WAIT_MS:g})")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON only")
+    args = parser.parse_args()
+    args.concurrency = [int(value) for value in args.concurrency.split(",")]
+    args.backends = args.backends.split(",")
+    return args
+
+
+def main():
+    args = parse_args()
+    metrics.QUIET = True
+    summary = run(args)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print("=" * 84)
+    print(f"🧠 {summary['requests']} questions with '{summary['model']}', "
+          f"batches of up to {summary['max_batch']}, {summary['max_wait_ms']:g} ms window")
+    for concurrency, rows in summary["levels"].items():
+        print("-" * 84)
+        print(f"{concurrency:>3} callers {'encodes/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'batch':>7} "
+              f"{'wait ms':>8} {'max wait':>9}")
+        for label, row in rows.items():
+            latency = row["latency_ms"]
+            batch, wait, max_wait = (f"{row[key]:.2f}" if key in row else "-"
+                                     for key in ("mean_batch", "mean_wait_ms", "max_wait_ms"))
+            print(f"  {label:17} {row['encodes_per_sec']:>10.1f} {latency['p50']:>8.2f} {latency['p95']:>8.2f} "
+                  f"{batch:>7} {wait:>8} {max_wait:>9}")
+    print("-" * 84)
+    print(f"🔬 Largest difference between batched and single-text vectors: {summary['max_abs_difference']:.2e}")
+    print("=" * 84)
+
+
+if __name__ == "__main__":
+    main()
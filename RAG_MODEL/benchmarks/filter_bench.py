@@ -0,0 +1,160 @@
+"""
+Benchmark: metadata pre-filtering from parsed query intent.
+
+Runs a fixed set of labelled questions against the persisted vector_db,
+once with a plain vector search and once pre-filtered by the facets
+query_intent.py finds in the question, and reports search latency and
+precision@k for both. A hit counts as relevant when its metadata satisfies
+the question's hand-written label (not the parser's output), so parser
+misses show up as lost precision.
+
+    python filter_bench.py --k 5 --repeat 20
+    python filter_bench.py --json > filters.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "test"))
+
+import app
+from query_intent import numeric_nutrients, parse_query_intent
+
+
+# --- Configuration ---
+LEGS = ["Quadriceps", "Hamstrings", "Glutes", "Calves", "Adductors", "Abductors"]
+
+# Labelled questions: the metadata a relevant hit must have
+LABELLED_QUERIES = [
+    {"query": "beginner leg workout with dumbbells", "collection": app.FITNESS_COLLECTION,
+     "expect": {"level": ["Beginner"], "body_part": LEGS, "equipment": ["Dumbbell"]}},
+    {"query": "chest exercises with a barbell", "collection": app.FITNESS_COLLECTION,
+     "expect": {"body_part": ["Chest"], "equipment": ["Barbell"]}},
+    {"query": "stretches for the lower back", "collection": app.FITNESS_COLLECTION,
+     "expect": {"body_part": ["Lower Back"], "type": ["Stretching"]}},
+    {"query": "bodyweight ab exercises for beginners", "collection": app.FITNESS_COLLECTION,
+     "expect": {"body_part": ["Abdominals"], "equipment": ["Body Only"], "level": ["Beginner"]}},
+    {"query": "kettlebell shoulder exercises", "collection": app.FITNESS_COLLECTION,
+     "expect": {"body_part": ["Shoulders"], "equipment": ["Kettlebells"]}},
+    {"query": "plyometric exercises for the quads", "collection": app.FITNESS_COLLECTION,
+     "expect": {"type": ["Plyometrics"], "body_part": ["Quadriceps"]}},
+    {"query": "cable tricep exercises", "collection": app.FITNESS_COLLECTION,
+     "expect": {"body_part": ["Triceps"], "equipment": ["Cable"]}},
+    {"query": "snacks under 200 kcal", "collection": app.NUTRITION_COLLECTION,
+     "expect_range": {"calories_kcal": ("<", 200)}},
+    {"query": "foods with at least 20 g of protein", "collection": app.NUTRITION_COLLECTION,
+     "expect_range": {"protein_g": (">=", 20)}},
+    {"query": "high protein foods under 150 calories", "collection": app.NUTRITION_COLLECTION,
+     "expect_range": {"calories_kcal": ("<", 150)}},
+    {"query": "breakfast with less than 5 g of sugar", "collection": app.NUTRITION_COLLECTION,
+     "expect_range": {"sugars_g": ("<", 5)}},
+]
+
+_COMPARE = {
+    "<": lambda a, b: a < b, "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b, ">=": lambda a, b: a >= b,
+}
+
+
+def is_relevant(metadata, label):
+    """Does a hit's metadata satisfy the question's label?"""
+    for field, values in label.get("expect", {}).items():
+        if metadata.get(field) not in values:
+            return False
+
+    if "expect_range" in label:
+        # Parse the display strings too, so collections ingested before the
+        # numeric fields existed are judged the same way
+        amounts = {**numeric_nutrients(metadata), **metadata}
+        for key, (op, bound) in label["expect_range"].items():
+            value = amounts.get(key)
+            if not isinstance(value, (int, float)) or not _COMPARE[op](value, bound):
+                return False
+    return True
+
+
+def time_search(collection, embedding, k, where, repeat):
+    """Run a search `repeat` times; return (last results, per-run seconds)."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = app.vector_search(collection, embedding, k=k, where=where)
+        seconds.append(time.perf_counter() - start)
+    return results, seconds
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def run(k, repeat):
+    client = app.get_chroma_client()
+    collections = {name: client.get_collection(name) for name in (app.FITNESS_COLLECTION, app.NUTRITION_COLLECTION)}
+    vocabularies = app.get_facet_vocabularies()
+
+    modes = {"unfiltered": {"seconds": [], "precision": []}, "filtered": {"seconds": [], "precision": []}}
+    per_query = []
+
+    for label in LABELLED_QUERIES:
+        collection = collections[label["collection"]]
+        embedding = app.embed_query(label["query"], [collection])[0]
+        intent = parse_query_intent(label["query"], vocabularies)
+        where = intent.categorical_where() if label["collection"] == app.FITNESS_COLLECTION else intent.range_where()
+
+        row = {"query": label["query"], "filters": intent.describe()}
+        for mode, mode_where in (("unfiltered", None), ("filtered", where)):
+            results, seconds = time_search(collection, embedding, k, mode_where, repeat)
+            hits = results["metadatas"][0]
+            precision = sum(is_relevant(meta, label) for meta in hits) / k
+
+            modes[mode]["seconds"].extend(seconds)
+            modes[mode]["precision"].append(precision)
+            row[mode] = {"precision": precision, "p50_ms": statistics.median(seconds) * 1000}
+        per_query.append(row)
+
+    summary = {"k": k, "repeat": repeat, "queries": per_query}
+    for mode, values in modes.items():
+        summary[mode] = {
+            f"precision@{k}": statistics.mean(values["precision"]),
+            "p50_ms": percentile(values["seconds"], 50) * 1000,
+            "p95_ms": percentile(values["seconds"], 95) * 1000,
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metadata pre-filtering from query intent")
+    parser.add_argument("--k", type=int, default=5, help="Results per search (default: 5)")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query and mode (default: 20)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON only")
+    args = parser.parse_args()
+
+    summary = run(args.k, args.repeat)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    k = args.k
+    print("=" * 78)
+    print(f"{'Query':40} {'P@k plain':>9} {'P@k filt':>9} {'ms plain':>9} {'ms filt':>8}")
+    print("-" * 78)
+    for row in summary["queries"]:
+        print(f"{row['query'][:40]:40} {row['unfiltered']['precision']:>9.2f} {row['filtered']['precision']:>9.2f} "
+              f"{row['unfiltered']['p50_ms']:>9.1f} {row['filtered']['p50_ms']:>8.1f}")
+    print("-" * 78)
+    for mode in ("unfiltered", "filtered"):
+        result = summary[mode]
+        print(f"{mode:>10}: precision@{k} {result[f'precision@{k}']:.2f}, "
+              f"search p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark: direct LLM calls vs. GenerationClient (deadlines, retries,
+hedging, circuit breaking; see scripts/generation_client.py).
+
+Runs against stub LLMs with injected slowness and failures, so the tail
+behaviour is reproducible and nothing talks to Gemini:
+
+- tail: primary and fallback model both occasionally slow (--slow-rate,
+  --slow-latency) and failing (--failure-rate);
+- outage: the primary fails every call; the fallback keeps the tail faults.
+
+For each scenario the same number of requests is sent with --concurrency
+threads straight to the primary and through the client, and the latency
+percentiles (successful answers), error rate, hedges, retries and circuit
+opens are reported. --stream measures time to first chunk instead.
+
+    python generation_bench.py
+    python generation_bench.py --requests 1000 --slow-rate 0.05 --json
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import metrics
+from generation_client import GenerationClient
+from run_benchmarks import percentiles
+from stub_llm import StubGenerationModel
+
+
+# --- Configuration ---
+PROMPT = """
+**User's Question:**
+exercises for chest
+
+**Verified Information from Databases:**
+Exercise Title: Barbell Bench Press
+---
+Exercise Title: Dumbbell Flyes
+
+**Your Answer (be concise, helpful, and encouraging):**
+"""
+
+
+def call(model, stream):
+    """One request: (seconds until the answer or first chunk, succeeded)."""
+    start = time.perf_counter()
+    try:
+        if stream:
+            chunks = iter(model.generate_content(PROMPT, stream=True))
+            next(chunks)
+            seconds = time.perf_counter() - start
+            for _ in chunks:
+                pass
+        else:
+            model.generate_content(PROMPT).text
+            seconds = time.perf_counter() - start
+        return seconds, True
+    except Exception:
+        return time.perf_counter() - start, False
+
+
+def measure(model, args):
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: call(model, args.stream), range(args.requests)))
+    ok = [seconds for seconds, succeeded in results if succeeded]
+    return {"latency_ms": percentiles(ok), "error_rate": round(1 - len(ok) / len(results), 4)}
+
+
+def stubs(args, primary_failure_rate):
+    def stub(name, seed, failure_rate):
+        return StubGenerationModel(
+            name, latency=args.latency / 1000, chunk_delay=0.0, slow_rate=args.slow_rate,
+            slow_latency=args.slow_latency / 1000, failure_rate=failure_rate, seed=seed
+        )
+    return stub("primary", 1, primary_failure_rate), stub("fallback", 2, args.failure_rate)
+
+
+def run(args):
+    scenarios = {"tail": args.failure_rate, "outage": 1.0}
+    summary = {"requests": args.requests, "concurrency": args.concurrency, "stream": args.stream, "scenarios": {}}
+
+    for scenario, primary_failure_rate in scenarios.items():
+        primary, _ = stubs(args, primary_failure_rate)
+        direct = measure(primary, args)
+
+        primary, fallback = stubs(args, primary_failure_rate)
+        client = GenerationClient(
+            [(primary.model_name, primary), (fallback.model_name, fallback)],
+            timeout=args.timeout / 1000, default_hedge_delay=args.latency * 4 / 1000, seed=0
+        )
+        resilient = measure(client, args)
+        resilient.update(client.stats(), primary_calls=primary.calls, fallback_calls=fallback.calls)
+        summary["scenarios"][scenario] = {"direct": direct, "client": resilient}
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tail latency of direct LLM calls vs. GenerationClient")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per run (default: 400)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight (default: 8)")
+    parser.add_argument("--latency", type=float, default=50, help="Normal stub latency in ms (default: 50)")
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="Share of slow calls (default: 0.03)")
+    parser.add_argument("--slow-latency", type=float, default=1000, help="Extra ms of a slow call (default: 1000)")
+    parser.add_argument("--failure-rate", type=float, default=0.02, help="Share of failing calls (default: 0.02)")
+    parser.add_argument("--timeout", type=float, default=2000, help="Client per-attempt deadline in ms (default: 2000)")
+    parser.add_argument("--stream", action="store_true", help="Measure time to first chunk of streamed answers")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON only")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    metrics.QUIET = True
+    summary = run(args)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print("=" * 78)
+    print(f"🛟 {args.requests} requests, {args.concurrency} concurrent, "
+          f"{'time to first chunk' if args.stream else 'full answers'}")
+    for scenario, rows in summary["scenarios"].items():
+        print("-" * 78)
+        print(f"{scenario:10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>8}  details")
+        for label, row in rows.items():
+            latency = row["latency_ms"]
+            details = ""
+            if label == "client":
+                opens = sum(circuit["opens"] for circuit in row["circuits"].values())
+                details = (f"{row['hedges']} hedges ({row['hedge_wins']} won), {row['retries']} retries, "
+                           f"{opens} circuit opens, primary/fallback calls {row['primary_calls']}/{row['fallback_calls']}")
+            p50, p95, p99 = (f"{latency[key]:.1f}" if key in latency else "-" for key in ("p50", "p95", "p99"))
+            print(f"  {label:8} {p50:>8} {p95:>8} {p99:>8} {row['error_rate']:>8.1%}  {details}")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
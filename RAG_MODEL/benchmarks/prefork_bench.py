@@ -0,0 +1,169 @@
+"""
+Benchmark: throughput and memory of server.py with 1..N pre-forked workers.
+
+For every --workers entry a server is started with the stub LLM (see
+test/server.py --workers), loaded for --duration seconds by load_test.py
+with --concurrency keep-alive connections (the server's response cache is
+off, so every request runs the whole pipeline), and then the memory of
+every worker process is read from /proc/<pid>/smaps_rollup (Linux only):
+
+- RSS: resident pages, counting shared ones in full in every worker;
+- PSS: shared pages split between the processes that map them;
+- USS: pages private to the worker, i.e. what one more worker costs.
+
+With a shared index USS stays flat as workers are added and the summed PSS
+grows much slower than N times a single server; throughput should scale
+with the cores available (the stub LLM answers instantly by default, so the
+pipeline's CPU work is what is measured).
+
+    python prefork_bench.py
+    python prefork_bench.py --workers 1,2,4,8 --concurrency 64 --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "test"))
+
+import load_test
+
+
+# --- Configuration ---
+SERVER = Path(__file__).parent.parent / "test" / "server.py"
+STARTUP_TIMEOUT = 120.0   # Seconds for a server to load and accept connections
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=STARTUP_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited during startup with status {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Server did not accept connections within {timeout:.0f} s")
+
+
+def child_pids(pid):
+    """Direct children of a process, from /proc/*/stat."""
+    children = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(stat.parent.name))
+    return children
+
+
+def memory_mb(pid):
+    """{"rss", "pss", "uss"} of a process in MB."""
+    values = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        name, _, rest = line.partition(":")
+        if rest.strip().endswith("kB"):
+            values[name] = int(rest.split()[0])
+    uss = values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    return {"rss": round(values["Rss"] / 1024, 1), "pss": round(values["Pss"] / 1024, 1), "uss": round(uss / 1024, 1)}
+
+
+def measure(workers, args):
+    port = free_port()
+    env = dict(os.environ, FITGENIE_VECTOR_BACKEND=args.backend, FITGENIE_QUIET="1")
+    command = [sys.executable, str(SERVER), "--stub-llm", "--stub-latency", str(args.stub_latency),
+               "--port", str(port), "--workers", str(workers), "--max-queue", str(args.concurrency * 4),
+               "--no-response-cache"]
+    process = subprocess.Popen(command, cwd=SERVER.parent, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port, process)
+        load = argparse.Namespace(host="127.0.0.1", port=port, concurrency=args.concurrency,
+                                  duration=args.duration)
+        traffic = asyncio.run(load_test.run(load))
+
+        pids = child_pids(process.pid) if workers > 1 else [process.pid]
+        per_worker = [memory_mb(pid) for pid in pids]
+        total_pss = sum(row["pss"] for row in per_worker)
+        if workers > 1:
+            total_pss += memory_mb(process.pid)["pss"]  # The parent holds the shared pages too
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    mean = lambda key: round(sum(row[key] for row in per_worker) / len(per_worker), 1)
+    return {
+        "ok_per_sec": traffic["ok_per_sec"], "errors": traffic["errors"], "rejected": traffic["rejected_429"],
+        "latency_ms": traffic["latency_ms"], "processes": len(per_worker),
+        "worker_rss_mb": mean("rss"), "worker_pss_mb": mean("pss"), "worker_uss_mb": mean("uss"),
+        "total_pss_mb": round(total_pss, 1),
+    }
+
+
+def run(args):
+    summary = {"backend": args.backend, "concurrency": args.concurrency, "duration_s": args.duration,
+               "cpus": os.cpu_count(), "runs": {}}
+    for workers in args.workers:
+        summary["runs"][workers] = measure(workers, args)
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Throughput and per-worker memory of the pre-fork server")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts (default: 1,2,4)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent connections (default: 32)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per run (default: 10)")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Stub LLM latency in seconds (default: 0)")
+    parser.add_argument("--backend", default="flat", choices=["flat", "chroma"], help="Vector backend (default: flat)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON only")
+    args = parser.parse_args()
+    args.workers = [int(value) for value in args.workers.split(",")]
+    return args
+
+
+def main():
+    args = parse_args()
+    summary = run(args)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print("=" * 84)
+    print(f"🍴 {summary['backend']} backend, {summary['concurrency']} connections for {summary['duration_s']:g} s, "
+          f"{summary['cpus']} CPUs")
+    print("-" * 84)
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8} {'PSS MB':>8} "
+          f"{'USS MB':>8} {'total PSS':>10}")
+    for workers, row in summary["runs"].items():
+        latency = row["latency_ms"]
+        print(f"{workers:>7} {row['ok_per_sec']:>8.1f} {latency['p50']:>8.1f} {latency['p95']:>8.1f} "
+              f"{row['worker_rss_mb']:>8.1f} {row['worker_pss_mb']:>8.1f} {row['worker_uss_mb']:>8.1f} "
+              f"{row['total_pss_mb']:>10.1f}")
+    print("-" * 84)
+    print("RSS/PSS/USS are per worker; total PSS includes the parent of a pre-forked server")
+    print("=" * 84)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark: cross-encoder reranking vs. vector order.
+
+For every labelled question in queries.json the exercise and food hits that
+would reach the prompt are built both ways:
+
+- vector: top k of each collection, interleaved (the pipeline without reranking),
+- rerank: top RERANK_CANDIDATES * k of each collection, scored by the
+  cross-encoder (see scripts/reranker.py), best RERANK_TOP_N kept.
+
+Reported: precision (share of context hits relevant to the label), relevant
+hits in the context and MRR of the first relevant hit, plus the latency the
+rerank stage adds with a cold and a warm score cache, and how often the
+configured budget would have forced the vector-order fallback.
+
+    python rerank_bench.py
+    python rerank_bench.py --top-n 8 --model cross-encoder/ms-marco-MiniLM-L-12-v2 --json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "test"))
+
+import app
+from context_builder import interleave
+from query_intent import parse_query_intent
+from reranker import DEFAULT_BUDGET_MS, DEFAULT_MODEL, Reranker, load_cross_encoder
+from run_benchmarks import is_relevant, percentiles, quiet
+
+
+# --- Configuration ---
+QUERIES_FILE = Path(__file__).parent / "queries.json"
+
+
+def quality(hits, label):
+    """(precision, relevant count, reciprocal rank) of a list of (document, metadata) hits."""
+    relevant = [is_relevant(meta, label) for _, meta in hits]
+    found = sum(relevant)
+    return (found / len(hits) if hits else 0.0), found, (1.0 / (relevant.index(True) + 1) if found else 0.0)
+
+
+def run(args):
+    fitness, nutrition = app.open_collections()
+    collections = [fitness, nutrition]
+    queries = json.loads(Path(args.queries).read_text(encoding="utf-8"))
+    vocabularies = app.get_facet_vocabularies()
+
+    with quiet():
+        load_cross_encoder(args.model)  # Model load is a one-off, not per-request cost
+        app.embed_query("warm up", collections)
+
+    cold = Reranker(args.model, budget_ms=float("inf"), cache_size=0)       # Scores every pair
+    warm = Reranker(args.model, budget_ms=float("inf"))                     # Keeps scores between runs
+    budgeted = Reranker(args.model, budget_ms=args.budget_ms, cache_size=0)  # Default budget, no cache
+
+    scores = {"vector": [], "rerank": []}
+    cold_seconds, warm_seconds, fallbacks, candidates = [], [], 0, []
+    for query in queries:
+        text = query["query"]
+        with quiet():
+            embeddings = app.embed_query(text, collections)
+            intent = parse_query_intent(text, vocabularies) if app.QUERY_FILTERS else None
+            if intent and intent.ranking:
+                continue  # Nutrient-table rankings are never reranked
+            vector_hits = interleave(*app.retrieve_hits(text, collections, embeddings, intent, k=args.k))
+            pool = interleave(*app.retrieve_hits(
+                text, collections, embeddings, intent, k=args.k * app.RERANK_CANDIDATES
+            ))
+
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                reranked, _ = cold.rerank(text, pool, args.top_n)
+                cold_seconds.append(time.perf_counter() - start)
+            warm.rerank(text, pool, args.top_n)
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                warm.rerank(text, pool, args.top_n)
+                warm_seconds.append(time.perf_counter() - start)
+            fallbacks += not budgeted.rerank(text, pool, args.top_n)[1]
+
+        candidates.append(len(pool))
+        scores["vector"].append(quality(vector_hits, query["relevant"]))
+        scores["rerank"].append(quality(reranked, query["relevant"]))
+
+    summary = {
+        "model": args.model, "k": args.k, "top_n": args.top_n, "queries": len(candidates),
+        "candidates_per_query": round(statistics.mean(candidates), 1) if candidates else 0,
+        "latency_ms": {"cold": percentiles(cold_seconds), "warm": percentiles(warm_seconds)},
+        "budget_ms": args.budget_ms,
+        "fallback_rate": round(fallbacks / len(candidates), 4) if candidates else None,
+    }
+    for order, values in scores.items():
+        summary[order] = {
+            "precision": round(statistics.mean(v[0] for v in values), 4) if values else None,
+            "relevant_hits": round(statistics.mean(v[1] for v in values), 2) if values else None,
+            "context_hits": args.k * 2 if order == "vector" else args.top_n,
+            "mrr": round(statistics.mean(v[2] for v in values), 4) if values else None,
+        }
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare cross-encoder reranking with vector order")
+    parser.add_argument("--queries", default=str(QUERIES_FILE), help="Labelled queries (default: queries.json)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Cross-encoder model (default: {DEFAULT_MODEL})")
+    parser.add_argument("--k", type=int, default=5, help="Results per collection without reranking (default: 5)")
+    parser.add_argument("--top-n", type=int, default=app.RERANK_TOP_N, help="Hits kept after reranking")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Rerank budget to check against")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query (default: 3)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON only")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    summary = run(args)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print("=" * 72)
+    print(f"🎯 Reranking {summary['queries']} questions with '{summary['model']}' "
+          f"({summary['candidates_per_query']} candidates each)")
+    print("-" * 72)
+    print(f"{'Order':10} {'hits':>6} {'precision':>10} {'relevant':>9} {'MRR':>7}")
+    for order in ("vector", "rerank"):
+        row = summary[order]
+        print(f"{order:10} {row['context_hits']:>6} {row['precision']:>10.3f} {row['relevant_hits']:>9.2f} "
+              f"{row['mrr']:>7.3f}")
+    print("-" * 72)
+    latency = summary["latency_ms"]
+    print(f"⏱️  Rerank cost: cold p50 {latency['cold']['p50']} ms / p95 {latency['cold']['p95']} ms, "
+          f"warm cache p50 {latency['warm']['p50']} ms")
+    print(f"⏳ Budget {summary['budget_ms']:.0f} ms: vector-order fallback on {summary['fallback_rate']:.0%} of questions")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
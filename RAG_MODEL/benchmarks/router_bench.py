@@ -0,0 +1,155 @@
+"""
+Benchmark: query routing vs. always searching both collections.
+
+Runs the labelled questions in queries.json (each names the collection that
+answers it) through the router (see scripts/query_router.py) and reports:
+
+- routing accuracy: the labelled collection is among the searched ones,
+- single-collection share and average vector searches per question,
+- average documents and estimated tokens in the prompt,
+- recall@k of the labelled collection with and without routing.
+
+A few questions that need both collections are routed too, to check that
+they fall back to searching both.
+
+    python router_bench.py
+    python router_bench.py --verbose --json > routing.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "test"))
+
+import app
+from context_builder import SEPARATOR, estimate_tokens
+from query_intent import parse_query_intent
+from run_benchmarks import is_relevant, quiet, relevant_totals
+
+
+# --- Configuration ---
+QUERIES_FILE = Path(__file__).parent / "queries.json"
+LABELS = ["fitness", "nutrition"]
+
+# Questions whose answer needs exercises and foods
+MIXED_QUERIES = [
+    "what should I eat after a leg workout",
+    "high protein breakfast before the gym",
+    "how many calories does a squat workout burn",
+    "best snacks for muscle recovery after training",
+]
+
+
+def prompt_size(query, fitness, nutrition, k):
+    """(documents, estimated tokens) of the prompt the pipeline builds for a question."""
+    app.response_cache.invalidate()
+    with quiet():
+        _, prompt, _, _ = app.prepare_rag_prompt(query, fitness, nutrition, k=k)
+    documents = prompt.split("**Verified Information from Databases:**")[1].split("**Your Answer")[0]
+    return len([part for part in documents.split(SEPARATOR) if part.strip()]), estimate_tokens(prompt)
+
+
+def run(args):
+    fitness, nutrition = app.open_collections()
+    handles = [fitness, nutrition]
+    collections = dict(zip(LABELS, handles))
+    queries = json.loads(Path(args.queries).read_text(encoding="utf-8"))
+    totals = relevant_totals(collections, queries)
+    vocabularies = app.get_facet_vocabularies()
+    router = app.get_router()
+
+    with quiet():
+        app.embed_query("warm up", handles)
+
+    rows = []
+    for i, query in enumerate(queries + [{"query": text, "collection": None} for text in MIXED_QUERIES]):
+        text, label = query["query"], query["collection"]
+        with quiet():
+            embeddings = app.embed_query(text, handles)
+        intent = parse_query_intent(text, vocabularies) if app.QUERY_FILTERS else None
+        route = router.route(text, embeddings[0], intent, k=args.k)
+        row = {"query": text, "label": label, "route": route.describe(), "searches": route.searches}
+
+        sizes = {}
+        for routing in (False, True):
+            app.ROUTING = routing
+            sizes[routing] = prompt_size(text, fitness, nutrition, args.k)
+            if label is not None:
+                with quiet():
+                    hits = app.retrieve_hits(text, handles, embeddings, intent, k=args.k,
+                                             ks=route.ks if routing else None)
+                relevant = sum(is_relevant(meta, query["relevant"]) for _, meta in hits[LABELS.index(label)][:args.k])
+                row[f"recall_{'routed' if routing else 'both'}"] = (
+                    relevant / min(args.k, totals[i]) if totals[i] else 0.0
+                )
+        row.update(
+            correct=None if label is None else route.ks[LABELS.index(label)] > 0,
+            documents_both=sizes[False][0], documents_routed=sizes[True][0],
+            tokens_both=sizes[False][1], tokens_routed=sizes[True][1],
+        )
+        rows.append(row)
+
+    labelled = [row for row in rows if row["label"] is not None]
+    mean = lambda key, items=rows: round(statistics.mean(row[key] for row in items), 3)
+    summary = {
+        "k": args.k,
+        "centroids": sorted(router.centroids),
+        "questions": len(labelled),
+        "routing_accuracy": mean("correct", labelled),
+        "single_collection_share": round(sum(row["searches"] == 1 for row in labelled) / len(labelled), 3),
+        "searches_per_question": {"both": 2, "routed": mean("searches", labelled)},
+        "prompt_documents": {"both": mean("documents_both", labelled), "routed": mean("documents_routed", labelled)},
+        "prompt_tokens": {"both": mean("tokens_both", labelled), "routed": mean("tokens_routed", labelled)},
+        "recall_at_k": {"both": mean("recall_both", labelled), "routed": mean("recall_routed", labelled)},
+        "mixed_searching_both": sum(row["searches"] == 2 for row in rows if row["label"] is None),
+        "mixed_questions": len(MIXED_QUERIES),
+    }
+    if args.verbose:
+        summary["rows"] = rows
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure query routing against searching both collections")
+    parser.add_argument("--queries", default=str(QUERIES_FILE), help="Labelled queries (default: queries.json)")
+    parser.add_argument("--k", type=int, default=5, help="Results per collection (default: 5)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON only")
+    parser.add_argument("--verbose", action="store_true", help="Include the route of every question")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    summary = run(args)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print("=" * 72)
+    print(f"🧭 Routing {summary['questions']} labelled questions "
+          f"(centroids: {', '.join(summary['centroids']) or 'none, keywords only'})")
+    print("-" * 72)
+    for row in summary.get("rows", []):
+        mark = "  " if row["correct"] is None else ("✅" if row["correct"] else "❌")
+        print(f"{mark} {row['query'][:40]:40} {row['route']}")
+    if summary.get("rows"):
+        print("-" * 72)
+    print(f"{'':24} {'both':>10} {'routed':>10}")
+    print(f"{'searches / question':24} {2:>10} {summary['searches_per_question']['routed']:>10.2f}")
+    for key, title in (("prompt_documents", "prompt documents"), ("prompt_tokens", "prompt tokens"),
+                       ("recall_at_k", f"recall@{summary['k']}")):
+        print(f"{title:24} {summary[key]['both']:>10.2f} {summary[key]['routed']:>10.2f}")
+    print("-" * 72)
+    print(f"🎯 Routing accuracy {summary['routing_accuracy']:.0%}, "
+          f"single collection for {summary['single_collection_share']:.0%} of questions")
+    print(f"🔀 Mixed questions searching both: {summary['mixed_searching_both']}/{summary['mixed_questions']}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+Offline benchmark suite for the FitGenie RAG pipeline.
+
+Builds a fresh vector_db from the processed datasets, then runs the
+labelled questions in queries.json through the real retrieval code and,
+with the deterministic stub LLM (scripts/stub_llm.py), through the whole
+pipeline. Nothing talks to Gemini, so runs are repeatable and offline.
+
+Measured:
+- ingestion throughput (documents/sec, embedding cache disabled),
+- query embedding latency, cold (model call) and cached (cache lookup),
+  against a scratch embedding cache so the real one is neither used nor filled,
+- retrieval latency p50/p95/p99 (filters + hybrid search),
+- recall@k and MRR per collection against the relevance labels,
+- end-to-end latency and time to first token with the stub LLM.
+
+Results are written as JSON (benchmarks/results/ by default). Pass
+--baseline with an earlier result file to print the change of every
+metric and flag regressions beyond --tolerance.
+
+    python run_benchmarks.py
+    python run_benchmarks.py --baseline results/bench-20250101-120000.json --fail-on-regression
+"""
+
+import argparse
+import contextlib
+import functools
+import io
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "test"))
+
+import app
+import ingest
+import ingest_nutrient
+from embedding import DEFAULT_MODEL, encode_query
+from embedding_cache import EmbeddingCache, set_default_cache
+from query_encoder import QueryEncoder
+from query_intent import parse_query_intent
+from stub_llm import StubGenerationModel
+
+
+# --- Configuration ---
+QUERIES_FILE = Path(__file__).parent / "queries.json"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Collection label in queries.json -> (ingest module, collection name, position in retrieve_hits())
+COLLECTIONS = {
+    "fitness": (ingest, app.FITNESS_COLLECTION, 0),
+    "nutrition": (ingest_nutrient, app.NUTRITION_COLLECTION, 1),
+}
+
+# Metrics compared against a baseline, and whether higher is better
+TRACKED_METRICS = {
+    "ingestion.{collection}.docs_per_sec": True,
+    "retrieval.embedding_ms.cold.p50": False,
+    "retrieval.embedding_ms.cached.p50": False,
+    "retrieval.latency_ms.p50": False,
+    "retrieval.latency_ms.p95": False,
+    "retrieval.latency_ms.p99": False,
+    "retrieval.{collection}.recall_at_k": True,
+    "retrieval.{collection}.mrr": True,
+    "end_to_end.latency_ms.p50": False,
+    "end_to_end.latency_ms.p95": False,
+    "end_to_end.ttft_ms.p50": False,
+}
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the pipeline's progress output while measuring."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def percentiles(seconds, digits=2):
+    """p50/p95/p99 of a list of durations, in milliseconds."""
+    values = sorted(seconds)
+    pick = lambda pct: values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+    return {f"p{pct}": round(pick(pct) * 1000, digits) for pct in (50, 95, 99)} if values else {}
+
+
+def is_relevant(metadata, label):
+    """
+    Does a hit satisfy a relevance label from queries.json?
+
+    Labels judge the exercise title or food name only, never the facets the
+    query filters enforce, so recall with filters on is not true by
+    construction. A list of strings matches when any of them is in the
+    title; a list of lists when every inner list has a match.
+    """
+    for field, values in label.items():
+        text = str(metadata.get(field.split("_")[0], "")).lower()
+        groups = values if values and isinstance(values[0], list) else [values]
+        if not all(any(value.lower() in text for value in group) for group in groups):
+            return False
+    return True
+
+
+def ingest_collections(db_path):
+    """Build every collection from scratch into db_path; returns throughput per collection."""
+    results = {}
+    for label, (module, name, _) in COLLECTIONS.items():
+        try:
+            with quiet():
+                documents, metadatas, ids = module.prepare_documents(module.load_processed_data())
+        except FileNotFoundError as e:
+            print(f"⚠️  Skipping {label}: {e}")
+            continue
+
+        start = time.perf_counter()
+        with quiet():
+            module.build_vector_database(documents, metadatas, ids, rebuild=True, use_cache=False,
+                                         vector_db_path=db_path)
+        seconds = time.perf_counter() - start
+        results[label] = {"documents": len(documents), "seconds": round(seconds, 3),
+                          "docs_per_sec": round(len(documents) / seconds, 1)}
+        print(f"📥 Ingested {label}: {len(documents)} docs in {seconds:.1f} s")
+    return results
+
+
+def relevant_totals(collections, queries):
+    """Number of relevant documents per query, for recall (scans the metadata once per collection)."""
+    totals = {}
+    for label, collection in collections.items():
+        metadatas = collection.get(include=["metadatas"])["metadatas"]
+        for i, query in enumerate(queries):
+            if query["collection"] == label:
+                totals[i] = sum(is_relevant(meta, query["relevant"]) for meta in metadatas)
+    return totals
+
+
+def cold_encoders(collections):
+    """
+    One uncached encode function per embedding model, going the same way
+    app.embed_query() does. Returns it with the QueryEncoders to close.
+    """
+    encoders, batchers = {}, []
+    for collection in collections:
+        model_name = (collection.metadata or {}).get("embedding_model", DEFAULT_MODEL)
+        if model_name not in encoders:
+            if app.QUERY_BATCHING:
+                batchers.append(QueryEncoder(model_name, cache=False))
+                encoders[model_name] = batchers[-1].encode
+            else:
+                encoders[model_name] = functools.partial(encode_query, model_name=model_name, cache=False)
+    return encoders, batchers
+
+
+def run_retrieval(collections, queries, k, repeat):
+    """
+    Query embedding latency, cold (model call) and cached (embedding cache
+    lookup), search latency (filters + hybrid search) over all queries, and
+    recall@k / MRR per collection.
+    """
+    handles = [collections.get("fitness"), collections.get("nutrition")]
+    totals = relevant_totals(collections, queries)
+    vocabularies = app.get_facet_vocabularies()
+    encoders, batchers = cold_encoders(collections.values())
+    cold, cached, seconds = [], [], []
+    scores = {label: {"recall": [], "rr": []} for label in collections}
+
+    for i, query in enumerate(queries):
+        label = query["collection"]
+        if label not in collections:
+            continue
+
+        with quiet():
+            # Fills the (scratch) embedding cache, so the timed calls below are lookups
+            embeddings = app.embed_query(query["query"], handles)
+            intent = parse_query_intent(query["query"], vocabularies) if app.QUERY_FILTERS else None
+            hits = app.retrieve_hits(query["query"], handles, embeddings, intent, k=k)
+
+        relevant = [is_relevant(meta, query["relevant"]) for _, meta in hits[COLLECTIONS[label][2]][:k]]
+        found = sum(relevant)
+        scores[label]["recall"].append(found / min(k, totals[i]) if totals[i] else 0.0)
+        scores[label]["rr"].append(1.0 / (relevant.index(True) + 1) if found else 0.0)
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for encode in encoders.values():
+                encode(query["query"])
+            cold.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            with quiet():
+                app.embed_query(query["query"], handles)
+            cached.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            with quiet():
+                intent = parse_query_intent(query["query"], vocabularies) if app.QUERY_FILTERS else None
+                app.retrieve_hits(query["query"], handles, embeddings, intent, k=k)
+            seconds.append(time.perf_counter() - start)
+
+    for batcher in batchers:
+        batcher.close()
+
+    results = {
+        "embedding_ms": {"cold": percentiles(cold), "cached": percentiles(cached)},
+        "latency_ms": percentiles(seconds),
+    }
+    for label, values in scores.items():
+        results[label] = {
+            "queries": len(values["recall"]),
+            "recall_at_k": round(statistics.mean(values["recall"]), 4) if values["recall"] else None,
+            "mrr": round(statistics.mean(values["rr"]), 4) if values["rr"] else None,
+        }
+    return results
+
+
+def run_end_to_end(collections, queries, k, repeat, stub_latency):
+    """Whole pipeline with the stub LLM; the response cache is cleared before every question."""
+    model = StubGenerationModel(latency=stub_latency)
+    fitness, nutrition = collections.get("fitness"), collections.get("nutrition")
+    totals, ttfts = [], []
+
+    for _ in range(repeat):
+        for query in queries:
+            app.response_cache.invalidate()
+            timings = {}
+            with quiet():
+                for _ in app.stream_rag_response(query["query"], fitness, nutrition, model, k=k, timings=timings):
+                    pass
+            totals.append(timings["total"])
+            ttfts.append(timings["ttft"])
+
+    return {"latency_ms": percentiles(totals), "ttft_ms": percentiles(ttfts), "stub_latency_ms": stub_latency * 1000}
+
+
+def lookup(results, path):
+    for part in path.split("."):
+        if not isinstance(results, dict) or part not in results:
+            return None
+        results = results[part]
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print every tracked metric against the baseline; returns the regressed metric names."""
+    regressions = []
+    print("\n📊 Compared with baseline:")
+    for template, higher_is_better in TRACKED_METRICS.items():
+        paths = [template.format(collection=label) for label in COLLECTIONS] if "{collection}" in template else [template]
+        for path in paths:
+            current, previous = lookup(results, path), lookup(baseline, path)
+            if not isinstance(current, (int, float)) or not previous:
+                continue
+
+            change = (current - previous) / abs(previous)
+            worse = -change if higher_is_better else change
+            if worse > tolerance:
+                regressions.append(path)
+            print(f"   {'❌' if worse > tolerance else '✅'} {path:40} {previous:>10.4g} → {current:<10.4g} ({change:+.1%})")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline retrieval and end-to-end benchmarks")
+    parser.add_argument("--db", help="vector_db directory to build (default: a fresh temporary one)")
+    parser.add_argument("--reuse-db", action="store_true", help="Benchmark --db as it is, without ingesting")
+    parser.add_argument("--queries", default=str(QUERIES_FILE), help="Labelled queries (default: queries.json)")
+    parser.add_argument("--k", type=int, default=5, help="Results per collection (default: 5)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query (default: 5)")
+    parser.add_argument("--stub-latency", type=float, default=50, help="Stub LLM latency in ms (default: 50)")
+    parser.add_argument("--output", help="Result file (default: results/bench-<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier result file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression (default: 0.10)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on regressions")
+    args = parser.parse_args()
+    if args.reuse_db and not args.db:
+        parser.error("--reuse-db needs --db")
+    return args
+
+
+def main():
+    args = parse_args()
+    queries = json.loads(Path(args.queries).read_text(encoding="utf-8"))
+
+    db_path = Path(args.db) if args.db else Path(tempfile.mkdtemp(prefix="fitgenie-bench-"))
+    app.DB_PATH = str(db_path)
+    cache_dir = Path(tempfile.mkdtemp(prefix="fitgenie-bench-cache-"))
+    set_default_cache(EmbeddingCache(cache_dir / "embeddings.sqlite"))
+
+    print("=" * 60)
+    print("🏁 FitGenie offline benchmark")
+    print(f"   vector_db: {db_path}")
+    print("=" * 60)
+
+    try:
+        results = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "k": args.k,
+                "repeat": args.repeat,
+                "queries": len(queries),
+                "python": platform.python_version(),
+                "query_filters": app.QUERY_FILTERS,
+                "hybrid_search": app.HYBRID_SEARCH,
+                "routing": app.ROUTING,
+                "query_batching": app.QUERY_BATCHING,
+            },
+            "ingestion": {} if args.reuse_db else ingest_collections(db_path),
+        }
+
+        client = app.get_chroma_client()
+        collections = {}
+        for label, (_, name, _) in COLLECTIONS.items():
+            try:
+                collections[label] = client.get_collection(name)
+            except Exception:
+                print(f"⚠️  Collection '{name}' not found; its queries are skipped")
+        queries = [query for query in queries if query["collection"] in collections]
+        results["meta"]["embedding_model"] = (next(iter(collections.values())).metadata or {}).get("embedding_model")
+
+        with quiet():
+            app.embed_query("warm up", list(collections.values()))  # Load the encoder outside the timings
+
+        print("🔍 Measuring retrieval...")
+        results["retrieval"] = run_retrieval(collections, queries, args.k, args.repeat)
+        print("💬 Measuring end-to-end with the stub LLM...")
+        results["end_to_end"] = run_end_to_end(collections, queries, args.k, args.repeat, args.stub_latency / 1000)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        if not args.db:
+            shutil.rmtree(db_path, ignore_errors=True)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    retrieval, end_to_end = results["retrieval"], results["end_to_end"]
+    print("\n" + "=" * 60)
+    for label, stats in results["ingestion"].items():
+        print(f"📥 Ingestion {label}: {stats['docs_per_sec']} docs/sec")
+    print(f"🧮 Query embedding: cold p50 {retrieval['embedding_ms']['cold']['p50']} ms, "
+          f"cached p50 {retrieval['embedding_ms']['cached']['p50']} ms")
+    print(f"🔍 Retrieval: p50 {retrieval['latency_ms']['p50']} ms, p95 {retrieval['latency_ms']['p95']} ms, "
+          f"p99 {retrieval['latency_ms']['p99']} ms")
+    for label in collections:
+        print(f"   {label}: recall@{args.k} {retrieval[label]['recall_at_k']}, MRR {retrieval[label]['mrr']}")
+    print(f"💬 End-to-end: p50 {end_to_end['latency_ms']['p50']} ms, p95 {end_to_end['latency_ms']['p95']} ms, "
+          f"TTFT p50 {end_to_end['ttft_ms']['p50']} ms")
+    print(f"💾 Results: {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions and args.fail_on_regression:
+            print(f"\n❌ {len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
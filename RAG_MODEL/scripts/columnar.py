@@ -0,0 +1,188 @@
+"""
+Columnar (Arrow IPC) intermediate format for processed FitGenie documents.
+
+The converters can write processed documents as an uncompressed Arrow IPC
+file instead of a JSON array. Each document becomes one row with a
+`doc_id` column, a `text_to_embed` column and one string column per
+metadata field (prefixed with "metadata."). The ingest scripts read the
+file through a memory map, batch by batch, and only materialize the
+metadata columns they actually store, so the full corpus is never held in
+Python objects. The JSON array stays supported as a fallback when pyarrow
+is not installed or no Arrow file has been produced.
+"""
+
+import json
+import os
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pyarrow is optional; we fall back to JSON
+    pa = None
+
+
+# --- Configuration ---
+ARROW_SUFFIX = ".arrow"
+METADATA_PREFIX = "metadata."
+READ_BATCH_SIZE = 1000  # Rows materialized as Python objects at a time
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for the Arrow intermediate format (pip install pyarrow)")
+
+
+def _to_string(value):
+    return "" if value is None else value if isinstance(value, str) else str(value)
+
+
+class ArrowDocumentWriter:
+    """
+    Stream document chunks into an Arrow IPC file.
+
+    The schema is fixed by the first chunk; every metadata value is stored as
+    a string, which is how the ingest scripts hand it to ChromaDB anyway.
+    Like JsonArrayWriter, the file is written to `<path>.tmp` and replaces
+    `path` only when the conversion succeeded.
+    """
+
+    def __init__(self, path):
+        _require_pyarrow()
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self._sink = None
+        self._writer = None
+        self._metadata_keys = None
+        self._schema = None
+
+    def __enter__(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._sink = pa.OSFile(self.tmp_path, "wb")
+        return self
+
+    def write_columns(self, doc_ids, texts, metadata):
+        """Append a chunk given as columns (see convert_engine.build_document_columns())."""
+        if self._writer is None:
+            self._metadata_keys = list(metadata.keys())
+            self._schema = pa.schema(
+                [("doc_id", pa.string()), ("text_to_embed", pa.string())]
+                + [(METADATA_PREFIX + key, pa.string()) for key in self._metadata_keys]
+            )
+            self._writer = pa.ipc.new_file(self._sink, self._schema)
+
+        arrays = [pa.array(doc_ids, pa.string()), pa.array(texts, pa.string())]
+        for key in self._metadata_keys:
+            values = metadata.get(key, [""] * len(doc_ids))
+            arrays.append(pa.array([_to_string(value) for value in values], pa.string()))
+
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self._schema))
+
+    def write_chunk(self, docs):
+        """Append a list of document dicts."""
+        if not docs:
+            return
+
+        keys = self._metadata_keys or list(docs[0].get("metadata", {}).keys())
+        self.write_columns(
+            [doc["doc_id"] for doc in docs],
+            [doc["text_to_embed"] for doc in docs],
+            {key: [doc.get("metadata", {}).get(key, "") for doc in docs] for key in keys}
+        )
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            if self._writer is not None:
+                self._writer.close()
+            self._sink.close()
+            os.unlink(self.tmp_path)
+            return False
+        if self._writer is None:
+            # Nothing was written; still leave a valid (empty) file behind
+            self._writer = pa.ipc.new_file(
+                self._sink, pa.schema([("doc_id", pa.string()), ("text_to_embed", pa.string())])
+            )
+        self._writer.close()
+        self._sink.close()
+        os.replace(self.tmp_path, self.path)
+        return False
+
+
+def count_arrow_documents(path):
+    """Return the number of documents in an Arrow file without reading them."""
+    _require_pyarrow()
+    with pa.memory_map(str(path), "r") as source:
+        reader = pa.ipc.open_file(source)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def iter_arrow_documents(path, metadata_fields=None, batch_size=READ_BATCH_SIZE):
+    """
+    Yield document dicts from a memory-mapped Arrow file, batch by batch.
+
+    Only the metadata_fields listed are read (all of them when None), so
+    wide tables such as the 60+ nutrient columns stay in the memory map.
+    """
+    _require_pyarrow()
+    with pa.memory_map(str(path), "r") as source:
+        reader = pa.ipc.open_file(source)
+        available = [
+            name[len(METADATA_PREFIX):] for name in reader.schema.names
+            if name.startswith(METADATA_PREFIX)
+        ]
+        keys = available if metadata_fields is None else [key for key in metadata_fields if key in available]
+
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+
+            for offset in range(0, batch.num_rows, batch_size):
+                piece = batch.slice(offset, batch_size)
+                doc_ids = piece.column("doc_id").to_pylist()
+                texts = piece.column("text_to_embed").to_pylist()
+                meta_values = [piece.column(METADATA_PREFIX + key).to_pylist() for key in keys]
+
+                for row, (doc_id, text) in enumerate(zip(doc_ids, texts)):
+                    yield {
+                        "doc_id": doc_id,
+                        "text_to_embed": text,
+                        "metadata": {key: values[row] for key, values in zip(keys, meta_values)}
+                    }
+
+
+def resolve_data_path(json_path):
+    """
+    Pick the processed data file to ingest.
+
+    Prefers the Arrow sibling of json_path (same name, .arrow suffix) when
+    pyarrow is available and it is at least as new as the JSON file.
+    """
+    json_path = Path(json_path)
+    arrow_path = json_path.with_suffix(ARROW_SUFFIX)
+
+    if pa is not None and arrow_path.exists():
+        if not json_path.exists() or arrow_path.stat().st_mtime >= json_path.stat().st_mtime:
+            return arrow_path
+
+    return json_path
+
+
+def load_documents(json_path, metadata_fields=None):
+    """
+    Open the processed documents for ingestion.
+
+    Returns (path, count, documents) where documents is an iterable of
+    document dicts: a lazy memory-mapped reader for Arrow files, or the
+    parsed list for the JSON fallback.
+    """
+    path = resolve_data_path(json_path)
+
+    if not path.exists():
+        raise FileNotFoundError(f"Data file not found at {path}")
+
+    if path.suffix == ARROW_SUFFIX:
+        return path, count_arrow_documents(path), iter_arrow_documents(path, metadata_fields)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        documents = json.load(f)
+
+    return path, len(documents), documents
@@ -0,0 +1,145 @@
+"""
+Token-budgeted context assembly for the RAG prompt.
+
+The prompt used to be every retrieved document joined verbatim, and
+megaGym has many near-duplicate rows (the same exercise under several
+equipment variants, placeholder descriptions), so a good part of the prompt
+repeated itself and slowed generation down. build_context():
+
+1. trims each document to its useful fields (empty and placeholder values
+   dropped, overly long values shortened at a sentence boundary),
+2. drops near-duplicates of documents already picked, by Jaccard
+   similarity of word shingles,
+3. packs documents in relevance order until the token budget is used up.
+"""
+
+import os
+import re
+
+
+# --- Configuration ---
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("FITGENIE_CONTEXT_TOKENS", "1200"))
+CHARS_PER_TOKEN = 4           # Rough average for English text with Gemini/SentencePiece tokenizers
+MAX_FIELD_CHARS = 400         # Longer field values are cut at a sentence boundary
+SHINGLE_SIZE = 3              # Words per shingle
+DUPLICATE_THRESHOLD = 0.7     # Jaccard similarity above which a document counts as a duplicate
+SEPARATOR = "\n---\n"
+
+PLACEHOLDER_VALUES = {"", "nan", "none", "null", "unknown", "n/a"}
+
+_WORD = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (no tokenizer dependency)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _shorten(value, limit=MAX_FIELD_CHARS):
+    if len(value) <= limit:
+        return value
+    cut = value[:limit]
+    ends = [match.start() for match in _SENTENCE_END.finditer(cut)]
+    return cut[:ends[-1]] if ends else cut.rsplit(" ", 1)[0] + "..."
+
+
+def trim_document(document):
+    """Drop "Field: <empty>" lines and shorten overly long field values."""
+    lines = []
+    for line in document.splitlines():
+        label, separator, value = line.partition(":")
+        value = value.strip()
+        if separator and value.lower() in PLACEHOLDER_VALUES:
+            continue
+        lines.append(f"{label}: {_shorten(value)}" if separator else line.strip())
+    return "\n".join(line for line in lines if line)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of hashed word n-grams of a text."""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return set()
+    if len(words) <= size:
+        return {hash(tuple(words))}
+    return {hash(tuple(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextStats:
+    """What build_context() kept, dropped and saved."""
+
+    def __init__(self):
+        self.retrieved = 0
+        self.kept = []          # Indices (into the input) of the documents used
+        self.empty = 0           # Nothing left after trimming
+        self.duplicates = 0
+        self.over_budget = 0
+        self.tokens = 0
+        self.tokens_verbatim = 0
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_verbatim - self.tokens
+
+    def describe(self):
+        return (f"{len(self.kept)}/{self.retrieved} docs, ~{self.tokens} tokens "
+                f"(saved ~{self.tokens_saved}: {self.duplicates} duplicates, {self.empty} empty, "
+                f"{self.over_budget} over budget)")
+
+
+def build_context(documents, token_budget=DEFAULT_TOKEN_BUDGET, duplicate_threshold=DUPLICATE_THRESHOLD):
+    """
+    Assemble the prompt context from documents in relevance order.
+    Returns (context, ContextStats).
+    """
+    stats = ContextStats()
+    stats.retrieved = len(documents)
+    stats.tokens_verbatim = estimate_tokens(SEPARATOR.join(documents))
+
+    picked = []
+    picked_shingles = []
+    used = 0
+
+    for i, document in enumerate(documents):
+        text = trim_document(document)
+        doc_shingles = shingles(text)
+        if not doc_shingles:
+            # Empty, whitespace-only or punctuation-only: nothing to compare or to show the model
+            stats.empty += 1
+            continue
+
+        if any(jaccard(doc_shingles, other) >= duplicate_threshold for other in picked_shingles):
+            stats.duplicates += 1
+            continue
+
+        cost = estimate_tokens(text) + (estimate_tokens(SEPARATOR) if picked else 0)
+        if used + cost > token_budget:
+            # A shorter, less relevant document may still fit
+            stats.over_budget += 1
+            continue
+
+        picked.append(text)
+        picked_shingles.append(doc_shingles)
+        stats.kept.append(i)
+        used += cost
+
+    context = SEPARATOR.join(picked)
+    stats.tokens = estimate_tokens(context)
+    return context, stats
+
+
+def interleave(*ranked_lists):
+    """Merge best-first lists rank by rank: a1, b1, a2, b2, ..."""
+    merged = []
+    for rank in range(max((len(items) for items in ranked_lists), default=0)):
+        for items in ranked_lists:
+            if rank < len(items):
+                merged.append(items[rank])
+    return merged
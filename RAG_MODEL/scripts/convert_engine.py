@@ -0,0 +1,181 @@
+"""
+Column-wise CSV-to-document conversion engine for FitGenie datasets.
+
+Instead of walking the DataFrame with iterrows() and building each document
+with per-row f-strings, the CSV is read in chunks and every field of a
+chunk (text_to_embed, doc_id, metadata) is built with vectorized pandas
+string operations. Documents are streamed to the output file chunk by
+chunk, so memory use stays bounded by the chunk size rather than the size
+of the input file. Output is either a JSON array or an Arrow IPC file
+(see columnar.py).
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from columnar import ARROW_SUFFIX, ArrowDocumentWriter
+
+
+# --- Configuration ---
+DEFAULT_CHUNKSIZE = 50_000  # Rows per chunk read from the CSV
+
+
+class JsonArrayWriter:
+    """
+    Stream documents into a JSON array file one chunk at a time.
+
+    Each document is written compactly on its own line (indent=2 forces the
+    slow pure-Python JSON encoder), so the file is still a regular JSON array
+    for json.load() but never needs the full list of documents in memory.
+    The array is written to `<path>.tmp` and only replaces `path` once the
+    conversion succeeded; a failed run leaves the previous output untouched.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self._file = None
+        self._first = True
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+        self._file.write("[")
+        return self
+
+    def write_columns(self, doc_ids, texts, metadata):
+        """Append a chunk given as columns (see build_document_columns())."""
+        self.write_chunk(columns_to_documents(doc_ids, texts, metadata))
+
+    def write_chunk(self, docs):
+        """Append a list of document dicts to the array."""
+        parts = [
+            "\n" + json.dumps(doc, ensure_ascii=False, default=str)
+            for doc in docs
+        ]
+
+        if not parts:
+            return
+
+        self._file.write(("" if self._first else ",") + ",".join(parts))
+        self._first = False
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._file.close()
+            os.unlink(self.tmp_path)
+            return False
+        self._file.write("]" if self._first else "\n]")
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        return False
+
+
+def iter_csv_chunks(path, chunksize=DEFAULT_CHUNKSIZE, index_col=0):
+    """Yield the CSV as DataFrame chunks with missing values filled with ''."""
+    for chunk in pd.read_csv(path, index_col=index_col, chunksize=chunksize):
+        yield chunk.fillna("")
+
+
+def build_text_column(df, text_fields):
+    """
+    Build the text_to_embed column for a whole chunk at once.
+
+    text_fields is a list of (label, column, suffix) tuples; each becomes one
+    "label: value suffix" line of the text blob.
+    """
+    lines = [
+        label + ": " + df[column].astype(str) + suffix
+        for label, column, suffix in text_fields
+    ]
+
+    text = lines[0]
+    for line in lines[1:]:
+        text = text + "\n" + line
+    return text
+
+
+def build_document_columns(df, id_prefix, text_fields, metadata_columns=None, extra_metadata=None):
+    """
+    Build the doc_id, text_to_embed and metadata columns of a DataFrame chunk.
+
+    metadata_columns maps metadata keys to CSV columns; when it is None every
+    column of the row is kept under its own name. extra_metadata is merged
+    into every document's metadata (e.g. the source file).
+    Returns (doc_ids, texts, metadata) where metadata maps key -> list of values.
+    """
+    doc_ids = id_prefix + "-" + df.index.astype(str)
+    texts = build_text_column(df, text_fields)
+
+    if metadata_columns is None:
+        meta_frame = df
+    else:
+        meta_frame = df[list(metadata_columns.values())].set_axis(list(metadata_columns.keys()), axis=1)
+
+    if extra_metadata:
+        meta_frame = meta_frame.assign(**extra_metadata)
+
+    # Column-wise tolist() is much cheaper than DataFrame.to_dict("records")
+    metadata = {key: meta_frame[key].tolist() for key in meta_frame.columns}
+
+    return doc_ids.tolist(), texts.tolist(), metadata
+
+
+def columns_to_documents(doc_ids, texts, metadata):
+    """Turn the output of build_document_columns() into a list of document dicts."""
+    keys = list(metadata.keys())
+    metadatas = [dict(zip(keys, values)) for values in zip(*metadata.values())]
+
+    if not keys:
+        metadatas = [{} for _ in doc_ids]
+
+    return [
+        {"doc_id": doc_id, "text_to_embed": text, "metadata": meta}
+        for doc_id, text, meta in zip(doc_ids, texts, metadatas)
+    ]
+
+
+def build_documents(df, id_prefix, text_fields, metadata_columns=None, extra_metadata=None):
+    """Convert a DataFrame chunk into a list of document dicts."""
+    return columns_to_documents(
+        *build_document_columns(df, id_prefix, text_fields, metadata_columns, extra_metadata)
+    )
+
+
+def open_writer(output_file):
+    """Pick the document writer from the output file's extension."""
+    if Path(output_file).suffix == ARROW_SUFFIX:
+        return ArrowDocumentWriter(output_file)
+    return JsonArrayWriter(output_file)
+
+
+def convert_csv(input_file, output_file, id_prefix, text_fields,
+                metadata_columns=None, extra_metadata=None,
+                chunksize=DEFAULT_CHUNKSIZE, index_col=0):
+    """
+    Convert a CSV file into the processed document format in bounded memory.
+
+    Writes a JSON array, or a memory-mappable Arrow IPC file when the output
+    file ends in .arrow. Returns the number of documents written.
+    """
+    start = time.perf_counter()
+    total = 0
+
+    with open_writer(output_file) as writer:
+        for chunk in iter_csv_chunks(input_file, chunksize=chunksize, index_col=index_col):
+            doc_ids, texts, metadata = build_document_columns(
+                chunk, id_prefix, text_fields, metadata_columns, extra_metadata
+            )
+            writer.write_columns(doc_ids, texts, metadata)
+            total += len(doc_ids)
+
+            elapsed = time.perf_counter() - start
+            print(f"  ✓ {total:,} rows converted ({total / max(elapsed, 1e-9):,.0f} rows/sec)")
+
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  Converted {total:,} rows in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return total
@@ -0,0 +1,196 @@
+"""
+Document embedding engine for FitGenie ingestion.
+
+Documents are encoded explicitly with a SentenceTransformer model and the
+precomputed vectors are handed to ChromaDB with `embeddings=`, instead of
+letting Chroma's default embedding function encode 100 documents at a time
+on a single core. Large jobs are spread over a multi-process pool with one
+CPU worker per core. Vectors are looked up in (and added to) the on-disk
+embedding cache before the encoder is called.
+"""
+
+import os
+
+import numpy as np
+
+from embedding_cache import get_default_cache, text_hash
+
+
+# --- Configuration ---
+# all-MiniLM-L6-v2 is also ChromaDB's default model, so collections built
+# with it stay compatible with plain `query_texts=` lookups.
+DEFAULT_MODEL = os.environ.get("FITGENIE_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+DEFAULT_BATCH_SIZE = int(os.environ.get("FITGENIE_EMBEDDING_BATCH_SIZE", "64"))
+DEFAULT_WORKERS = int(os.environ.get("FITGENIE_EMBEDDING_WORKERS", "0")) or os.cpu_count() or 1
+MIN_TEXTS_PER_WORKER = 256  # Below this a process pool costs more than it saves
+# Weights file used by the "onnx-int8" backend (dynamically quantized, shipped with most sentence-transformers models)
+ONNX_QUANTIZED_FILE = os.environ.get("FITGENIE_ONNX_QUANTIZED_FILE", "onnx/model_quint8_avx2.onnx")
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+_encoders = {}
+
+
+def load_encoder(model_name=DEFAULT_MODEL, backend="torch"):
+    """
+    Load a SentenceTransformer model once per process.
+
+    sentence_transformers (and torch) are imported here rather than at module
+    level, so runs served entirely from the embedding cache never pay for it.
+    backend "onnx" runs the model with ONNX Runtime and "onnx-int8" with its
+    quantized weights (ONNX_QUANTIZED_FILE); both need sentence-transformers
+    >= 3.2 with the onnx extra and fall back to torch when unavailable.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    if (model_name, backend) not in _encoders:
+        from sentence_transformers import SentenceTransformer
+
+        print(f"🧠 Loading embedding model '{model_name}' ({backend})...")
+        if backend == "torch":
+            model = SentenceTransformer(model_name, device="cpu")
+        else:
+            kwargs = {"model_kwargs": {"file_name": ONNX_QUANTIZED_FILE}} if backend == "onnx-int8" else {}
+            try:
+                model = SentenceTransformer(model_name, device="cpu", backend="onnx", **kwargs)
+            except Exception as e:
+                print(f"⚠️  {backend} backend unavailable ({e}), using torch")
+                model = load_encoder(model_name)
+        _encoders[model_name, backend] = model
+    return _encoders[model_name, backend]
+
+
+def _encode_multi_process(model, texts, batch_size, workers):
+    """Encode texts with a pool of CPU worker processes."""
+    # Each worker gets one core; letting every worker spawn a full set of
+    # BLAS/torch threads would oversubscribe the CPU.
+    previous = os.environ.get("OMP_NUM_THREADS")
+    os.environ["OMP_NUM_THREADS"] = "1"
+    try:
+        pool = model.start_multi_process_pool(target_devices=["cpu"] * workers)
+    finally:
+        if previous is None:
+            os.environ.pop("OMP_NUM_THREADS", None)
+        else:
+            os.environ["OMP_NUM_THREADS"] = previous
+
+    try:
+        chunk_size = max(batch_size, -(-len(texts) // (workers * 4)))
+        return model.encode_multi_process(
+            texts,
+            pool,
+            batch_size=batch_size,
+            chunk_size=chunk_size,
+            normalize_embeddings=True
+        )
+    finally:
+        model.stop_multi_process_pool(pool)
+
+
+def _encode(texts, model_name, batch_size, workers):
+    """Run the encoder on texts, with a worker pool when there is enough work."""
+    model = load_encoder(model_name)
+    workers = max(1, min(workers, len(texts) // MIN_TEXTS_PER_WORKER))
+
+    if workers > 1:
+        print(f"⚙️  Encoding {len(texts)} documents with {workers} worker processes (batch size {batch_size})...")
+        embeddings = _encode_multi_process(model, texts, batch_size, workers)
+    else:
+        print(f"⚙️  Encoding {len(texts)} documents (batch size {batch_size})...")
+        embeddings = model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def _resolve_cache(cache):
+    """Map the `cache` argument (True/False/None/EmbeddingCache) to a cache or None."""
+    if cache is True:
+        return get_default_cache()
+    if cache is False:
+        return None
+    return cache
+
+
+def encode_documents(texts, model_name=DEFAULT_MODEL, batch_size=DEFAULT_BATCH_SIZE,
+                     workers=DEFAULT_WORKERS, cache=True):
+    """
+    Encode document texts into normalized float32 embeddings.
+
+    Identical texts are encoded once, and texts already in the on-disk
+    embedding cache (see embedding_cache.py) are not encoded at all; the
+    model is only loaded when something is missing. Uses a multi-process
+    pool of `workers` CPU processes when there is enough work to amortize
+    starting it. Returns an (n, dim) NumPy array.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    cache = _resolve_cache(cache)
+    keys = [text_hash(text) for text in texts]
+    unique = dict(zip(keys, texts))
+
+    vectors = cache.get_many(model_name, unique.keys()) if cache is not None else {}
+    missing = [key for key in unique if key not in vectors]
+
+    print(f"♻️  {len(vectors)} cached, {len(missing)} to encode, "
+          f"{len(texts) - len(unique)} duplicate texts skipped")
+
+    if missing:
+        encoded = _encode([unique[key] for key in missing], model_name, batch_size, workers)
+        vectors.update(zip(missing, encoded))
+        if cache is not None:
+            cache.put_many(model_name, zip(missing, encoded))
+
+    return np.stack([vectors[key] for key in keys]).astype(np.float32, copy=False)
+
+
+def encode_query(text, model_name=DEFAULT_MODEL, cache=True):
+    """Encode a single query text, consulting the embedding cache first."""
+    cache = _resolve_cache(cache)
+    key = text_hash(text)
+
+    if cache is not None:
+        found = cache.get_many(model_name, [key])
+        if key in found:
+            return found[key]
+
+    vector = load_encoder(model_name).encode(
+        [text],
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )[0].astype(np.float32)
+
+    if cache is not None:
+        cache.put_many(model_name, [(key, vector)])
+    return vector
+
+
+def make_embed_fn(model_name=DEFAULT_MODEL, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS, cache=True):
+    """Bind encoder settings into a texts -> embeddings callable for sync_collection()."""
+    def embed(texts):
+        return encode_documents(texts, model_name=model_name, batch_size=batch_size, workers=workers, cache=cache)
+    return embed
+
+
+def add_embedding_args(parser):
+    """Register the embedding options shared by the ingest scripts."""
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="SentenceTransformer model used to embed documents")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Documents per encoder batch")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Encoder worker processes (default: one per CPU core; 1 disables the pool)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the on-disk embedding cache"
+    )
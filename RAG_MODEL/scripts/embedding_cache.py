@@ -0,0 +1,149 @@
+"""
+Persistent on-disk embedding cache for FitGenie.
+
+Embeddings are stored in a small SQLite database keyed by
+(model name, SHA-256 of the text), so unchanged texts are never re-encoded:
+not across ingest runs, not across the fitness and nutrition collections,
+and not for repeated user queries. The cache is bounded; once it holds more
+than `max_entries` vectors the least recently used ones are evicted.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+# --- Configuration ---
+DEFAULT_CACHE_PATH = Path(
+    os.environ.get("FITGENIE_EMBEDDING_CACHE", Path(__file__).parent.parent / "cache" / "embeddings.sqlite")
+)
+DEFAULT_MAX_ENTRIES = int(os.environ.get("FITGENIE_EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+SQLITE_MAX_PARAMS = 900  # Stay below SQLite's bound-parameter limit per statement
+
+
+def text_hash(text):
+    """Return the cache key for a text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Size-bounded (model, text hash) -> embedding store backed by SQLite."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, model_name, hashes):
+        """Return {text_hash: vector} for the hashes present in the cache."""
+        found = {}
+        hashes = list(hashes)
+        now = time.time()
+
+        with self._lock:
+            for i in range(0, len(hashes), SQLITE_MAX_PARAMS):
+                chunk = hashes[i:i + SQLITE_MAX_PARAMS]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [model_name, *chunk]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model_name, key) for key in found]
+                )
+                self._conn.commit()
+
+        return found
+
+    def put_many(self, model_name, items):
+        """Store (text_hash, vector) pairs and evict the oldest entries if over budget."""
+        now = time.time()
+        rows = [
+            (model_name, key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in items
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries beyond max_entries (caller holds the lock)."""
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """Open the shared on-disk cache once per process."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = EmbeddingCache()
+    return _default_cache
+
+
+def set_default_cache(cache):
+    """Replace the shared cache, e.g. with a scratch file that must not touch the real one."""
+    global _default_cache
+    _default_cache = cache
+
+
+def _forget_default_cache():
+    # A SQLite connection must not be used across fork(); the child opens its own
+    global _default_cache
+    _default_cache = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_default_cache)
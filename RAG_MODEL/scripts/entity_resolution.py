@@ -0,0 +1,124 @@
+"""
+Duplicate detection between exercise datasets with MinHash / LSH blocking.
+
+Comparing every exercise of one dataset with every exercise of another is
+O(n·m) Jaccard computations. Instead every title is reduced to a MinHash
+signature (NUM_PERM minimum hash values over its character shingles) and
+the signatures are cut into bands: titles that agree on all rows of at
+least one band land in the same bucket and become candidate pairs. Only
+the candidates are compared exactly, which is a small fraction of n·m.
+
+With BANDS bands of ROWS rows, two titles with Jaccard similarity s become
+candidates with probability 1 - (1 - s^ROWS)^BANDS; the defaults (32 x 4)
+find ~99% of pairs at s = 0.6 and practically all above the match threshold.
+"""
+
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from context_builder import jaccard
+
+
+# --- Configuration ---
+SHINGLE_SIZE = 3            # Character n-grams of the normalised title
+NUM_PERM = 128              # MinHash signature length
+BANDS = 32                  # LSH bands (NUM_PERM must be divisible by BANDS)
+MATCH_THRESHOLD = 0.7       # Exact shingle Jaccard needed to call two titles the same exercise
+
+_PRIME = (1 << 31) - 1      # Keeps a * x + b below 2**63 for 31-bit a, b and 32-bit x
+_SIGNATURE_BLOCK = 1 << 16  # Shingles hashed per vectorised step
+
+# "(male)", "(side pov)", "v. 2"; removed before the punctuation, which would eat their "("
+_VARIANT = re.compile(r"\([^)]*\)|\bv\.\s*\d+\b")
+_PUNCTUATION = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_title(title):
+    """Lower-case a title and strip variant markers and punctuation."""
+    return " ".join(_PUNCTUATION.sub(" ", _VARIANT.sub(" ", str(title).lower())).split())
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of stable 32-bit hashes of the character n-grams of a text."""
+    padded = f" {text} "
+    if len(padded) <= size:
+        return {zlib.crc32(padded.encode("utf-8"))}
+    return {zlib.crc32(padded[i:i + size].encode("utf-8")) for i in range(len(padded) - size + 1)}
+
+
+class MinHasher:
+    """Computes MinHash signatures with NUM_PERM universal hash functions."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+
+    def signatures(self, shingle_sets):
+        """(n, num_perm) uint32 signature matrix, one row per shingle set."""
+        sizes = np.array([max(len(s), 1) for s in shingle_sets], dtype=np.int64)
+        values = np.fromiter(
+            (x for s in shingle_sets for x in (s or (0,))), dtype=np.uint64, count=int(sizes.sum())
+        )
+        owners = np.repeat(np.arange(len(shingle_sets)), sizes)
+
+        signatures = np.full((len(shingle_sets), self.num_perm), _PRIME, dtype=np.uint64)
+        for start in range(0, len(values), _SIGNATURE_BLOCK):
+            block = values[start:start + _SIGNATURE_BLOCK] % _PRIME
+            hashed = (block[:, None] * self.a + self.b) % _PRIME
+            np.minimum.at(signatures, owners[start:start + _SIGNATURE_BLOCK], hashed)
+
+        return signatures.astype(np.uint32)
+
+
+def lsh_buckets(signatures, bands=BANDS):
+    """Group row indices whose signatures agree on a whole band."""
+    rows = signatures.shape[1] // bands
+    if rows * bands != signatures.shape[1]:
+        raise ValueError(f"Signature length {signatures.shape[1]} is not divisible by {bands} bands")
+
+    buckets = defaultdict(list)
+    for band in range(bands):
+        band_values = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for index, row in enumerate(band_values):
+            buckets[band, row.tobytes()].append(index)
+    return [members for members in buckets.values() if len(members) > 1]
+
+
+def match_records(left, right, threshold=MATCH_THRESHOLD, bands=BANDS, num_perm=NUM_PERM, compatible=None):
+    """
+    Pair left titles with the most similar right titles above threshold, one to one.
+
+    left and right are lists of titles. compatible(i, j) can veto a pair
+    (e.g. same name but different equipment). Pairs are taken best score
+    first, so when several left titles match the same right title only the
+    closest one gets it; the others fall back to their next match, if any.
+    Returns ({left index: right index}, stats) where stats counts the
+    candidate pairs compared.
+    """
+    keys = [shingles(normalize_title(title)) for title in list(left) + list(right)]
+    signatures = MinHasher(num_perm).signatures(keys)
+
+    candidates = set()
+    for members in lsh_buckets(signatures, bands):
+        lefts = [i for i in members if i < len(left)]
+        rights = [j - len(left) for j in members if j >= len(left)]
+        candidates.update((i, j) for i in lefts for j in rights)
+
+    scored = []
+    for i, j in candidates:
+        score = jaccard(keys[i], keys[len(left) + j])
+        if score >= threshold and (compatible is None or compatible(i, j)):
+            scored.append((-score, i, j))
+
+    matches, taken = {}, set()
+    for _, i, j in sorted(scored):
+        if i not in matches and j not in taken:
+            matches[i] = j
+            taken.add(j)
+
+    return matches, {"candidates": len(candidates), "pairs": len(left) * len(right)}
@@ -0,0 +1,269 @@
+"""
+Convert the ExerciseDB export (dataset/exercises.csv) and merge it with megaGym.
+
+ExerciseDB stores each exercise's steps and secondary muscles in wide
+columns (instructions/0..10, secondaryMuscles/0..5); they are joined column
+by column with vectorized string operations. Exercises that megaGym already
+has (matched one to one by title with MinHash/LSH, see entity_resolution.py)
+are folded into the megaGym document as extra instructions instead of
+becoming a second document; the rest are added as new documents. The result is written to
+fitness_data.json, which ingest.py prefers over processed_data.json.
+
+    python csvtojson.py      # megaGym -> processed_data.json (run first)
+    python exercisedb.py     # + ExerciseDB -> fitness_data.json
+"""
+
+import argparse
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from columnar import ARROW_SUFFIX, load_documents
+from convert_engine import build_documents, open_writer
+from csvtojson import METADATA_COLUMNS, OUTPUT_FILE as MEGAGYM_FILE, TEXT_FIELDS
+from entity_resolution import MATCH_THRESHOLD, match_records, normalize_title
+
+# --- Configuration ---
+INPUT_FILE = "../dataset/exercises.csv"
+OUTPUT_FILE = "../dataset/processed/fitness_data.json"
+ID_PREFIX = "exercisedb"
+
+# ExerciseDB target muscle -> megaGym body part (the vocabulary the query filters know)
+BODY_PARTS = {
+    "abs": "Abdominals",
+    "pectorals": "Chest",
+    "serratus anterior": "Chest",
+    "biceps": "Biceps",
+    "triceps": "Triceps",
+    "forearms": "Forearms",
+    "delts": "Shoulders",
+    "traps": "Traps",
+    "lats": "Lats",
+    "upper back": "Middle Back",
+    "spine": "Lower Back",
+    "glutes": "Glutes",
+    "quads": "Quadriceps",
+    "hamstrings": "Hamstrings",
+    "calves": "Calves",
+    "adductors": "Adductors",
+    "abductors": "Abductors",
+    "levator scapulae": "Neck",
+    "cardiovascular system": "Cardio",
+}
+
+# ExerciseDB equipment -> megaGym equipment; anything else becomes "Other"
+EQUIPMENT = {
+    "body weight": "Body Only",
+    "assisted": "Body Only",
+    "weighted": "Body Only",
+    "dumbbell": "Dumbbell",
+    "barbell": "Barbell",
+    "olympic barbell": "Barbell",
+    "trap bar": "Barbell",
+    "ez barbell": "E-Z Curl Bar",
+    "cable": "Cable",
+    "rope": "Cable",
+    "kettlebell": "Kettlebells",
+    "band": "Bands",
+    "resistance band": "Bands",
+    "medicine ball": "Medicine Ball",
+    "stability ball": "Exercise Ball",
+    "bosu ball": "Exercise Ball",
+    "roller": "Foam Roll",
+    "leverage machine": "Machine",
+    "smith machine": "Machine",
+    "sled machine": "Machine",
+}
+GENERIC_EQUIPMENT = {"Other", ""}  # Never vetoes a title match
+
+# Words that make a different movement out of an otherwise similar title
+# ("rear lateral raise" vs "lateral raise"); matched on normalize_title() output
+MOVEMENT_MODIFIERS = {
+    name: re.compile(pattern) for name, pattern in {
+        "rear": r"\brear\b",
+        "reverse": r"\breverse\b",
+        "wide": r"\bwide\b",
+        "close": r"\b(close|narrow)\b",
+        "incline": r"\bincline\b",
+        "decline": r"\bdecline\b",
+        "step-up": r"\bstep ups?\b",
+        "single": r"\b(single|one) (arm|leg)\b",
+        "alternating": r"\balternat(e|ing)\b",
+        "seated": r"\b(seated|sitting)\b",
+        "lying": r"\blying\b",
+        "kneeling": r"\bkneeling\b",
+        "jump": r"\bjump(ing)?\b",
+        "sumo": r"\bsumo\b",
+        "hammer": r"\bhammer\b",
+    }.items()
+}
+
+
+def wide_columns(df, prefix):
+    """The prefix/0, prefix/1, ... columns of a wide table, in numeric order."""
+    columns = [column for column in df.columns if column.startswith(prefix + "/")]
+    return sorted(columns, key=lambda column: int(column.rsplit("/", 1)[1]))
+
+
+def join_wide_columns(df, prefix, sep=" ", numbered=False):
+    """
+    Join the non-empty prefix/N columns of every row into one string.
+
+    Works one column at a time on whole Series (no per-row Python), so the
+    cost grows with the number of wide columns, not the number of rows.
+    """
+    joined = pd.Series("", index=df.index, dtype=object)
+    for position, column in enumerate(wide_columns(df, prefix), start=1):
+        values = df[column].fillna("").astype(str).str.strip()
+        if numbered:
+            values = values.where(values == "", f"{position}. " + values)
+        joined = joined.where(values == "", joined.where(joined == "", joined + sep) + values)
+    return joined
+
+
+def movement_modifiers(title):
+    """The MOVEMENT_MODIFIERS named in a title."""
+    text = normalize_title(title)
+    return frozenset(name for name, pattern in MOVEMENT_MODIFIERS.items() if pattern.search(text))
+
+
+def load_exercisedb(path):
+    """Read the ExerciseDB CSV into megaGym-shaped columns (Title, Desc, Type, ...)."""
+    raw = pd.read_csv(path, dtype=str).fillna("")
+
+    target = raw["target"].str.strip().str.lower()
+    secondary = join_wide_columns(raw, "secondaryMuscles", sep=", ")
+    muscles = target.where(secondary == "", target + ", " + secondary)
+    name = raw["name"].str.strip()
+
+    exercises = pd.DataFrame({
+        "Title": name.str[:1].str.upper() + name.str[1:],
+        "Desc": join_wide_columns(raw, "instructions", numbered=True),
+        "Type": np.where(
+            raw["bodyPart"] == "cardio", "Cardio",
+            np.where(name.str.contains("stretch", case=False), "Stretching", "Strength")
+        ),
+        "BodyPart": target.map(BODY_PARTS).fillna(target.str.title()),
+        "Equipment": raw["equipment"].str.strip().str.lower().map(EQUIPMENT).fillna("Other"),
+        "Level": "",
+        "Rating": "",
+        "Muscles": muscles,
+    })
+    exercises.index = raw["id"].str.strip()
+    return exercises
+
+
+def merge_datasets(megagym_docs, exercises, threshold=MATCH_THRESHOLD, source=INPUT_FILE):
+    """
+    Resolve ExerciseDB exercises against the megaGym documents.
+
+    Titles only match when they name the same equipment (or a generic one)
+    and the same MOVEMENT_MODIFIERS. Matching is one to one: a matched exercise adds its instructions and
+    muscles to its megaGym document (and its id to the merged_from
+    metadata). Unmatched exercises, including those that lost a megaGym
+    document to a closer title, become new documents. Returns
+    (documents, stats).
+    """
+    titles = exercises["Title"].tolist()
+    megagym_titles = [doc.get("metadata", {}).get("title", "") for doc in megagym_docs]
+    megagym_equipment = [doc.get("metadata", {}).get("equipment", "") for doc in megagym_docs]
+    equipment = exercises["Equipment"].tolist()
+    modifiers = [movement_modifiers(title) for title in titles]
+    megagym_modifiers = [movement_modifiers(title) for title in megagym_titles]
+
+    def compatible(i, j):
+        if modifiers[i] != megagym_modifiers[j]:
+            return False
+        pair = {equipment[i], megagym_equipment[j]}
+        return len(pair) == 1 or bool(pair & GENERIC_EQUIPMENT)
+
+    start = time.perf_counter()
+    matches, stats = match_records(
+        titles,
+        megagym_titles,
+        threshold=threshold,
+        compatible=compatible
+    )
+    stats["seconds"] = time.perf_counter() - start
+
+    merged = {j: i for i, j in matches.items()}
+
+    documents = []
+    for j, doc in enumerate(megagym_docs):
+        metadata = {**doc.get("metadata", {}), "merged_from": ""}
+        text = doc["text_to_embed"]
+        if j in merged:
+            match = exercises.iloc[merged[j]]
+            text += f"\nInstructions: {match['Desc']}\nTarget Muscles: {match['Muscles']}"
+            metadata["merged_from"] = f"{ID_PREFIX}-{exercises.index[merged[j]]}"
+        documents.append({**doc, "text_to_embed": text, "metadata": metadata})
+
+    keep = np.ones(len(exercises), dtype=bool)
+    keep[list(matches)] = False
+    unmatched = exercises[keep]
+    documents.extend(build_documents(
+        unmatched,
+        id_prefix=ID_PREFIX,
+        text_fields=TEXT_FIELDS + [("Target Muscles", "Muscles", "")],
+        metadata_columns=METADATA_COLUMNS,
+        extra_metadata={"source": source, "merged_from": ""}
+    ))
+
+    stats.update(merged=len(matches), added=len(unmatched), megagym=len(megagym_docs))
+    return documents, stats
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Merge the ExerciseDB CSV into the processed megaGym documents.")
+    parser.add_argument("--input", default=INPUT_FILE, help="ExerciseDB CSV file")
+    parser.add_argument("--megagym", default=MEGAGYM_FILE, help="Processed megaGym documents (from csvtojson.py)")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Where to write the merged documents")
+    parser.add_argument(
+        "--format",
+        choices=["json", "arrow"],
+        default="json",
+        help="Write a JSON array or a memory-mappable Arrow IPC file (needs pyarrow)"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=MATCH_THRESHOLD,
+        help=f"Title similarity (Jaccard) needed to merge two exercises (default: {MATCH_THRESHOLD})"
+    )
+    args = parser.parse_args()
+
+    if args.format == "arrow":
+        args.output = str(Path(args.output).with_suffix(ARROW_SUFFIX))
+    return args
+
+
+def main():
+    args = parse_args()
+    print(f"Loading ExerciseDB from '{args.input}' and megaGym from '{args.megagym}'...")
+
+    try:
+        exercises = load_exercisedb(args.input)
+        _, _, megagym_docs = load_documents(args.megagym)
+        megagym_docs = list(megagym_docs)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        print("Run csvtojson.py first so the processed megaGym documents exist.")
+        return
+
+    documents, stats = merge_datasets(megagym_docs, exercises, threshold=args.threshold)
+
+    with open_writer(args.output) as writer:
+        writer.write_chunk(documents)
+
+    print(f"🔗 {stats['candidates']:,} LSH candidate pairs compared instead of {stats['pairs']:,} "
+          f"({stats['seconds'] * 1000:.0f} ms)")
+    print(f"   {stats['merged']} ExerciseDB exercises merged into megaGym documents, {stats['added']} added")
+    print(f"\nSuccess! 🚀")
+    print(f"Processed {len(documents)} documents.")
+    print(f"Your processed file is ready: '{args.output}'")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+In-process exact vector search over memory-mapped NumPy arrays.
+
+For a few thousand exercises and a few hundred foods, Chroma's HNSW graph
+and SQLite persistence cost more (import, client start-up, per-query
+overhead) than simply scoring every vector. FlatCollection stores the
+embeddings of a collection as a quantized matrix next to the vector
+database (vector_db/flat/<collection>/) and answers queries by brute force:
+
+- float16: half the size of float32, scores practically identical;
+- int8: a quarter of the size, one float32 scale per row (symmetric
+  per-row quantization), optionally re-scored with an exact float32 copy
+  of the top RERANK_FACTOR * k candidates.
+
+The matrices are opened with np.load(mmap_mode="r"), so opening a collection
+costs milliseconds and only the pages that are actually scored are read.
+FlatCollection implements the part of Chroma's Collection API the app uses
+(name, metadata, count(), query(), get()), including `where` filters with
+$eq/$ne/$in/$nin/$lt/$lte/$gt/$gte/$and/$or, so it is a drop-in replacement.
+Distances are squared L2 like Chroma's default space (2 - 2·cos for the
+normalized embeddings the ingest scripts store).
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+
+# --- Configuration ---
+FLAT_DIR = "flat"
+DEFAULT_DTYPE = "int8"     # "float16" or "int8"
+RERANK_FACTOR = 4          # int8: candidates re-scored in float32 = RERANK_FACTOR * k
+SCORE_BLOCK = 16384        # Rows converted to float32 and scored at a time
+EXPORT_PAGE_SIZE = 1000
+
+_RANGE_OPS = {"$lt": np.less, "$lte": np.less_equal, "$gt": np.greater, "$gte": np.greater_equal}
+
+
+def index_dir(vector_db_path, collection_name):
+    return Path(vector_db_path) / FLAT_DIR / collection_name
+
+
+def quantize(embeddings, dtype=DEFAULT_DTYPE):
+    """Return (quantized matrix, per-row scales or None) for float16 or int8 storage."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if dtype == "float16":
+        return embeddings.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(embeddings).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(embeddings / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    raise ValueError(f"Unsupported dtype '{dtype}' (use float16 or int8)")
+
+
+class _MetadataColumns:
+    """Metadata as per-key arrays, so where filters are evaluated vectorized."""
+
+    def __init__(self, metadatas):
+        self._metadatas = metadatas
+        self._codes = {}
+        self._numbers = {}
+
+    def codes(self, key):
+        """(int codes, {value: code}) of a key; -1 where the key is missing."""
+        if key not in self._codes:
+            lookup = {}
+            codes = np.fromiter(
+                (lookup.setdefault(meta[key], len(lookup)) if key in meta else -1 for meta in self._metadatas),
+                dtype=np.int64, count=len(self._metadatas)
+            )
+            self._codes[key] = (codes, lookup)
+        return self._codes[key]
+
+    def numbers(self, key):
+        """Numeric values of a key as float64; NaN where missing or not a number."""
+        if key not in self._numbers:
+            self._numbers[key] = np.fromiter(
+                (_as_number(meta.get(key)) for meta in self._metadatas),
+                dtype=np.float64, count=len(self._metadatas)
+            )
+        return self._numbers[key]
+
+
+def _as_number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+
+class FlatCollection:
+    """Exact, quantized, memory-mapped stand-in for a Chroma collection."""
+
+    def __init__(self, name, ids, documents, metadatas, vectors, scales=None, full=None, metadata=None):
+        self.name = name
+        self.metadata = metadata or {}
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.vectors = vectors        # (n, d) float16 or int8, usually memory-mapped
+        self.scales = scales          # (n,) float32 per-row scales for int8
+        self.full = full              # Optional (n, d) float32 copy used to rerank int8 candidates
+        self._columns = _MetadataColumns(metadatas)
+        self._positions = {doc_id: i for i, doc_id in enumerate(ids)}
+
+    def count(self):
+        return len(self.ids)
+
+    # --- Filtering ---
+    def _mask(self, where):
+        if "$and" in where:
+            return np.logical_and.reduce([self._mask(clause) for clause in where["$and"]])
+        if "$or" in where:
+            return np.logical_or.reduce([self._mask(clause) for clause in where["$or"]])
+
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, condition in where.items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                mask &= self._condition(key, op, value)
+        return mask
+
+    def _condition(self, key, op, value):
+        if op in _RANGE_OPS:
+            return _RANGE_OPS[op](self._columns.numbers(key), value)
+
+        codes, lookup = self._columns.codes(key)
+        if op in ("$eq", "$ne"):
+            matches = codes == lookup.get(value, -2)
+            return matches if op == "$eq" else ~matches & (codes >= 0)
+        if op in ("$in", "$nin"):
+            wanted = [lookup[item] for item in value if item in lookup]
+            matches = np.isin(codes, wanted)
+            return matches if op == "$in" else ~matches & (codes >= 0)
+        raise ValueError(f"Unsupported where operator '{op}'")
+
+    # --- Scoring ---
+    def _scores(self, query, rows=None):
+        """Approximate dot products of the query with all rows (or the given rows)."""
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        scores = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), SCORE_BLOCK):
+            block = np.asarray(vectors[start:start + SCORE_BLOCK], dtype=np.float32)
+            scores[start:start + SCORE_BLOCK] = block @ query
+        if self.scales is not None:
+            scores *= self.scales if rows is None else self.scales[rows]
+        return scores
+
+    def search(self, query_embedding, k=5, where=None, rerank=True):
+        """Return (row indices, squared L2 distances) of the k nearest rows, best first."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        rows = np.flatnonzero(self._mask(where)) if where else None
+        total = len(self.ids) if rows is None else len(rows)
+        if total == 0 or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = self._scores(query, rows)
+        rerank = rerank and self.full is not None
+        keep = min(total, k * RERANK_FACTOR if rerank else k)
+        top = np.argpartition(-scores, keep - 1)[:keep] if keep < total else np.arange(total)
+        candidates = top if rows is None else rows[top]
+
+        if rerank:
+            scores = np.asarray(self.full[np.sort(candidates)], dtype=np.float32) @ query
+            candidates = np.sort(candidates)
+        else:
+            scores = scores[top]
+
+        order = np.argsort(-scores, kind="stable")[:k]
+        return candidates[order], (2.0 - 2.0 * scores[order]).astype(np.float32)
+
+    # --- Chroma-compatible API ---
+    def _rows(self, rows, include, distances=None):
+        result = {"ids": [self.ids[i] for i in rows]}
+        if "documents" in include:
+            result["documents"] = [self.documents[i] for i in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [self.metadatas[i] for i in rows]
+        if distances is not None and "distances" in include:
+            result["distances"] = distances.tolist()
+        return result
+
+    def query(self, query_embeddings, n_results=10, where=None, include=("documents", "metadatas", "distances")):
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query_embedding in query_embeddings:
+            rows, distances = self.search(query_embedding, k=n_results, where=where)
+            for key, values in self._rows(rows, include, distances).items():
+                results[key].append(values)
+        return {key: values if values or key == "ids" else None for key, values in results.items()}
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include=("documents", "metadatas")):
+        if ids is not None:
+            rows = np.array([self._positions[doc_id] for doc_id in ids if doc_id in self._positions], dtype=np.int64)
+            if where:
+                rows = rows[self._mask(where)[rows]]
+        else:
+            rows = np.flatnonzero(self._mask(where)) if where else np.arange(len(self.ids))
+        rows = rows[offset:None if limit is None else offset + limit]
+        return self._rows(rows, include)
+
+
+def save_flat_index(path, name, ids, documents, metadatas, embeddings, dtype=DEFAULT_DTYPE,
+                    keep_float32=True, collection_metadata=None):
+    """
+    Write a flat index directory (atomically replacing an existing one).
+
+    keep_float32 stores an exact float32 copy next to an int8 matrix so the
+    top candidates can be re-scored; it is never read for float16.
+    """
+    path = Path(path)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    vectors, scales = quantize(embeddings, dtype)
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    np.save(tmp_path / "vectors.npy", vectors)
+    if scales is not None:
+        np.save(tmp_path / "scales.npy", scales)
+        if keep_float32:
+            np.save(tmp_path / "full.npy", embeddings)
+    with open(tmp_path / "records.json", "w", encoding="utf-8") as f:
+        json.dump({"ids": list(ids), "documents": list(documents), "metadatas": list(metadatas)}, f, ensure_ascii=False)
+    (tmp_path / "index.json").write_text(json.dumps({
+        "name": name, "dtype": dtype, "count": len(ids), "dim": int(embeddings.shape[1]) if len(ids) else 0,
+        "metadata": collection_metadata or {},
+    }))
+
+    old_path = path.with_name(path.name + ".old")
+    shutil.rmtree(old_path, ignore_errors=True)
+    if path.exists():
+        path.replace(old_path)
+    tmp_path.replace(path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return path
+
+
+def load_flat_index(path, mmap=True):
+    """Open a flat index directory written by save_flat_index()."""
+    path = Path(path)
+    info = json.loads((path / "index.json").read_text())
+    with open(path / "records.json", encoding="utf-8") as f:
+        records = json.load(f)
+
+    mmap_mode = "r" if mmap else None
+    scales_path, full_path = path / "scales.npy", path / "full.npy"
+    return FlatCollection(
+        info["name"], records["ids"], records["documents"], records["metadatas"],
+        vectors=np.load(path / "vectors.npy", mmap_mode=mmap_mode),
+        scales=np.load(scales_path) if scales_path.exists() else None,
+        full=np.load(full_path, mmap_mode=mmap_mode) if full_path.exists() else None,
+        metadata=info["metadata"],
+    )
+
+
+def export_collection(collection, path, dtype=DEFAULT_DTYPE, keep_float32=True, page_size=EXPORT_PAGE_SIZE):
+    """Copy a Chroma collection (ids, texts, metadata, embeddings) into a flat index."""
+    ids, documents, metadatas, embeddings = [], [], [], []
+    for offset in range(0, collection.count(), page_size):
+        page = collection.get(include=["documents", "metadatas", "embeddings"], limit=page_size, offset=offset)
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+        embeddings.extend(page["embeddings"])
+
+    return save_flat_index(
+        path, collection.name, ids, documents, metadatas, np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1),
+        dtype=dtype, keep_float32=keep_float32, collection_metadata=collection.metadata
+    )
+
+
+def build_flat_index(vector_db_path, collection, dtype=DEFAULT_DTYPE):
+    """Export a freshly ingested collection so FITGENIE_VECTOR_BACKEND=flat can serve it."""
+    path = export_collection(collection, index_dir(vector_db_path, collection.name), dtype=dtype)
+    print(f"🧮 Flat {dtype} index: {collection.count()} vectors → {path}")
+    return path
+
+
+def has_flat_index(vector_db_path, collection_name):
+    """Was a collection exported to a flat index?"""
+    return (index_dir(vector_db_path, collection_name) / "index.json").exists()
+
+
+def load_flat_collection(vector_db_path, collection_name):
+    """The flat index of a collection; raises FileNotFoundError if it was never exported."""
+    path = index_dir(vector_db_path, collection_name)
+    if not has_flat_index(vector_db_path, collection_name):
+        raise FileNotFoundError(f"No flat index for '{collection_name}' in {path.parent}")
+    return load_flat_index(path)
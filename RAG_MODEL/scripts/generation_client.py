@@ -0,0 +1,311 @@
+"""
+Fault-tolerant generation client over an ordered list of LLMs.
+
+A bare generate_content() call has no deadline: one slow Gemini response
+holds the request for as long as it takes, and one failed call ends in an
+apology even though the other models in the fallback list would answer.
+GenerationClient wraps the models (primary first) behind the same
+generate_content(prompt, stream=False) interface and adds:
+
+- a per-attempt deadline;
+- retries with exponential backoff and full jitter, on the next model
+  when the one that failed has a healthy alternative;
+- hedging: when the primary has not answered after its own p95 latency
+  (measured over recent calls), a duplicate request goes to the next model
+  and whichever answers first wins. At most MAX_HEDGE_RATIO of the requests
+  are hedged, so a slow model cannot double the load;
+- a circuit breaker per model: after FAILURE_THRESHOLD consecutive failures
+  the model is skipped for COOLDOWN_SECONDS, then a single trial call
+  decides whether it is healthy again.
+
+For streaming calls the same logic applies up to the first chunk (the time
+to first token is what is measured and hedged); once text has been
+returned the stream is not retried.
+
+Blocking SDK calls cannot be cancelled: a call that missed its deadline or
+lost a hedge keeps running on the worker pool and still updates its
+model's latency and health when it finishes.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import log, observe
+
+
+# --- Configuration ---
+DEFAULT_TIMEOUT = float(os.environ.get("FITGENIE_GENERATION_TIMEOUT", "30"))  # Seconds per attempt
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.25         # Seconds; the n-th retry waits up to BACKOFF_BASE * 2**(n - 1)
+BACKOFF_MAX = 4.0
+HEDGE_QUANTILE = 0.95       # Hedge once the primary is slower than this share of its recent calls
+DEFAULT_HEDGE_DELAY = 5.0   # Seconds, until a model has MIN_SAMPLES latencies
+MIN_SAMPLES = 20
+LATENCY_WINDOW = 200        # Recent latencies kept per model
+MAX_HEDGE_RATIO = 0.1       # Share of requests that may be hedged
+FAILURE_THRESHOLD = 5       # Consecutive failures that open a model's circuit
+COOLDOWN_SECONDS = 30.0
+POOL_WORKERS = 32
+
+
+class GenerationError(RuntimeError):
+    """Every attempt on every available model failed or timed out."""
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open trial after a cooldown."""
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opens = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self._opened_at < self.cooldown else "half-open"
+
+    def allow(self):
+        """May a call go to this model now? In half-open state only one trial call may."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or (self._opened_at is None and self.failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._trial = False
+                self.opens += 1
+
+
+class LatencyWindow:
+    """Latencies of a model's recent successful calls."""
+
+    def __init__(self, size=LATENCY_WINDOW):
+        self._values = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._values.append(seconds)
+
+    def quantile(self, q, min_samples=MIN_SAMPLES):
+        with self._lock:
+            if len(self._values) < min_samples:
+                return None
+            values = sorted(self._values)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class _FailureClaim:
+    """Lets only the first of the deadline and the call's own error count a call's failure."""
+
+    def __init__(self):
+        self._claimed = False
+        self._lock = threading.Lock()
+
+    def claim(self):
+        with self._lock:
+            claimed, self._claimed = self._claimed, True
+        return not claimed
+
+
+class _Slot:
+    """One model with its health and latency bookkeeping."""
+
+    def __init__(self, name, model, breaker):
+        self.name = name
+        self.model = model
+        self.breaker = breaker
+        self.latency = {False: LatencyWindow(), True: LatencyWindow()}  # Keyed by stream: full answer / first chunk
+
+
+class GenerationClient:
+    """Deadlines, retries, hedging and circuit breaking over (name, model) pairs, primary first."""
+
+    def __init__(self, models, timeout=DEFAULT_TIMEOUT, max_attempts=MAX_ATTEMPTS, hedge=True,
+                 hedge_quantile=HEDGE_QUANTILE, default_hedge_delay=DEFAULT_HEDGE_DELAY,
+                 max_hedge_ratio=MAX_HEDGE_RATIO, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN_SECONDS, seed=None):
+        if not models:
+            raise ValueError("GenerationClient needs at least one model")
+        self._slots = [_Slot(name, model, CircuitBreaker(failure_threshold, cooldown)) for name, model in models]
+        self.model_name = self._slots[0].name
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.hedge = hedge and len(self._slots) > 1
+        self.hedge_quantile = hedge_quantile
+        self.default_hedge_delay = default_hedge_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._random = random.Random(seed)
+        self._pool = ThreadPoolExecutor(max_workers=POOL_WORKERS, thread_name_prefix="generation")
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "timeouts": 0, "errors": 0}
+
+    # --- Public API (same shape as genai.GenerativeModel) ---
+    def generate_content(self, prompt, stream=False, **kwargs):
+        """Answer a prompt; raises GenerationError when every attempt failed."""
+        if stream:
+            return self._stream(prompt, kwargs)
+        return self._call(lambda model: _complete(model, prompt, kwargs), stream=False)
+
+    def stats(self):
+        """Request counters plus the circuit state of every model."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["circuits"] = {
+            slot.name: {"state": slot.breaker.state, "opens": slot.breaker.opens} for slot in self._slots
+        }
+        return stats
+
+    # --- Internals ---
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _stream(self, prompt, kwargs):
+        first, rest = self._call(lambda model: _first_chunk(model, prompt, kwargs), stream=True)
+        if first is not None:
+            yield first
+        yield from rest
+
+    def _next_slot(self, exclude=()):
+        for slot in self._slots:
+            if slot not in exclude and slot.breaker.allow():
+                return slot
+        return None
+
+    def _hedge_delay(self, slot, stream):
+        p = slot.latency[stream].quantile(self.hedge_quantile)
+        return self.default_hedge_delay if p is None else p
+
+    def _may_hedge(self):
+        with self._lock:
+            return self._stats["hedges"] < self.max_hedge_ratio * self._stats["requests"]
+
+    def _run(self, slot, invoke, stream, failure):
+        """Worker: one call to one model, recorded in its latency window and breaker."""
+        start = time.perf_counter()
+        try:
+            result = invoke(slot.model)
+        except Exception:
+            seconds = time.perf_counter() - start
+            if failure.claim():  # Not already counted as a timeout
+                slot.breaker.record_failure()
+            observe("generation_attempt", seconds, model=slot.name, outcome="error")
+            raise
+        seconds = time.perf_counter() - start
+        slot.latency[stream].add(seconds)
+        slot.breaker.record_success()
+        observe("generation_attempt", seconds, model=slot.name, outcome="ok")
+        return result
+
+    def _call(self, invoke, stream):
+        self._count("requests")
+        last_error = None
+        failed = []
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self._count("retries")
+                time.sleep(self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))))
+
+            # Retries go to a model that has not failed this request yet, if one is available
+            primary = self._next_slot(exclude=failed) or self._next_slot()
+            if primary is None:
+                last_error = GenerationError("every model's circuit breaker is open")
+                continue
+            try:
+                return self._attempt(primary, invoke, stream)
+            except Exception as e:
+                last_error = e
+                failed.append(primary)
+                log(f"⚠️  Generation attempt {attempt + 1}/{self.max_attempts} on {primary.name} failed: {e}")
+
+        self._count("errors")
+        raise GenerationError(f"Generation failed after {self.max_attempts} attempts: {last_error}") from last_error
+
+    def _attempt(self, primary, invoke, stream):
+        """One deadline-bounded attempt on primary, hedged to the next model if it is slow."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        hedge_at = start + self._hedge_delay(primary, stream) if self.hedge else None
+        failures = {}
+
+        def submit(slot):
+            failure = _FailureClaim()
+            future = self._pool.submit(self._run, slot, invoke, stream, failure)
+            failures[future] = failure
+            return future
+
+        pending = {submit(primary): primary}
+        error = None
+
+        while pending:
+            now = time.monotonic()
+            until = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, _ = wait(pending, timeout=max(0.0, until - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                slot = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if slot is not primary:
+                    self._count("hedge_wins")
+                return result
+
+            if hedge_at is not None and time.monotonic() >= hedge_at and pending:
+                hedge_at = None  # At most one hedge per attempt
+                backup = self._next_slot(exclude=(primary,)) if self._may_hedge() else None
+                if backup is not None:
+                    self._count("hedges")
+                    log(f"🪂 {primary.name} slower than its p{self.hedge_quantile * 100:.0f}, hedging with {backup.name}")
+                    pending[submit(backup)] = backup
+            elif time.monotonic() >= deadline:
+                break
+
+        if pending:
+            # Deadline passed: count the stragglers as failures (a late success resets them,
+            # a late error is not counted again)
+            self._count("timeouts")
+            for future, slot in pending.items():
+                if failures[future].claim():
+                    slot.breaker.record_failure()
+            raise TimeoutError(f"No answer within {self.timeout:.1f} s from {', '.join(s.name for s in pending.values())}")
+        raise error
+
+
+def _complete(model, prompt, kwargs):
+    response = model.generate_content(prompt, **kwargs)
+    response.text  # Blocked/empty responses raise here, inside the attempt
+    return response
+
+
+def _first_chunk(model, prompt, kwargs):
+    """Start a streamed answer and wait for its first chunk: (chunk or None, iterator over the rest)."""
+    chunks = iter(model.generate_content(prompt, stream=True, **kwargs))
+    return next(chunks, None), chunks
@@ -0,0 +1,293 @@
+"""
+Incremental (delta) ingestion helpers for the FitGenie vector database.
+
+Every document stored in ChromaDB carries a content hash of its text plus
+metadata. On each ingestion run we compare the hashes of the incoming
+dataset with the ones already stored and only upsert new or changed
+documents, then delete documents whose doc_id vanished from the dataset.
+The live collection is updated in place, so it is never empty while the
+ingestion is running.
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+
+from metrics import log, span
+
+
+# --- Configuration ---
+HASH_KEY = "content_hash"   # Metadata field holding the per-document hash
+BATCH_SIZE = 100            # ChromaDB has limits on the size of a single write
+STAGING_SUFFIX = "__staging"
+BACKUP_SUFFIX = "__previous"  # The replaced live collection, kept until the swap has succeeded
+MODEL_METADATA_KEY = "embedding_model"  # Collection metadata recording the embedding model
+INGEST_STAMP_FILE = ".ingest_stamp"     # Touched in vector_db/ after every ingestion run that changed data
+
+
+def content_hash(document, metadata):
+    """Return a stable hash of a document's text and metadata."""
+    metadata = {key: value for key, value in metadata.items() if key != HASH_KEY}
+    payload = json.dumps(
+        {"text": document, "metadata": metadata},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def touch_ingest_stamp(vector_db_path):
+    """Record that the collections under vector_db_path changed."""
+    (Path(vector_db_path) / INGEST_STAMP_FILE).write_text(str(time.time_ns()))
+
+
+def read_ingest_stamp(vector_db_path):
+    """
+    Return a token that changes every time the collections are re-ingested.
+
+    Used by caches on the query side to invalidate their entries.
+    """
+    try:
+        return (Path(vector_db_path) / INGEST_STAMP_FILE).stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def fetch_existing_hashes(collection, page_size=1000, where=None):
+    """
+    Read the stored content hash of every document in a collection, or only
+    of the documents matching the `where` metadata filter.
+    """
+    hashes = {}
+
+    if where is None:
+        for offset in range(0, collection.count(), page_size):
+            page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+                hashes[doc_id] = (metadata or {}).get(HASH_KEY)
+        return hashes
+
+    offset = 0
+    while True:
+        page = collection.get(where=where, include=["metadatas"], limit=page_size, offset=offset)
+        for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+            hashes[doc_id] = (metadata or {}).get(HASH_KEY)
+        if len(page["ids"]) < page_size:
+            return hashes
+        offset += page_size
+
+
+def plan_sync(metadatas, ids, existing_hashes):
+    """
+    Work out what has to change to bring a collection in line with the dataset.
+
+    Expects every metadata dict to already carry its content hash.
+    Returns (indices of new/changed documents, ids of vanished documents).
+    """
+    changed = [
+        idx for idx, (doc_id, metadata) in enumerate(zip(ids, metadatas))
+        if existing_hashes.get(doc_id) != metadata[HASH_KEY]
+    ]
+
+    incoming = set(ids)
+    stale_ids = [doc_id for doc_id in existing_hashes if doc_id not in incoming]
+
+    return changed, stale_ids
+
+
+def _write_batches(collection, documents, metadatas, ids, batch_size, embed_fn=None, verb="upserted"):
+    """
+    Upsert documents into a collection in batches, reporting progress.
+
+    When embed_fn is given all documents are encoded up front in one call
+    (so the encoder can use its own batching and worker pool) and the
+    precomputed vectors are passed to ChromaDB.
+    """
+    total_batches = (len(documents) + batch_size - 1) // batch_size
+    embeddings = None
+    if embed_fn is not None:
+        with span("ingest_embedding", collection=collection.name):
+            embeddings = embed_fn(documents)
+
+    for i in range(0, len(documents), batch_size):
+        batch = dict(
+            documents=documents[i:i + batch_size],
+            metadatas=metadatas[i:i + batch_size],
+            ids=ids[i:i + batch_size]
+        )
+        if embeddings is not None:
+            batch["embeddings"] = embeddings[i:i + batch_size]
+
+        with span("ingest_upsert", collection=collection.name):
+            collection.upsert(**batch)
+
+        batch_num = (i // batch_size) + 1
+        log(f"  ✓ Batch {batch_num}/{total_batches} {verb} ({len(documents[i:i + batch_size])} documents)")
+
+
+def _rebuild_collection(client, name, documents, metadatas, ids, collection_metadata, batch_size, embed_fn):
+    """
+    Rebuild a collection from scratch without leaving the live one empty.
+
+    Documents are written into a staging collection first, which is then
+    swapped in for the live collection once it is complete. The live
+    collection is renamed aside rather than deleted, and only dropped once
+    the staging collection carries its name; if that rename fails, the old
+    collection is put back.
+    """
+    staging_name = f"{name}{STAGING_SUFFIX}"
+    backup_name = f"{name}{BACKUP_SUFFIX}"
+
+    for leftover in (staging_name, backup_name):
+        try:
+            client.delete_collection(name=leftover)
+        except Exception:
+            pass
+
+    staging = client.create_collection(name=staging_name, metadata=collection_metadata)
+
+    print(f"📦 Writing {len(documents)} documents into staging collection '{staging_name}'...")
+    _write_batches(staging, documents, metadatas, ids, batch_size, embed_fn, verb="added")
+
+    try:
+        live = client.get_collection(name=name)
+    except Exception:
+        live = None
+    if live is not None:
+        live.modify(name=backup_name)
+
+    try:
+        staging.modify(name=name)
+    except Exception:
+        if live is not None:
+            live.modify(name=name)
+        raise
+
+    if live is not None:
+        client.delete_collection(name=backup_name)
+        print(f"🗑️  Replaced existing collection '{name}'")
+    return client.get_collection(name=name)
+
+
+def _stored_model(client, name):
+    """Return the embedding model recorded on an existing collection, if any."""
+    try:
+        collection = client.get_collection(name=name)
+    except Exception:
+        return None
+    return (collection.metadata or {}).get(MODEL_METADATA_KEY)
+
+
+def sync_collection(client, name, documents, metadatas, ids, collection_metadata=None,
+                    rebuild=False, batch_size=BATCH_SIZE, embed_fn=None, model_name=None):
+    """
+    Bring a ChromaDB collection in line with the given documents.
+
+    In the default incremental mode only new or changed documents are
+    upserted and vanished ones are deleted. With rebuild=True the whole
+    collection is rebuilt in a staging collection and swapped in at the end.
+
+    embed_fn (texts -> embeddings) encodes documents explicitly instead of
+    relying on ChromaDB's default embedding function. model_name is recorded
+    in the collection metadata; if it differs from the model an existing
+    collection was built with, the collection is rebuilt.
+
+    Returns (collection, changed), where changed tells whether any document
+    was added, updated or deleted (always True for a rebuild).
+    """
+    if not documents:
+        raise ValueError(f"No documents to ingest into '{name}'; refusing to empty the collection")
+
+    # Stamp every document with its content hash so the next run can diff against it
+    metadatas = [
+        {**metadata, HASH_KEY: content_hash(document, metadata)}
+        for document, metadata in zip(documents, metadatas)
+    ]
+
+    if model_name is not None:
+        collection_metadata = {**(collection_metadata or {}), MODEL_METADATA_KEY: model_name}
+
+        stored_model = _stored_model(client, name)
+        if not rebuild and stored_model is not None and stored_model != model_name:
+            print(f"⚠️  '{name}' was embedded with '{stored_model}', not '{model_name}'; rebuilding")
+            rebuild = True
+
+    if rebuild:
+        collection = _rebuild_collection(
+            client, name, documents, metadatas, ids, collection_metadata, batch_size, embed_fn
+        )
+        return collection, True
+
+    collection = client.get_or_create_collection(name=name, metadata=collection_metadata)
+
+    existing_hashes = fetch_existing_hashes(collection)
+    changed, stale_ids = plan_sync(metadatas, ids, existing_hashes)
+
+    print(f"🔍 {len(changed)} new/changed, {len(stale_ids)} removed, "
+          f"{len(documents) - len(changed)} unchanged documents")
+
+    if changed:
+        _write_batches(
+            collection,
+            [documents[idx] for idx in changed],
+            [metadatas[idx] for idx in changed],
+            [ids[idx] for idx in changed],
+            batch_size,
+            embed_fn
+        )
+
+    for i in range(0, len(stale_ids), batch_size):
+        collection.delete(ids=stale_ids[i:i + batch_size])
+
+    if stale_ids:
+        print(f"  🗑️  Deleted {len(stale_ids)} documents no longer in the dataset")
+
+    return collection, bool(changed or stale_ids)
+
+
+def sync_stream(collection, items, where=None, batch_size=BATCH_SIZE, embed_fn=None):
+    """
+    Incrementally sync a stream of (document, metadata, id) items into a collection.
+
+    Like the incremental mode of sync_collection, but the items are consumed
+    lazily and new or changed documents are written batch by batch, so a
+    large source never has to be held in memory at once. Only the stored
+    documents matching `where` (e.g. the chunks of one source file) are
+    candidates for deletion, the rest of the collection is left alone.
+    Returns (documents written, documents unchanged, documents deleted).
+    """
+    existing_hashes = fetch_existing_hashes(collection, where=where)
+    seen = set()
+    pending = ([], [], [])
+    written = unchanged = 0
+
+    def flush():
+        nonlocal pending, written
+        if pending[0]:
+            _write_batches(collection, *pending, batch_size, embed_fn)
+            written += len(pending[0])
+            pending = ([], [], [])
+
+    for document, metadata, doc_id in items:
+        if doc_id in seen:
+            continue
+        seen.add(doc_id)
+
+        metadata = {**metadata, HASH_KEY: content_hash(document, metadata)}
+        if existing_hashes.get(doc_id) == metadata[HASH_KEY]:
+            unchanged += 1
+            continue
+
+        for values, value in zip(pending, (document, metadata, doc_id)):
+            values.append(value)
+        if len(pending[0]) >= batch_size:
+            flush()
+    flush()
+
+    stale_ids = [doc_id for doc_id in existing_hashes if doc_id not in seen]
+    for i in range(0, len(stale_ids), batch_size):
+        collection.delete(ids=stale_ids[i:i + batch_size])
+
+    return written, unchanged, len(stale_ids)
@@ -5,26 +5,43 @@ This script processes the processed_data.json and builds the vector database
 for the RAG pipeline using ChromaDB with SentenceTransformer embeddings.
 """
 
+import argparse
 import os
-import json
 from pathlib import Path
 import chromadb
 from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+
+from columnar import load_documents, resolve_data_path
+from embedding import DEFAULT_MODEL, add_embedding_args, make_embed_fn
+from flat_index import build_flat_index, has_flat_index
+from incremental import sync_collection, touch_ingest_stamp
+from lexical_index import build_lexical_index
+from metrics import print_stage_summary
+from query_intent import FITNESS_FACET_FIELDS, build_vocabulary, save_facets
+from query_router import load_centroids, save_centroid
+
+# Metadata fields kept in the vector database
+METADATA_FIELDS = ["title", "type", "body_part", "equipment", "level", "rating", "source"]
 
 
 def load_processed_data():
-    """Load processed fitness exercise data from processed_data.json."""
-    data_path = Path(__file__).parent.parent / "dataset" / "processed" / "processed_data.json"
-    print(f"📂 Loading data from: {data_path}")
-    
-    if not data_path.exists():
-        raise FileNotFoundError(f"Data file not found at {data_path}")
+    """
+    Load processed fitness exercise data.
+
+    Prefers fitness_data.json (megaGym merged with ExerciseDB, see
+    exercisedb.py) and falls back to the megaGym-only processed_data.json.
+    Uses the memory-mapped .arrow variant of either when it exists (see
+    columnar.py). The Arrow reader is lazy: exercises are yielded batch by batch.
+    """
+    processed_dir = Path(__file__).parent.parent / "dataset" / "processed"
+    data_path = processed_dir / "fitness_data.json"
+    if not resolve_data_path(data_path).exists():
+        data_path = processed_dir / "processed_data.json"
     
-    with open(data_path, 'r', encoding='utf-8') as f:
-        exercises = json.load(f)
+    data_path, count, exercises = load_documents(data_path, metadata_fields=METADATA_FIELDS)
+    print(f"📂 Loading data from: {data_path}")
     
-    print(f"✅ Loaded {len(exercises)} exercises")
+    print(f"✅ Loaded {count} exercises")
     return exercises
 
 
@@ -65,51 +82,69 @@ def prepare_documents(exercises):
     return documents, metadatas, ids
 
 
-def build_vector_database(documents, metadatas, ids):
-    """Build and persist the vector database using ChromaDB."""
+def build_vector_database(documents, metadatas, ids, rebuild=False, model_name=DEFAULT_MODEL,
+                          batch_size=None, workers=None, use_cache=True, vector_db_path=None):
+    """
+    Build or incrementally update the persisted vector database using ChromaDB.
+
+    By default only new or changed documents are re-embedded and documents
+    that vanished from the dataset are deleted. Pass rebuild=True to rebuild
+    the collection from scratch (the live collection stays queryable until
+    the rebuilt one is swapped in).
+
+    Documents are embedded explicitly with the SentenceTransformer model
+    model_name (see embedding.py); batch_size and workers tune the encoder.
+    Unchanged texts are served from the on-disk embedding cache unless
+    use_cache is False. vector_db_path overrides the default RAG_MODEL/vector_db.
+    """
     print("🚀 Building vector database with ChromaDB...")
     
     # Define the path for the vector database
-    vector_db_path = Path(__file__).parent.parent / "vector_db"
+    vector_db_path = Path(vector_db_path or Path(__file__).parent.parent / "vector_db")
     vector_db_path.mkdir(parents=True, exist_ok=True)
     
     print(f"📍 Vector database location: {vector_db_path}")
+    print(f"🔁 Mode: {'full rebuild' if rebuild else 'incremental'}")
+    print(f"🧠 Embedding model: {model_name}")
     
     # Initialize ChromaDB client with persistent storage
     client = chromadb.PersistentClient(path=str(vector_db_path))
     
-    # Delete existing collection if it exists (for fresh start)
-    try:
-        client.delete_collection(name="fitness_knowledge")
-        print("🗑️  Deleted existing collection")
-    except:
-        pass
+    encoder_options = {"model_name": model_name, "cache": use_cache}
+    if batch_size:
+        encoder_options["batch_size"] = batch_size
+    if workers:
+        encoder_options["workers"] = workers
     
-    # Create a new collection
-    collection = client.create_collection(
+    collection, changed = sync_collection(
+        client,
         name="fitness_knowledge",
-        metadata={"description": "Fitness exercises from megaGymDataset"}
+        documents=documents,
+        metadatas=metadatas,
+        ids=ids,
+        collection_metadata={"description": "Fitness exercises from megaGymDataset"},
+        rebuild=rebuild,
+        embed_fn=make_embed_fn(**encoder_options),
+        model_name=model_name
     )
     
-    # Add documents to the collection in batches (ChromaDB has limits)
-    batch_size = 100
-    total_batches = (len(documents) + batch_size - 1) // batch_size
+    # Facet vocabulary used to turn questions into metadata filters (see query_intent.py)
+    save_facets(vector_db_path, "fitness_knowledge", vocabulary=build_vocabulary(metadatas, FITNESS_FACET_FIELDS))
     
-    print(f"📦 Adding documents in {total_batches} batches...")
+    # BM25 index over the same texts, fused with vector hits at query time (see lexical_index.py)
+    build_lexical_index(vector_db_path, "fitness_knowledge", ids, documents)
     
-    for i in range(0, len(documents), batch_size):
-        batch_docs = documents[i:i + batch_size]
-        batch_metas = metadatas[i:i + batch_size]
-        batch_ids = ids[i:i + batch_size]
-        
-        collection.add(
-            documents=batch_docs,
-            metadatas=batch_metas,
-            ids=batch_ids
-        )
-        
-        batch_num = (i // batch_size) + 1
-        print(f"  ✓ Batch {batch_num}/{total_batches} added ({len(batch_docs)} documents)")
+    # Quantized copy of the vectors for the in-process NumPy backend (see flat_index.py)
+    if changed or not has_flat_index(vector_db_path, collection.name):
+        build_flat_index(vector_db_path, collection)
+    
+    # Mean embedding of the collection, used to route questions (see query_router.py)
+    if changed or collection.name not in load_centroids(vector_db_path):
+        save_centroid(vector_db_path, collection)
+    
+    # Invalidates cached answers on the query side (see response_cache.py), only if the data changed
+    if changed:
+        touch_ingest_stamp(vector_db_path)
     
     print(f"✅ Vector database built successfully!")
     print(f"   Total documents: {collection.count()}")
@@ -141,8 +176,22 @@ def test_vector_database(collection):
             print(f"      Body Part: {meta['body_part']}, Equipment: {meta['equipment']}")
 
 
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rebuild the collection from scratch instead of syncing only changed documents"
+    )
+    add_embedding_args(parser)
+    return parser.parse_args()
+
+
 def main():
     """Main execution function."""
+    args = parse_args()
+    
     print("=" * 60)
     print("💪 FitGenie Data Ingestion Pipeline")
     print("=" * 60)
@@ -155,10 +204,18 @@ def main():
         documents, metadatas, ids = prepare_documents(exercises)
         
         # Step 3: Build vector database
-        collection = build_vector_database(documents, metadatas, ids)
+        collection = build_vector_database(
+            documents, metadatas, ids,
+            rebuild=args.rebuild,
+            model_name=args.model,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            use_cache=not args.no_cache
+        )
         
         # Step 4: Test the database
         test_vector_database(collection)
+        print_stage_summary()
         
         print("\n" + "=" * 60)
         print("✅ Data ingestion complete!")
@@ -0,0 +1,363 @@
+"""
+Knowledge Base Ingestion Script for FitGenie RAG Model
+
+Chunks the guidance documents in knowledge_base/ (exercise alternatives,
+nutrition substitutes, safety warnings, ...) and keeps them in a third
+ChromaDB collection next to the fitness and nutrition ones.
+
+Files are streamed: they are read block by block and packed into
+overlapping chunks of whole sentences, so a large document is never loaded
+into memory at once. Chunk ids are derived from the chunk text, so on a
+re-run only new or edited chunks are embedded. A state file remembers the
+mtime, size and hash of every ingested file; unchanged files are not even
+read, which makes polling cheap enough for --watch.
+
+    python ingest_knowledge.py              # sync once
+    python ingest_knowledge.py --watch      # keep syncing as files change
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+import chromadb
+
+from embedding import add_embedding_args, make_embed_fn
+from flat_index import build_flat_index
+from incremental import MODEL_METADATA_KEY, sync_stream, touch_ingest_stamp
+from metrics import print_stage_summary
+
+# --- Configuration ---
+KNOWLEDGE_DIR = Path(__file__).parent.parent / "knowledge_base"
+COLLECTION_NAME = "knowledge_base"
+STATE_FILE = "knowledge_state.json"    # Written next to the collections in vector_db/
+FILE_PATTERNS = ("*.txt", "*.md")
+CHUNK_CHARS = 800                      # Upper bound on the length of a chunk
+OVERLAP_CHARS = 150                    # Trailing sentences repeated at the start of the next chunk
+BLOCK_CHARS = 64 * 1024                # Characters read from a file at a time
+WATCH_INTERVAL = 2.0                   # Seconds between polls in --watch mode
+
+# A sentence end followed by whitespace, or a blank line (paragraph break)
+_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n[ \t]*\n\s*")
+
+
+def _pieces(text, max_chars):
+    """Split text into whitespace-normalised pieces of at most max_chars, at word boundaries."""
+    piece, size = [], 0
+    for word in text.split():
+        if len(word) > max_chars:
+            if piece:
+                yield " ".join(piece)
+                piece, size = [], 0
+            for i in range(0, len(word), max_chars):
+                yield word[i:i + max_chars]
+            continue
+        if piece and size + 1 + len(word) > max_chars:
+            yield " ".join(piece)
+            piece, size = [], 0
+        size += len(word) + (1 if piece else 0)
+        piece.append(word)
+    if piece:
+        yield " ".join(piece)
+
+
+def _units(text, ends_paragraph, max_chars):
+    pieces = list(_pieces(text, max_chars))
+    for i, piece in enumerate(pieces):
+        yield piece, ends_paragraph and i == len(pieces) - 1
+    if not pieces and ends_paragraph:
+        yield "", True
+
+
+def iter_sentences(handle, max_chars, block_chars=BLOCK_CHARS):
+    """
+    Yield (sentence, ends_paragraph) pairs from a text stream, reading it
+    block by block. Sentences longer than max_chars are split at word
+    boundaries, so memory use is bounded by block_chars + max_chars.
+    """
+    buffer = ""
+    while True:
+        block = handle.read(block_chars)
+        buffer += block
+
+        position = 0
+        for match in _BOUNDARY.finditer(buffer):
+            if block and match.end() == len(buffer):
+                break  # The whitespace may continue in the next block
+            yield from _units(buffer[position:match.start()], match.group().count("\n") >= 2, max_chars)
+            position = match.end()
+        buffer = buffer[position:]
+
+        if not block:
+            yield from _units(buffer, True, max_chars)
+            return
+
+        if len(buffer) > max_chars:
+            # A long stretch without a sentence end: emit it up to the last word boundary
+            cut = max(buffer.rfind(" "), buffer.rfind("\n"))
+            cut = cut if cut > 0 else len(buffer)
+            yield from _units(buffer[:cut], False, max_chars)
+            buffer = buffer[cut:]
+
+
+def _tail(sentences, max_chars):
+    """The trailing sentences that fit into max_chars, for the overlap."""
+    tail, size = [], -1
+    for sentence in reversed(sentences):
+        if size + 1 + len(sentence) > max_chars:
+            break
+        tail.insert(0, sentence)
+        size += 1 + len(sentence)
+    return tail
+
+
+def iter_chunks(handle, chunk_chars=CHUNK_CHARS, overlap_chars=OVERLAP_CHARS, block_chars=BLOCK_CHARS):
+    """
+    Yield chunks of at most chunk_chars packed from whole sentences of a text stream.
+
+    Consecutive chunks of a paragraph share up to overlap_chars of trailing
+    sentences, so a point cut at a chunk border is complete in one of them.
+    A paragraph break always ends a chunk (without overlap): an edit then
+    only changes the chunks of its own paragraph, not everything after it.
+    """
+    if overlap_chars >= chunk_chars:
+        raise ValueError("overlap_chars must be smaller than chunk_chars")
+
+    window, size, fresh = [], -1, 0
+    for sentence, ends_paragraph in iter_sentences(handle, chunk_chars - overlap_chars, block_chars):
+        if sentence:
+            if fresh and size + 1 + len(sentence) > chunk_chars:
+                yield " ".join(window)
+                # The overlap plus this sentence must still fit into chunk_chars
+                window, fresh = _tail(window, min(overlap_chars, chunk_chars - len(sentence) - 1)), 0
+                size = len(" ".join(window)) if window else -1
+            window.append(sentence)
+            size += 1 + len(sentence)
+            fresh += 1
+
+        if ends_paragraph:
+            if fresh:
+                yield " ".join(window)
+            window, size, fresh = [], -1, 0
+
+
+def chunk_id(path, text):
+    """Content-derived chunk id: unchanged chunks keep their id (and embedding) across edits."""
+    digest = hashlib.sha256(f"{path.name}\n{text}".encode("utf-8")).hexdigest()
+    return f"kb_{path.stem}_{digest[:16]}"
+
+
+def file_signature(path):
+    """(mtime, size) of a file, compared before anything is read."""
+    stat = path.stat()
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_state(vector_db_path):
+    """Per-file signatures recorded by the previous run."""
+    try:
+        return json.loads((Path(vector_db_path) / STATE_FILE).read_text())
+    except (FileNotFoundError, ValueError):
+        return {"model": None, "files": {}}
+
+
+def save_state(vector_db_path, state):
+    """Write the state file atomically."""
+    path = Path(vector_db_path) / STATE_FILE
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2))
+    tmp_path.replace(path)
+
+
+def list_documents(knowledge_dir):
+    """Guidance files under knowledge_dir, by file name."""
+    paths = {}
+    for pattern in FILE_PATTERNS:
+        for path in sorted(Path(knowledge_dir).glob(pattern)):
+            paths[path.name] = path
+    return paths
+
+
+def iter_file_chunks(path, chunk_chars=CHUNK_CHARS, overlap_chars=OVERLAP_CHARS):
+    """Stream (document, metadata, id) items for the chunks of one guidance file."""
+    title = path.stem.replace("_", " ").title()
+    with open(path, encoding="utf-8", errors="replace") as handle:
+        for text in iter_chunks(handle, chunk_chars, overlap_chars):
+            metadata = {"source_file": path.name, "category": path.stem, "title": title}
+            yield f"{title}: {text}", metadata, chunk_id(path, text)
+
+
+def open_collection(client, model_name, state, rebuild=False):
+    """
+    Get the knowledge collection, dropping it (and the state) first when a
+    rebuild is requested or it was embedded with a different model.
+    """
+    try:
+        stored_model = (client.get_collection(name=COLLECTION_NAME).metadata or {}).get(MODEL_METADATA_KEY)
+    except Exception:
+        stored_model = None
+
+    if rebuild or (stored_model is not None and stored_model != model_name):
+        if not rebuild:
+            print(f"⚠️  '{COLLECTION_NAME}' was embedded with '{stored_model}', not '{model_name}'; rebuilding")
+        try:
+            client.delete_collection(name=COLLECTION_NAME)
+        except Exception:
+            pass
+        state["files"] = {}
+
+    state["model"] = model_name
+    return client.get_or_create_collection(
+        name=COLLECTION_NAME,
+        metadata={"description": "Guidance notes from knowledge_base/", MODEL_METADATA_KEY: model_name}
+    )
+
+
+def sync_knowledge_base(collection, knowledge_dir, state, embed_fn, chunk_chars=CHUNK_CHARS,
+                        overlap_chars=OVERLAP_CHARS):
+    """
+    One sync pass: re-chunk the files whose mtime/size and content hash
+    changed, embed only their new chunks and drop the chunks of edited or
+    deleted files that are gone. Updates `state` in place and returns the
+    names of the files that changed.
+    """
+    files = state.setdefault("files", {})
+    paths = list_documents(knowledge_dir)
+    changed = []
+
+    for name, path in paths.items():
+        try:
+            signature = file_signature(path)
+        except FileNotFoundError:
+            continue  # Deleted while scanning; handled on the next pass
+        recorded = files.get(name, {})
+        if all(recorded.get(key) == value for key, value in signature.items()):
+            continue
+
+        digest = file_hash(path)
+        if recorded.get("sha256") == digest:
+            files[name] = {**signature, "sha256": digest}  # Touched, not edited
+            continue
+
+        print(f"📄 {name}: chunking...")
+        written, unchanged, deleted = sync_stream(
+            collection,
+            iter_file_chunks(path, chunk_chars, overlap_chars),
+            where={"source_file": name},
+            embed_fn=embed_fn
+        )
+        print(f"  ✓ {written} new/changed, {unchanged} unchanged, {deleted} removed chunks")
+        files[name] = {**signature, "sha256": digest}
+        changed.append(name)
+
+    for name in [name for name in files if name not in paths]:
+        collection.delete(where={"source_file": name})
+        del files[name]
+        print(f"🗑️  {name}: removed")
+        changed.append(name)
+
+    return changed
+
+
+def run_sync(client, vector_db_path, knowledge_dir, state, embed_fn):
+    """A sync pass that persists the state and stamps the database if anything changed."""
+    collection = client.get_collection(name=COLLECTION_NAME)
+    changed = sync_knowledge_base(collection, knowledge_dir, state, embed_fn)
+    if changed:
+        save_state(vector_db_path, state)
+        # Quantized copy of the vectors for the in-process NumPy backend (see flat_index.py)
+        build_flat_index(vector_db_path, collection)
+        # Invalidates cached answers on the query side (see response_cache.py)
+        touch_ingest_stamp(vector_db_path)
+    return collection, changed
+
+
+def watch(client, vector_db_path, knowledge_dir, state, embed_fn, interval=WATCH_INTERVAL):
+    """Poll the knowledge base and sync whenever a file is added, edited or deleted."""
+    print(f"👀 Watching {knowledge_dir} every {interval:g}s (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(interval)
+            _, changed = run_sync(client, vector_db_path, knowledge_dir, state, embed_fn)
+            if changed:
+                print(f"🔄 Synced {', '.join(changed)}")
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+
+
+def test_vector_database(collection, embed_fn):
+    """Test the collection with a sample query."""
+    print("\n🧪 Testing knowledge base with sample queries...")
+
+    for query in ["what can I do instead of squats", "I feel chest pain during exercise"]:
+        results = collection.query(query_embeddings=embed_fn([query]).tolist(), n_results=2)
+
+        print(f"\n📝 Query: '{query}'")
+        for i, (doc, meta) in enumerate(zip(results["documents"][0], results["metadatas"][0]), 1):
+            print(f"   {i}. [{meta['source_file']}] {doc[:80]}")
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rebuild", action="store_true", help="Drop the collection and re-chunk every file")
+    parser.add_argument("--watch", action="store_true", help="Keep running and sync files as they change")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="Seconds between polls with --watch")
+    parser.add_argument("--knowledge-dir", default=str(KNOWLEDGE_DIR), help="Folder with the guidance documents")
+    add_embedding_args(parser)
+    return parser.parse_args()
+
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+
+    print("=" * 60)
+    print("📚 FitGenie Knowledge Base Ingestion Pipeline")
+    print("=" * 60)
+
+    vector_db_path = Path(__file__).parent.parent / "vector_db"
+    vector_db_path.mkdir(parents=True, exist_ok=True)
+    print(f"📍 Vector database location: {vector_db_path}")
+    print(f"📂 Knowledge base: {args.knowledge_dir}")
+
+    try:
+        client = chromadb.PersistentClient(path=str(vector_db_path))
+        embed_fn = make_embed_fn(
+            model_name=args.model, batch_size=args.batch_size, workers=args.workers, cache=not args.no_cache
+        )
+
+        state = load_state(vector_db_path)
+        open_collection(client, args.model, state, rebuild=args.rebuild)
+        collection, changed = run_sync(client, vector_db_path, args.knowledge_dir, state, embed_fn)
+        save_state(vector_db_path, state)
+        print(f"✅ {len(changed)} file(s) synced, {collection.count()} chunks in '{COLLECTION_NAME}'")
+
+        if args.watch:
+            watch(client, vector_db_path, args.knowledge_dir, state, embed_fn, interval=args.interval)
+        else:
+            test_vector_database(collection, embed_fn)
+        print_stage_summary()
+
+        print("\n" + "=" * 60)
+        print("✅ Knowledge base ingestion complete!")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ Error during ingestion: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    main()
@@ -5,26 +5,43 @@ This script processes the nutrition_data.json and builds the vector database
 for the RAG pipeline using ChromaDB with SentenceTransformer embeddings.
 """
 
-import json
+import argparse
 import os
 from pathlib import Path
 import chromadb
 from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+
+from columnar import load_documents
+from embedding import DEFAULT_MODEL, add_embedding_args, make_embed_fn
+from flat_index import build_flat_index, has_flat_index
+from incremental import sync_collection, touch_ingest_stamp
+from lexical_index import build_lexical_index
+from metrics import print_stage_summary
+from query_intent import NUTRIENT_FIELDS, build_ranges, numeric_nutrients, save_facets
+from query_router import load_centroids, save_centroid
+
+# Metadata fields kept in the vector database (avoid overly large metadata)
+METADATA_FIELDS = [
+    "name", "serving_size", "calories", "protein", "total_fat",
+    "carbohydrate", "fiber", "sugars", "source_file"
+]
 
 
 def load_processed_data():
-    """Load processed nutrition data from nutrition_data.json."""
+    """
+    Load processed nutrition data.
+
+    Uses the memory-mapped nutrition_data.arrow when it exists (see
+    columnar.py) and falls back to nutrition_data.json otherwise. With the
+    Arrow file only the metadata columns we keep are read, not all 60+
+    nutrient columns, and items are yielded batch by batch.
+    """
     data_path = Path(__file__).parent.parent / "dataset" / "processed" / "nutrition_data.json"
-    print(f"📂 Loading data from: {data_path}")
     
-    if not data_path.exists():
-        raise FileNotFoundError(f"Data file not found at {data_path}")
-    
-    with open(data_path, 'r', encoding='utf-8') as f:
-        nutrition_items = json.load(f)
+    data_path, count, nutrition_items = load_documents(data_path, metadata_fields=METADATA_FIELDS)
+    print(f"📂 Loading data from: {data_path}")
     
-    print(f"✅ Loaded {len(nutrition_items)} nutrition items")
+    print(f"✅ Loaded {count} nutrition items")
     return nutrition_items
 
 
@@ -47,7 +64,8 @@ def prepare_documents(nutrition_items):
         
         # Store metadata for filtering and retrieval
         metadata = item.get('metadata', {})
-        # Keep only essential metadata (avoid overly large metadata)
+        # Keep only essential metadata (avoid overly large metadata).
+        # The numeric copies (calories_kcal, protein_g, ...) allow range filters.
         metadatas.append({
             "name": str(metadata.get('name', 'unknown'))[:200],
             "serving_size": str(metadata.get('serving_size', ''))[:100],
@@ -57,7 +75,8 @@ def prepare_documents(nutrition_items):
             "carbohydrate": str(metadata.get('carbohydrate', '')),
             "fiber": str(metadata.get('fiber', '')),
             "sugars": str(metadata.get('sugars', '')),
-            "source_file": str(metadata.get('source_file', ''))
+            "source_file": str(metadata.get('source_file', '')),
+            **numeric_nutrients(metadata)
         })
         
         # Use the existing doc_id or create one
@@ -68,51 +87,70 @@ def prepare_documents(nutrition_items):
     return documents, metadatas, ids
 
 
-def build_vector_database(documents, metadatas, ids):
-    """Build and persist the vector database using ChromaDB."""
+def build_vector_database(documents, metadatas, ids, rebuild=False, model_name=DEFAULT_MODEL,
+                          batch_size=None, workers=None, use_cache=True, vector_db_path=None):
+    """
+    Build or incrementally update the persisted vector database using ChromaDB.
+
+    By default only new or changed documents are re-embedded and documents
+    that vanished from the dataset are deleted. Pass rebuild=True to rebuild
+    the collection from scratch (the live collection stays queryable until
+    the rebuilt one is swapped in).
+
+    Documents are embedded explicitly with the SentenceTransformer model
+    model_name (see embedding.py); batch_size and workers tune the encoder.
+    Unchanged texts are served from the on-disk embedding cache unless
+    use_cache is False. vector_db_path overrides the default RAG_MODEL/vector_db.
+    """
     print("🚀 Building vector database with ChromaDB...")
     
     # Define the path for the vector database (same as fitness)
-    vector_db_path = Path(__file__).parent.parent / "vector_db"
+    vector_db_path = Path(vector_db_path or Path(__file__).parent.parent / "vector_db")
     vector_db_path.mkdir(parents=True, exist_ok=True)
     
     print(f"📍 Vector database location: {vector_db_path}")
+    print(f"🔁 Mode: {'full rebuild' if rebuild else 'incremental'}")
+    print(f"🧠 Embedding model: {model_name}")
     
     # Initialize ChromaDB client with persistent storage
     client = chromadb.PersistentClient(path=str(vector_db_path))
     
-    # Delete existing nutrition collection if it exists (for fresh start)
-    try:
-        client.delete_collection(name="nutrition_knowledge")
-        print("🗑️  Deleted existing nutrition collection")
-    except:
-        pass
+    encoder_options = {"model_name": model_name, "cache": use_cache}
+    if batch_size:
+        encoder_options["batch_size"] = batch_size
+    if workers:
+        encoder_options["workers"] = workers
     
-    # Create a new collection for nutrition
-    collection = client.create_collection(
+    collection, changed = sync_collection(
+        client,
         name="nutrition_knowledge",
-        metadata={"description": "Nutrition data from nutrition.csv"}
+        documents=documents,
+        metadatas=metadatas,
+        ids=ids,
+        collection_metadata={"description": "Nutrition data from nutrition.csv"},
+        rebuild=rebuild,
+        embed_fn=make_embed_fn(**encoder_options),
+        model_name=model_name
     )
     
-    # Add documents to the collection in batches (ChromaDB has limits)
-    batch_size = 100
-    total_batches = (len(documents) + batch_size - 1) // batch_size
+    # Nutrient ranges used to turn questions into metadata filters (see query_intent.py)
+    numeric_keys = [key for key, _ in NUTRIENT_FIELDS.values()]
+    save_facets(vector_db_path, "nutrition_knowledge", ranges=build_ranges(metadatas, numeric_keys))
     
-    print(f"📦 Adding documents in {total_batches} batches...")
+    # BM25 index over the same texts, fused with vector hits at query time (see lexical_index.py)
+    build_lexical_index(vector_db_path, "nutrition_knowledge", ids, documents)
     
-    for i in range(0, len(documents), batch_size):
-        batch_docs = documents[i:i + batch_size]
-        batch_metas = metadatas[i:i + batch_size]
-        batch_ids = ids[i:i + batch_size]
-        
-        collection.add(
-            documents=batch_docs,
-            metadatas=batch_metas,
-            ids=batch_ids
-        )
-        
-        batch_num = (i // batch_size) + 1
-        print(f"  ✓ Batch {batch_num}/{total_batches} added ({len(batch_docs)} documents)")
+    # Quantized copy of the vectors for the in-process NumPy backend (see flat_index.py)
+    if changed or not has_flat_index(vector_db_path, collection.name):
+        build_flat_index(vector_db_path, collection)
+    
+    # Mean embedding of the collection, used to route questions (see query_router.py)
+    if changed or collection.name not in load_centroids(vector_db_path):
+        save_centroid(vector_db_path, collection)
+    
+    # Invalidates cached answers on the query side (see response_cache.py), only if the data changed
+    if changed:
+        touch_ingest_stamp(vector_db_path)
     
     print(f"✅ Vector database built successfully!")
     print(f"   Total documents: {collection.count()}")
@@ -144,8 +182,22 @@ def test_vector_database(collection):
             print(f"      Calories: {meta['calories']} kcal, Protein: {meta['protein']}")
 
 
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rebuild the collection from scratch instead of syncing only changed documents"
+    )
+    add_embedding_args(parser)
+    return parser.parse_args()
+
+
 def main():
     """Main execution function."""
+    args = parse_args()
+    
     print("=" * 60)
     print("🍎 FitGenie Nutrition Data Ingestion Pipeline")
     print("=" * 60)
@@ -158,10 +210,18 @@ def main():
         documents, metadatas, ids = prepare_documents(nutrition_items)
         
         # Step 3: Build vector database
-        collection = build_vector_database(documents, metadatas, ids)
+        collection = build_vector_database(
+            documents, metadatas, ids,
+            rebuild=args.rebuild,
+            model_name=args.model,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            use_cache=not args.no_cache
+        )
         
         # Step 4: Test the database
         test_vector_database(collection)
+        print_stage_summary()
         
         print("\n" + "=" * 60)
         print("✅ Nutrition data ingestion complete!")
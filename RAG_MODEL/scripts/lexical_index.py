@@ -0,0 +1,155 @@
+"""
+Compact BM25 lexical index for hybrid retrieval.
+
+Embedding search is good at "exercises that work the hamstrings" but often
+misses exact names such as "Barbell Deadlift" or "Greek yogurt". This module
+builds a BM25 inverted index over the same texts that are embedded, stores it
+next to the vector database (vector_db/lexical/<collection>.npz) and fuses
+its ranking with the vector ranking by reciprocal rank fusion.
+
+The postings are flat NumPy arrays in CSR layout with the BM25 weight of
+every (term, document) pair precomputed at build time, so a query is a few
+array slices and one scatter-add: well under a millisecond on the current
+corpus.
+"""
+
+import re
+from pathlib import Path
+
+import numpy as np
+
+
+# --- Configuration ---
+LEXICAL_DIR = "lexical"
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # Standard reciprocal rank fusion constant
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from", "how", "i", "in",
+    "is", "it", "me", "my", "of", "on", "or", "some", "that", "the", "this", "to", "what", "which",
+    "with", "you", "your",
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def index_path(vector_db_path, collection_name):
+    return Path(vector_db_path) / LEXICAL_DIR / f"{collection_name}.npz"
+
+
+class BM25Index:
+    """Inverted index with precomputed BM25 weights in CSR arrays."""
+
+    def __init__(self, ids, terms, offsets, postings, weights):
+        self.ids = ids            # Document ids, position = internal doc number
+        self.terms = terms        # Vocabulary, position = term number
+        self.offsets = offsets    # Postings of term t are [offsets[t], offsets[t + 1])
+        self.postings = postings  # Doc numbers
+        self.weights = weights    # BM25 weight of the term in that doc
+        self._term_ids = {term: i for i, term in enumerate(terms.tolist())}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids, documents, k1=BM25_K1, b=BM25_B):
+        """Build the index from document ids and texts."""
+        vocabulary = {}
+        term_docs = []   # per term: list of doc numbers
+        term_freqs = []  # per term: list of term frequencies
+        doc_lengths = np.zeros(len(documents), dtype=np.float32)
+
+        for doc, text in enumerate(documents):
+            tokens = tokenize(text)
+            doc_lengths[doc] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                term = vocabulary.setdefault(token, len(vocabulary))
+                if term == len(term_docs):
+                    term_docs.append([])
+                    term_freqs.append([])
+                term_docs[term].append(doc)
+                term_freqs[term].append(count)
+
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(docs) for docs in term_docs])
+        postings = np.fromiter((doc for docs in term_docs for doc in docs), dtype=np.int32, count=offsets[-1])
+        freqs = np.fromiter((tf for tfs in term_freqs for tf in tfs), dtype=np.float32, count=offsets[-1])
+
+        # BM25: idf(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(d) / avg_len))
+        n_docs = max(len(documents), 1)
+        doc_freqs = np.diff(offsets).astype(np.float32)
+        idf = np.log(1 + (n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        avg_length = float(doc_lengths.mean()) if len(documents) else 1.0
+        norm = k1 * (1 - b + b * doc_lengths[postings] / max(avg_length, 1e-9))
+        weights = np.repeat(idf, np.diff(offsets)) * freqs * (k1 + 1) / (freqs + norm)
+
+        terms = np.array(list(vocabulary), dtype=str)
+        return cls(np.array(ids, dtype=str), terms, offsets, postings, weights.astype(np.float32))
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp_path, ids=self.ids, terms=self.terms, offsets=self.offsets,
+                 postings=self.postings, weights=self.weights)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["ids"], data["terms"], data["offsets"], data["postings"], data["weights"])
+
+    def search(self, query, k=5):
+        """Return up to k (doc_id, score) pairs, best first."""
+        scores = None
+        for token in set(tokenize(query)):
+            term = self._term_ids.get(token)
+            if term is None:
+                continue
+            if scores is None:
+                scores = np.zeros(len(self.ids), dtype=np.float32)
+            start, end = self.offsets[term], self.offsets[term + 1]
+            scores[self.postings[start:end]] += self.weights[start:end]
+
+        if scores is None:
+            return []
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(str(self.ids[doc]), float(scores[doc])) for doc in top]
+
+
+def build_lexical_index(vector_db_path, collection_name, ids, documents):
+    """Build and persist the BM25 index for a collection; returns it."""
+    index = BM25Index.build(ids, documents)
+    index.save(index_path(vector_db_path, collection_name))
+    return index
+
+
+def load_lexical_index(vector_db_path, collection_name):
+    """Load a collection's BM25 index, or None if ingestion has not built one."""
+    path = index_path(vector_db_path, collection_name)
+    if not path.exists():
+        return None
+    return BM25Index.load(path)
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse several best-first lists of ids into one, by sum of 1 / (k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
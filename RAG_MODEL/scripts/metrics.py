@@ -0,0 +1,190 @@
+"""
+Per-stage latency metrics for the FitGenie pipeline.
+
+Wrap a stage in `with span("generation"):` and its duration is recorded in
+a latency histogram labelled with the stage name (and any extra labels such
+as the collection). The histograms can be exported in the Prometheus text
+format (GET /metrics on server.py), written to a file, or dumped at exit:
+
+    FITGENIE_METRICS_FILE=metrics.prom python app.py
+
+Switches (environment variables):
+- FITGENIE_METRICS=0 disables recording; span() then returns a shared no-op
+  context manager, so the instrumentation costs one function call.
+- FITGENIE_QUIET=1 silences the debug prints in the per-question hot path
+  (everything printed through log()).
+"""
+
+import atexit
+import bisect
+import os
+import threading
+import time
+from pathlib import Path
+
+
+# --- Configuration ---
+ENABLED = os.environ.get("FITGENIE_METRICS", "1") != "0"
+QUIET = os.environ.get("FITGENIE_QUIET", "0") == "1"
+METRICS_FILE = os.environ.get("FITGENIE_METRICS_FILE")
+
+STAGE_METRIC = "fitgenie_stage_duration_seconds"
+STAGE_HELP = "Duration of pipeline stages in seconds."
+# Prometheus-style latency buckets (seconds), from sub-millisecond lookups to slow LLM calls
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def log(*args, **kwargs):
+    """print() for hot-path debug output; silenced by FITGENIE_QUIET=1."""
+    if not QUIET:
+        print(*args, **kwargs)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values, per label set."""
+
+    def __init__(self, name, help_text, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # sorted label tuple -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def summary(self):
+        """{label tuple: {"count", "sum", "avg"}} for quick inspection."""
+        with self._lock:
+            return {
+                key: {"count": series[-1], "sum": series[-2], "avg": series[-2] / series[-1] if series[-1] else 0.0}
+                for key, series in self._series.items()
+            }
+
+    def export(self):
+        """Prometheus text exposition lines for this histogram."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = sorted((key, list(series)) for key, series in self._series.items())
+
+        for key, series in series_items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(key, le=_number(bound))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(key, le='+Inf')} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(key)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(key)} {series[-1]}")
+        return lines
+
+
+def _number(value):
+    return f"{value:g}"
+
+
+def _labels(key, **extra):
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def histogram(name=STAGE_METRIC, help_text=STAGE_HELP):
+    """Get or create a histogram by name."""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Histogram(name, help_text)
+        return _registry[name]
+
+
+def observe(stage, seconds, **labels):
+    """Record a stage duration measured by the caller (e.g. time to first token)."""
+    if ENABLED:
+        histogram().observe(seconds, stage=stage, **labels)
+
+
+class _Span:
+    __slots__ = ("stage", "labels", "start")
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = dict(self.labels, outcome="error") if exc_type is not None else self.labels
+        histogram().observe(time.perf_counter() - self.start, stage=self.stage, **labels)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(stage, **labels):
+    """Context manager timing a pipeline stage into the stage histogram."""
+    if not ENABLED:
+        return _NO_SPAN
+    return _Span(stage, labels)
+
+
+def export_prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    with _registry_lock:
+        histograms = list(_registry.values())
+    lines = [line for metric in histograms for line in metric.export()]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def write_metrics(path=None):
+    """Write the Prometheus text export to a file (atomically)."""
+    path = Path(path or METRICS_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(export_prometheus(), encoding="utf-8")
+    tmp_path.replace(path)
+    return path
+
+
+def print_stage_summary():
+    """Print average duration per stage, slowest first."""
+    rows = [
+        (dict(key), stats) for key, stats in histogram().summary().items()
+    ]
+    if not rows:
+        return
+    print("\n⏱️  Stage timings (avg over the session):")
+    for labels, stats in sorted(rows, key=lambda row: -row[1]["avg"]):
+        stage = labels.pop("stage", "?")
+        extra = ", ".join(f"{name}={value}" for name, value in labels.items())
+        print(f"   {stage}{f' ({extra})' if extra else ''}: {stats['avg'] * 1000:.1f} ms × {stats['count']}")
+
+
+if ENABLED and METRICS_FILE:
+    atexit.register(write_metrics)
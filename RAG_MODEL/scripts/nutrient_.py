@@ -1,87 +1,88 @@
-import pandas as pd
-import json
+import argparse
 import os
+from pathlib import Path
+
+from columnar import ARROW_SUFFIX
+from convert_engine import DEFAULT_CHUNKSIZE, convert_csv
+from nutrient_store import STORE_FILE, build_nutrient_store
 
 # --- Configuration ---
 # Path to nutrition.csv in the dataset/nutrition.csv folder
-INPUT_FILE = "../dataset/nutrition.csv/nutrition.csv" 
+INPUT_FILE = "../dataset/nutrition.csv/nutrition.csv"
 # Saves the output to the processed folder
 OUTPUT_FILE = "../dataset/processed/nutrition_data.json"
+
+# --- This is our "Semantic Chunk" ---
+# We select the most important, searchable fields for the
+# text blob that we will embed. Each entry is (label, CSV column, suffix).
+TEXT_FIELDS = [
+    ("Food", "name", ""),
+    ("Serving Size", "serving_size", ""),
+    ("Calories", "calories", " kcal"),
+    ("Protein", "protein", ""),
+    ("Total Fat", "total_fat", ""),
+    ("Carbohydrates", "carbohydrate", ""),
+    ("Fiber", "fiber", ""),
+    ("Sugars", "sugars", ""),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert the nutrition CSV into processed documents.")
+    parser.add_argument("--input", default=INPUT_FILE, help="CSV file to convert")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Where to write the processed documents")
+    parser.add_argument(
+        "--format",
+        choices=["json", "arrow"],
+        default="json",
+        help="Write a JSON array or a memory-mappable Arrow IPC file (needs pyarrow)"
+    )
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows per chunk read from the CSV")
+    args = parser.parse_args()
+
+    if args.format == "arrow":
+        args.output = str(Path(args.output).with_suffix(ARROW_SUFFIX))
+    return args
+
+
 def main():
-    print(f"Loading nutrition dataset from '{INPUT_FILE}'...")
-    
-    # 1. Load the CSV file using pandas
+    args = parse_args()
+    print(f"Loading nutrition dataset from '{args.input}'...")
+
+    # --- This is the Metadata ---
+    # We keep the *entire* row (metadata_columns=None), which stores
+    # all 60+ nutrients (vitamins, minerals, etc.) for the LLM to use
+    # *after* retrieval. Missing values are filled with an empty string.
     try:
-        # index_col=0 is used because your snippet shows a leading index column
-        df = pd.read_csv(INPUT_FILE, index_col=0) 
+        total = convert_csv(
+            args.input,
+            args.output,
+            id_prefix="nutrition",  # Create a unique ID
+            text_fields=TEXT_FIELDS,
+            metadata_columns=None,
+            # Add source file as good practice
+            extra_metadata={"source_file": os.path.basename(args.input)},
+            chunksize=args.chunksize
+        )
     except FileNotFoundError:
-        print(f"❌ Error: The file '{INPUT_FILE}' was not found.")
+        print(f"❌ Error: The file '{args.input}' was not found.")
         print("Please make sure it's in the 'dataset' folder.")
         return
+    except KeyError as e:
+        print(f"❌ Error: The CSV is missing an expected column: {e}")
+        return
     except Exception as e:
-        print(f"An error occurred loading the CSV: {e}")
+        print(f"An error occurred converting the CSV: {e}")
         return
 
-    # 2. Handle missing data
-    # We fill 'NaN' (Not a Number) values with an empty string
-    # or 0 for numeric fields to be safe.
-    df = df.fillna("")
-    print(f"Loaded {len(df)} food items. Processing...")
-
-    # Create the output directory if it doesn't exist
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-
-    all_processed_data = []
-
-    # 3. Iterate over every row in the dataset
-    for index, row in df.iterrows():
-        
-        # --- This is our "Semantic Chunk" ---
-        # We select the most important, searchable fields for the
-        # text blob that we will embed.
-        try:
-            text_to_embed = (
-                f"Food: {row['name']}\n"
-                f"Serving Size: {row['serving_size']}\n"
-                f"Calories: {row['calories']} kcal\n"
-                f"Protein: {row['protein']}\n"
-                f"Total Fat: {row['total_fat']}\n"
-                f"Carbohydrates: {row['carbohydrate']}\n"
-                f"Fiber: {row['fiber']}\n"
-                f"Sugars: {row['sugars']}"
-            )
-            
-            # --- This is the Metadata ---
-            # We convert the *entire* row into a dictionary.
-            # This stores all 60+ nutrients (vitamins, minerals, etc.)
-            # for the LLM to use *after* retrieval.
-            metadata = row.to_dict()
-            
-            # Add source file as good practice
-            metadata["source_file"] = os.path.basename(INPUT_FILE)
-            
-            # 4. Create the final JSON object for this row
-            processed_doc = {
-                "doc_id": f"nutrition-{index}", # Create a unique ID
-                "text_to_embed": text_to_embed,
-                "metadata": metadata
-            }
-            
-            all_processed_data.append(processed_doc)
-            
-        except KeyError as e:
-            print(f"⚠️ Warning: Skipping row {index} due to missing key: {e}")
-        except Exception as e:
-            print(f"⚠️ Warning: Skipping row {index} due to unexpected error: {e}")
-
-
-    # 5. Save all processed data to the final .json file
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(all_processed_data, f, indent=2, ensure_ascii=False)
+    # Typed per-100 g nutrient columns for range / top-N questions
+    store_file = Path(args.output).with_name(STORE_FILE.name)
+    store = build_nutrient_store(args.output, store_file)
 
     print(f"\nSuccess! 🚀")
-    print(f"Processed {len(all_processed_data)} documents.")
-    print(f"Your processed file is ready: '{OUTPUT_FILE}'")
+    print(f"Processed {total} documents.")
+    print(f"Your processed file is ready: '{args.output}'")
+    print(f"Numeric nutrient table ({len(store.columns)} columns): '{store_file}'")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,285 @@
+"""
+Typed, columnar nutrient table for structured nutrition queries.
+
+The processed nutrition documents keep every nutrient as display strings
+("0.1 g", "12 mg"), which is fine for the prompt but useless for questions
+like "highest protein per calorie under 200 kcal". This module parses them
+once into a NumPy table:
+
+- one float32 column per nutrient, named after its unit (protein_g,
+  vitamin_c_mg, calories_kcal, ...), mixed mass units converted to the
+  column's most common unit and every value scaled to per 100 g,
+- a sorted index per column, so a range filter is two binary searches,
+- top-N by a single nutrient or by a ratio of two (protein per kcal).
+
+The table is saved as dataset/processed/nutrient_store.npz by nutrient_.py
+(or by running this script) and answers queries in microseconds.
+
+    python nutrient_store.py                 # rebuild from the processed data
+    python nutrient_store.py --top protein_g --per calories_kcal --where "calories_kcal<200"
+"""
+
+import argparse
+import re
+from pathlib import Path
+
+import numpy as np
+
+from columnar import load_documents
+from query_intent import NUTRIENT_FIELDS
+
+
+# --- Configuration ---
+DATA_FILE = Path(__file__).parent.parent / "dataset" / "processed" / "nutrition_data.json"
+STORE_FILE = DATA_FILE.with_name("nutrient_store.npz")
+
+REFERENCE_GRAMS = 100.0                      # Values are normalized per 100 g
+TEXT_COLUMNS = {"name", "serving_size", "source_file"}
+MIN_NUMERIC_SHARE = 0.5                      # Columns with fewer parseable values are skipped
+DEFAULT_UNITS = {"calories": "kcal"}         # Unit of columns stored as bare numbers
+MASS_UNITS = {"g": 1.0, "mg": 1e-3, "mcg": 1e-6, "ug": 1e-6, "kg": 1e3}
+
+_AMOUNT = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*([a-zA-Zµ]*)\s*$")
+_OPERATORS = ("$gte", "$gt", "$lte", "$lt")
+
+
+def parse_quantity(value):
+    """"12.5 mg" -> (12.5, "mg"); bare numbers have unit ""; None if unparseable."""
+    match = _AMOUNT.match(str(value))
+    if not match:
+        return None
+    unit = match.group(2).lower().replace("µ", "u")
+    return float(match.group(1)), "mcg" if unit == "ug" else unit
+
+
+def _column_key(field, unit):
+    return f"{field}_{unit}" if unit else field
+
+
+class NutrientStore:
+    """Numeric nutrient columns with sorted indexes."""
+
+    def __init__(self, names, doc_ids, fields, units, values, order, sorted_values, valid):
+        self.names = names                  # Food name per row
+        self.doc_ids = doc_ids              # doc_id per row (matches the Chroma collection)
+        self.fields = fields                # Source field per column ("protein")
+        self.units = units                  # Unit per column ("g")
+        self.values = values                # float32 [column, row], NaN where missing
+        self.order = order                  # int32 [column, rank]: rows sorted by value, NaN last
+        self.sorted_values = sorted_values  # float32 [column, rank]
+        self.valid = valid                  # Non-NaN values per column
+        self.columns = {_column_key(field, unit): i for i, (field, unit) in enumerate(zip(fields.tolist(), units.tolist()))}
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def build(cls, items):
+        """Build the table from processed nutrition documents (dicts with doc_id/metadata)."""
+        names, doc_ids, parsed = [], [], {}
+
+        for row, item in enumerate(items):
+            metadata = item.get("metadata", {})
+            names.append(str(metadata.get("name", "")))
+            doc_ids.append(item.get("doc_id", f"nutrition_{row}"))
+
+            serving = parse_quantity(metadata.get("serving_size", ""))
+            scale = REFERENCE_GRAMS / serving[0] if serving and serving[1] == "g" and serving[0] > 0 else 1.0
+
+            for field, value in metadata.items():
+                if field in TEXT_COLUMNS:
+                    continue
+                quantity = parse_quantity(value)
+                if quantity is not None:
+                    parsed.setdefault(field, []).append((row, quantity[0] * scale, quantity[1]))
+
+        fields, units, columns = [], [], []
+        for field, entries in parsed.items():
+            if len(entries) < MIN_NUMERIC_SHARE * len(names):
+                continue
+
+            # Convert everything to the column's most common unit
+            counts = {}
+            for _, _, unit in entries:
+                counts[unit] = counts.get(unit, 0) + 1
+            unit = max(counts, key=counts.get)
+
+            column = np.full(len(names), np.nan, dtype=np.float32)
+            for row, amount, row_unit in entries:
+                if row_unit == unit or amount == 0:
+                    column[row] = amount
+                elif row_unit in MASS_UNITS and unit in MASS_UNITS:
+                    column[row] = amount * MASS_UNITS[row_unit] / MASS_UNITS[unit]
+
+            fields.append(field)
+            units.append(unit or DEFAULT_UNITS.get(field, ""))
+            columns.append(column)
+
+        values = np.vstack(columns) if columns else np.empty((0, len(names)), dtype=np.float32)
+        order = np.argsort(values, axis=1, kind="stable").astype(np.int32)  # NaN sorts last
+        sorted_values = np.take_along_axis(values, order, axis=1)
+        valid = np.count_nonzero(~np.isnan(values), axis=1).astype(np.int32)
+
+        return cls(np.array(names, dtype=str), np.array(doc_ids, dtype=str), np.array(fields, dtype=str),
+                   np.array(units, dtype=str), values, order, sorted_values, valid)
+
+    def save(self, path=STORE_FILE):
+        path = Path(path)
+        tmp_path = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp_path, names=self.names, doc_ids=self.doc_ids, fields=self.fields, units=self.units,
+                 values=self.values, order=self.order, sorted_values=self.sorted_values, valid=self.valid)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path=STORE_FILE):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(*(data[key] for key in
+                         ("names", "doc_ids", "fields", "units", "values", "order", "sorted_values", "valid")))
+
+    def column(self, key):
+        if key not in self.columns:
+            raise KeyError(f"Unknown nutrient column '{key}' (known: {', '.join(sorted(self.columns))})")
+        return self.columns[key]
+
+    def range(self, key, op, value):
+        """Rows whose `key` satisfies `op` ($lt, $lte, $gt, $gte) against value."""
+        c = self.column(key)
+        sorted_values = self.sorted_values[c, :self.valid[c]]
+        if op == "$gt":
+            return self.order[c, np.searchsorted(sorted_values, value, side="right"):self.valid[c]]
+        if op == "$gte":
+            return self.order[c, np.searchsorted(sorted_values, value, side="left"):self.valid[c]]
+        if op == "$lt":
+            return self.order[c, :np.searchsorted(sorted_values, value, side="left")]
+        if op == "$lte":
+            return self.order[c, :np.searchsorted(sorted_values, value, side="right")]
+        raise ValueError(f"Unsupported operator '{op}' (expected one of {', '.join(_OPERATORS)})")
+
+    def filter(self, limits):
+        """Rows matching every (key, op, value) limit; all rows without limits."""
+        limits = [limit for limit in limits if limit[0] in self.columns]
+        if not limits:
+            return np.arange(len(self), dtype=np.int32)
+
+        # Start from the narrowest range, then check the others on that subset
+        candidates = min((self.range(*limit) for limit in limits), key=len)
+        mask = np.ones(len(candidates), dtype=bool)
+        for key, op, value in limits:
+            column = self.values[self.column(key), candidates]
+            mask &= {"$gt": column > value, "$gte": column >= value,
+                     "$lt": column < value, "$lte": column <= value}[op]
+        return np.sort(candidates[mask])
+
+    def top(self, rows, key, per=None, descending=True, n=5):
+        """The n best rows by `key` (or key / per), skipping missing values."""
+        if per is None:
+            # Walk the precomputed sorted index instead of sorting again
+            c = self.column(key)
+            ranked = self.order[c, :self.valid[c]]
+            if len(rows) < len(self):
+                member = np.zeros(len(self), dtype=bool)
+                member[rows] = True
+                ranked = ranked[member[ranked]]
+            return ranked[::-1][:n] if descending else ranked[:n]
+
+        numerators = self.values[self.column(key), rows].astype(np.float64)
+        denominators = self.values[self.column(per), rows].astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(denominators > 0, numerators / denominators, np.nan)
+
+        keep = ~np.isnan(scores)
+        rows, scores = rows[keep], (scores[keep] if descending else -scores[keep])
+        if len(rows) > n:
+            best = np.argpartition(-scores, n - 1)[:n]
+            rows, scores = rows[best], scores[best]
+        return rows[np.argsort(-scores, kind="stable")]
+
+    def search(self, limits=(), ranking=None, n=5):
+        """Range filters plus an optional (key, per, descending) ranking; returns row numbers."""
+        rows = self.filter(limits)
+        if ranking is not None:
+            key, per, descending = ranking
+            return self.top(rows, key, per=per, descending=descending, n=n)
+        return rows[:n]
+
+    def describe_row(self, row, key=None, per=None):
+        """Render a row like the nutrition documents, for the prompt context."""
+        lines = [f"Food: {self.names[row]}", f"Serving Size: {REFERENCE_GRAMS:g} g"]
+        shown = [column for column, _ in NUTRIENT_FIELDS.values()] + [column for column in (key, per) if column]
+        for column in dict.fromkeys(shown):
+            if column in self.columns and not np.isnan(self.values[self.columns[column], row]):
+                lines.append(f"{self._label(column)}: {self._format(column, row)}")
+
+        if key in self.columns and per in self.columns:
+            numerator, denominator = self.values[self.columns[key], row], self.values[self.columns[per], row]
+            if denominator > 0:
+                per_unit = self.units[self.columns[per]] or self._label(per).lower()
+                lines.append(f"{self._label(key)} per {per_unit}: {numerator / denominator:.3g} {self.units[self.columns[key]]}".rstrip())
+        return "\n".join(lines)
+
+    def _label(self, column):
+        return str(self.fields[self.columns[column]]).replace("_", " ").title()
+
+    def _format(self, column, row):
+        c = self.columns[column]
+        return f"{self.values[c, row]:.4g} {self.units[c]}".rstrip()
+
+    def row_metadata(self, row):
+        """Metadata dict for a row, in the shape of the nutrition collection's metadata."""
+        metadata = {"name": str(self.names[row]), "doc_id": str(self.doc_ids[row])}
+        for field, (key, unit) in NUTRIENT_FIELDS.items():
+            if key in self.columns and not np.isnan(self.values[self.columns[key], row]):
+                metadata[field] = f"{self.values[self.columns[key], row]:.4g}" + ("" if unit == "kcal" else f" {unit}")
+        return metadata
+
+
+def build_nutrient_store(data_file=DATA_FILE, store_file=STORE_FILE):
+    """Build the table from the processed nutrition data and save it."""
+    _, _, items = load_documents(data_file)
+    store = NutrientStore.build(items)
+    store.save(store_file)
+    return store
+
+
+def load_nutrient_store(store_file=STORE_FILE):
+    """Load the saved table, or None if it has not been built."""
+    if not Path(store_file).exists():
+        return None
+    return NutrientStore.load(store_file)
+
+
+def _parse_limit(text):
+    match = re.match(r"^\s*(\w+)\s*(<=|>=|<|>)\s*(-?\d+(?:\.\d+)?)\s*$", text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"Expected e.g. 'calories_kcal<200', got '{text}'")
+    op = {"<": "$lt", "<=": "$lte", ">": "$gt", ">=": "$gte"}[match.group(2)]
+    return match.group(1), op, float(match.group(3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the numeric nutrient table")
+    parser.add_argument("--data", default=str(DATA_FILE), help="Processed nutrition documents")
+    parser.add_argument("--store", default=str(STORE_FILE), help="Where the table is saved")
+    parser.add_argument("--where", type=_parse_limit, action="append", default=[], help="Range filter, e.g. 'protein_g>=20'")
+    parser.add_argument("--top", help="Rank by this column, e.g. protein_g")
+    parser.add_argument("--per", help="Rank by --top divided by this column, e.g. calories_kcal")
+    parser.add_argument("--ascending", action="store_true", help="Lowest first")
+    parser.add_argument("-n", type=int, default=10, help="Rows to show (default: 10)")
+    args = parser.parse_args()
+
+    if not args.where and not args.top:
+        store = build_nutrient_store(args.data, args.store)
+        print(f"✅ Nutrient table: {len(store)} foods × {len(store.columns)} nutrient columns -> {args.store}")
+        return
+
+    store = load_nutrient_store(args.store)
+    if store is None:
+        raise SystemExit(f"❌ No nutrient table at {args.store}; run without --where/--top to build it")
+
+    ranking = (args.top, args.per, not args.ascending) if args.top else None
+    for row in store.search(args.where, ranking, n=args.n):
+        print(store.describe_row(row, key=args.top, per=args.per).replace("\n", " | "))
+
+
+if __name__ == "__main__":
+    main()
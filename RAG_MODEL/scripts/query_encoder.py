@@ -0,0 +1,207 @@
+"""
+Micro-batching query encoder shared by concurrent requests.
+
+Encoding one short question takes a full forward pass of the embedding
+model, and a batch of 16 costs little more than a batch of one: on CPU most
+of the time goes into per-call overhead, not per-text work. When several
+requests arrive at once (server.py runs up to --max-inflight pipelines),
+encoding each question on its own leaves that throughput unused.
+
+QueryEncoder puts every question on a queue served by one background
+thread. The thread takes the first waiting question, collects whatever
+else arrives within max_wait_ms of it (or until max_batch questions are
+waiting), encodes the batch with a single encode() call and hands each
+vector back to its caller. Questions that queue up while a batch is being
+encoded have already waited past their window and go out with the next
+batch straight away, so under load batches grow on their own while the
+wait a question adds is bounded by max_wait_ms (plus the batch in front of
+it). Cached questions (see embedding_cache.py) never enter the queue.
+
+The encoder can run on ONNX Runtime, optionally with int8-quantized
+weights, instead of torch (backend "onnx" / "onnx-int8", see
+embedding.load_encoder). Quantized vectors differ slightly from the torch
+ones the collections were built with, so they are cached separately.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from embedding import DEFAULT_MODEL, _resolve_cache, load_encoder
+from embedding_cache import text_hash
+from metrics import log, observe
+
+
+# --- Configuration ---
+DEFAULT_MAX_BATCH = int(os.environ.get("FITGENIE_QUERY_BATCH_SIZE", "32"))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get("FITGENIE_QUERY_BATCH_WAIT_MS", "2"))
+DEFAULT_BACKEND = os.environ.get("FITGENIE_QUERY_BACKEND", "torch")  # "torch", "onnx" or "onnx-int8"
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+class _Request:
+    __slots__ = ("text", "key", "future", "enqueued")
+
+    def __init__(self, text, key):
+        self.text = text
+        self.key = key
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class QueryEncoder:
+    """Encodes query texts from many threads in shared batches; one per model and backend."""
+
+    def __init__(self, model_name=DEFAULT_MODEL, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 backend=DEFAULT_BACKEND, cache=True):
+        self.model_name = model_name
+        self.max_batch = max(1, max_batch)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.backend = backend
+        # Quantized/ONNX vectors must not be served to a torch caller, or vice versa
+        self.cache_key = model_name if backend == "torch" else f"{model_name}@{backend}"
+        self._cache = _resolve_cache(cache)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "cache_hits": 0, "batches": 0, "encoded": 0, "largest_batch": 0, "errors": 0}
+        self._waits = {"total": 0.0, "max": 0.0}
+
+    # --- Public API ---
+    def submit(self, text):
+        """Queue a text; returns a Future resolving to its normalized float32 vector."""
+        self._count("requests")
+        key = text_hash(text)
+        if self._cache is not None:
+            found = self._cache.get_many(self.cache_key, [key])
+            if key in found:
+                self._count("cache_hits")
+                future = Future()
+                future.set_result(found[key])
+                return future
+
+        request = _Request(text, key)
+        self._ensure_worker()
+        self._queue.put(request)
+        return request.future
+
+    def encode(self, text, timeout=None):
+        """Encode one text, sharing the model call with concurrent callers."""
+        return self.submit(text).result(timeout)
+
+    def warm_up(self):
+        """Load the model now instead of on the first question."""
+        load_encoder(self.model_name, self.backend)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            waits = dict(self._waits)
+        queued = stats["requests"] - stats["cache_hits"]
+        stats["mean_batch"] = round(stats["encoded"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["mean_wait_ms"] = round(waits["total"] / queued * 1000, 3) if queued else 0.0
+        stats["max_wait_ms"] = round(waits["max"] * 1000, 3)
+        stats.update(backend=self.backend, max_batch=self.max_batch, wait_bound_ms=self.max_wait_ms)
+        return stats
+
+    def close(self):
+        """Stop the worker thread once the queued texts are encoded."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    # --- Internals ---
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._serve, name=f"query-encoder-{self.backend}", daemon=True)
+                self._thread.start()
+
+    def _collect(self, first):
+        """The first request plus whatever else arrives within max_wait_ms of it, up to max_batch."""
+        batch = [first]
+        deadline = first.enqueued + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # Finish this batch, then stop
+                break
+            batch.append(request)
+        return batch
+
+    def _serve(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            started = time.monotonic()
+            for request in batch:
+                waited = started - request.enqueued
+                observe("query_encoder", waited, step="wait")
+                with self._lock:
+                    self._waits["total"] += waited
+                    self._waits["max"] = max(self._waits["max"], waited)
+            try:
+                vectors = self._encode_batch(batch)
+            except Exception as e:
+                self._count("errors")
+                log(f"⚠️  Query encoding failed for a batch of {len(batch)}: {e}")
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            for request in batch:
+                request.future.set_result(vectors[request.key])
+
+    def _encode_batch(self, batch):
+        """Encode the distinct texts of a batch in one model call: {text hash: vector}."""
+        unique = {request.key: request.text for request in batch}
+        start = time.perf_counter()
+        embeddings = np.asarray(load_encoder(self.model_name, self.backend).encode(
+            list(unique.values()),
+            batch_size=len(unique),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        ), dtype=np.float32)
+        observe("query_encoder", time.perf_counter() - start, step="encode")
+
+        vectors = dict(zip(unique, embeddings))
+        if self._cache is not None:
+            self._cache.put_many(self.cache_key, vectors.items())
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["encoded"] += len(unique)
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(unique))
+        return vectors
+
+
+def get_query_encoder(model_name=DEFAULT_MODEL):
+    """The process-wide QueryEncoder for a model, configured from the environment."""
+    with _shared_lock:
+        if model_name not in _shared:
+            _shared[model_name] = QueryEncoder(model_name)
+        return _shared[model_name]
+
+
+def encoder_stats():
+    """stats() of every shared QueryEncoder, keyed by model name."""
+    with _shared_lock:
+        encoders = dict(_shared)
+    return {model_name: encoder.stats() for model_name, encoder in encoders.items()}
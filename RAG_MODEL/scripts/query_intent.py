@@ -0,0 +1,313 @@
+"""
+Query intent parsing for metadata pre-filtering.
+
+Every question used to be scored against the whole collection, so "beginner
+leg workout with dumbbells" happily returned expert barbell chest exercises
+that then wasted prompt space. This module turns the facets a question
+mentions into ChromaDB `where` filters, so the vector search only ranks
+documents that can actually answer it:
+
+- Exercise facets (body part, equipment, level, type) are matched against
+  vocabularies collected from the metadata at ingest time (facets.json in
+  the vector_db folder), plus a few everyday synonyms ("legs", "abs").
+- Nutrient limits ("under 200 kcal", "at least 20 g protein") become range
+  filters on the numeric nutrition metadata written by ingest_nutrient.py.
+- Nutrient rankings ("highest protein", "protein per calorie") are answered
+  from the numeric nutrient table instead (see nutrient_store.py).
+"""
+
+import json
+import re
+from pathlib import Path
+
+
+# --- Configuration ---
+FACETS_FILE = "facets.json"
+
+# Exercise metadata fields whose values are matched against the query
+FITNESS_FACET_FIELDS = ["body_part", "equipment", "level", "type"]
+
+# Numeric nutrition metadata: source field -> (metadata key, unit)
+NUTRIENT_FIELDS = {
+    "calories": ("calories_kcal", "kcal"),
+    "protein": ("protein_g", "g"),
+    "total_fat": ("total_fat_g", "g"),
+    "carbohydrate": ("carbohydrate_g", "g"),
+    "fiber": ("fiber_g", "g"),
+    "sugars": ("sugars_g", "g"),
+}
+
+# Values too generic to be recognised in free text
+IGNORED_VALUES = {"", "unknown", "other"}
+
+# Everyday words -> vocabulary values. Only values present in the ingested
+# vocabulary are used, so these never produce filters that match nothing.
+SYNONYMS = {
+    "body_part": {
+        "leg": ["Quadriceps", "Hamstrings", "Glutes", "Calves", "Adductors", "Abductors"],
+        "quad": ["Quadriceps"],
+        "hamstring": ["Hamstrings"],
+        "glute": ["Glutes"],
+        "butt": ["Glutes"],
+        "ab": ["Abdominals"],
+        "core": ["Abdominals"],
+        "back": ["Lats", "Middle Back", "Lower Back", "Traps"],
+        "arm": ["Biceps", "Triceps", "Forearms"],
+        "bicep": ["Biceps"],
+        "tricep": ["Triceps"],
+        "shoulder": ["Shoulders"],
+        "pec": ["Chest"],
+        "calf": ["Calves"],
+    },
+    "equipment": {
+        "bodyweight": ["Body Only"],
+        "body weight": ["Body Only"],
+        "no equipment": ["Body Only"],
+        "kettlebell": ["Kettlebells"],
+        "band": ["Bands"],
+        "resistance band": ["Bands"],
+        "ez bar": ["E-Z Curl Bar"],
+        "foam roller": ["Foam Roll"],
+        "stability ball": ["Exercise Ball"],
+        "swiss ball": ["Exercise Ball"],
+    },
+    "level": {
+        "beginner": ["Beginner"],
+        "novice": ["Beginner"],
+        "advanced": ["Expert"],
+        "expert": ["Expert"],
+    },
+    "type": {
+        "stretch": ["Stretching"],
+        "plyometric": ["Plyometrics"],
+        "plyo": ["Plyometrics"],
+        "olympic lift": ["Olympic Weightlifting"],
+    },
+}
+
+# Words naming a nutrient in a limit phrase -> NUTRIENT_FIELDS key
+NUTRIENT_WORDS = {
+    "kcal": "calories", "calorie": "calories", "calories": "calories", "cal": "calories", "cals": "calories",
+    "protein": "protein",
+    "fat": "total_fat", "fats": "total_fat",
+    "carb": "carbohydrate", "carbs": "carbohydrate", "carbohydrate": "carbohydrate", "carbohydrates": "carbohydrate",
+    "fiber": "fiber", "fibre": "fiber",
+    "sugar": "sugars", "sugars": "sugars",
+}
+
+_OPERATORS = {
+    "under": "$lt", "below": "$lt", "less than": "$lt", "fewer than": "$lt", "<": "$lt",
+    "at most": "$lte", "no more than": "$lte", "max": "$lte", "<=": "$lte",
+    "over": "$gt", "above": "$gt", "more than": "$gt", ">": "$gt",
+    "at least": "$gte", "no less than": "$gte", "min": "$gte", ">=": "$gte",
+}
+_NUTRIENT_WORD = "|".join(sorted(map(re.escape, NUTRIENT_WORDS), key=len, reverse=True))
+_LIMIT = re.compile(
+    r"(?<!\w)(?P<op>" + "|".join(sorted(map(re.escape, _OPERATORS), key=len, reverse=True)) + r")\s*"
+    r"(?P<value>\d+(?:\.\d+)?)\s*"
+    r"(?:(?P<unit>kcal|cals?|calories|g|grams?|mg)\b\s*)?"
+    r"(?:of\s+)?(?P<nutrient>" + _NUTRIENT_WORD + r")?\b"
+)
+# Ranking words: "highest protein" ranks high first, "lowest sugar" low first.
+# Plain "low" is left out on purpose: "low calorie snacks" is a search, not a ranking.
+_RANK_DIRECTIONS = {
+    "high": True, "higher": True, "highest": True, "most": True, "best": True, "top": True,
+    "rich in": True, "richest in": True, "lots of": True, "max": True, "maximum": True,
+    "lowest": False, "least": False, "min": False, "minimum": False,
+}
+_RANKING = re.compile(
+    r"(?<!\w)(?P<direction>" + "|".join(sorted(map(re.escape, _RANK_DIRECTIONS), key=len, reverse=True)) + r")"
+    r"(?:\s+in)?[\s-]+(?P<nutrient>" + _NUTRIENT_WORD + r")\b"
+)
+_RATIO = re.compile(
+    r"(?<!\w)(?P<nutrient>" + _NUTRIENT_WORD + r")\s+(?:per|to|/)\s+(?:100\s+)?"
+    r"(?P<per>" + _NUTRIENT_WORD + r")\b"
+)
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_NON_WORD = re.compile(r"(?:[^\w<>=.]|(?<!\d)\.|\.(?!\d))+")
+
+
+def parse_amount(value):
+    """Read the leading number of a nutrient string ("12.5 g" -> 12.5), or None."""
+    match = _NUMBER.search(str(value))
+    return float(match.group()) if match else None
+
+
+def numeric_nutrients(metadata):
+    """Return the numeric nutrition metadata (calories_kcal, protein_g, ...) for an item."""
+    numeric = {}
+    for field, (key, _) in NUTRIENT_FIELDS.items():
+        amount = parse_amount(metadata.get(field, ""))
+        if amount is not None:
+            numeric[key] = amount
+    return numeric
+
+
+def build_vocabulary(metadatas, fields):
+    """Collect the distinct values of each categorical field, with their counts."""
+    vocabulary = {field: {} for field in fields}
+    for metadata in metadatas:
+        for field in fields:
+            value = str(metadata.get(field, "")).strip()
+            if value.lower() not in IGNORED_VALUES:
+                vocabulary[field][value] = vocabulary[field].get(value, 0) + 1
+    return vocabulary
+
+
+def build_ranges(metadatas, keys):
+    """Collect [min, max] of each numeric metadata key."""
+    ranges = {}
+    for metadata in metadatas:
+        for key in keys:
+            value = metadata.get(key)
+            if isinstance(value, (int, float)):
+                low, high = ranges.get(key, (value, value))
+                ranges[key] = (min(low, value), max(high, value))
+    return {key: list(bounds) for key, bounds in ranges.items()}
+
+
+def save_facets(vector_db_path, collection_name, vocabulary=None, ranges=None):
+    """Record a collection's facet vocabulary/ranges in vector_db/facets.json."""
+    path = Path(vector_db_path) / FACETS_FILE
+    facets = load_facets(vector_db_path)
+    facets[collection_name] = {"vocabulary": vocabulary or {}, "ranges": ranges or {}}
+
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(facets, indent=2, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def load_facets(vector_db_path):
+    """Load every collection's facets, or {} if ingestion has not recorded any."""
+    path = Path(vector_db_path) / FACETS_FILE
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _normalize(text):
+    return " " + _NON_WORD.sub(" ", text.lower()).strip() + " "
+
+
+def _term_pattern(term):
+    """Whole-word pattern for a term that also accepts a plural form."""
+    words = term.lower().replace("-", " ").split()
+    stem = re.escape(" ".join(words))
+    if words and words[-1].endswith("s") and len(words[-1]) > 3:
+        stem = stem[:-1]
+    return re.compile(r"(?<=\s)" + stem + r"(?:s|es)?(?=\s)")
+
+
+class QueryIntent:
+    """Facets found in a question and the ChromaDB filters they translate to."""
+
+    def __init__(self, categorical=None, limits=None, ranking=None):
+        self.categorical = categorical or {}  # field -> sorted list of values
+        self.limits = limits or []            # (metadata key, operator, value)
+        self.ranking = ranking                # (metadata key, per key or None, descending)
+
+    def __bool__(self):
+        return bool(self.categorical or self.limits or self.ranking)
+
+    def describe(self):
+        """Short human-readable summary of the facets, for logs."""
+        parts = [f"{field}={'|'.join(values)}" for field, values in self.categorical.items()]
+        parts += [f"{key} {op.strip('$')} {value:g}" for key, op, value in self.limits]
+        if self.ranking:
+            key, per, descending = self.ranking
+            parts.append(f"rank {key}{'/' + per if per else ''} {'desc' if descending else 'asc'}")
+        return ", ".join(parts)
+
+    def categorical_where(self):
+        """`where` clause for the exercise collection, or None."""
+        return _combine([
+            {field: values[0]} if len(values) == 1 else {field: {"$in": values}}
+            for field, values in self.categorical.items()
+        ])
+
+    def range_where(self):
+        """`where` clause for the nutrition collection, or None."""
+        return _combine([{key: {op: value}} for key, op, value in self.limits])
+
+    def signature(self):
+        """Stable key for the facets, so cached answers are only reused for the same filters."""
+        return self.describe() or None
+
+
+def _combine(clauses):
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def parse_query_intent(query, vocabularies):
+    """
+    Extract facets from a question.
+
+    `vocabularies` maps categorical field -> known values (any of the
+    collection vocabularies from load_facets() merged together); values that
+    are not in it are never produced.
+    """
+    text = _normalize(query)
+    categorical = {}
+
+    for field, values in vocabularies.items():
+        known = set(values)
+        terms = {value: [value] for value in known if value.lower() not in IGNORED_VALUES}
+        for word, targets in SYNONYMS.get(field, {}).items():
+            targets = [target for target in targets if target in known]
+            if targets:
+                terms[word] = targets
+
+        # Longest terms first, so "lower back" is not also read as "back"
+        remaining = text
+        matched = set()
+        for term in sorted(terms, key=len, reverse=True):
+            pattern = _term_pattern(term)
+            if pattern.search(remaining):
+                matched.update(terms[term])
+                remaining = pattern.sub(" ", remaining)
+        if matched:
+            categorical[field] = sorted(matched)
+
+    limits = []
+    for match in _LIMIT.finditer(text):
+        nutrient = match.group("nutrient")
+        unit = match.group("unit") or ""
+        if nutrient is None and unit.startswith(("kcal", "cal")):
+            nutrient = "calories"
+        if nutrient is None:
+            continue
+        key, expected_unit = NUTRIENT_FIELDS[NUTRIENT_WORDS[nutrient]]
+        if unit == "mg" and expected_unit == "g":
+            continue
+        limits.append((key, _OPERATORS[match.group("op")], float(match.group("value"))))
+
+    return QueryIntent(categorical, limits, _parse_ranking(text))
+
+
+def _nutrient_key(word):
+    return NUTRIENT_FIELDS[NUTRIENT_WORDS[word]][0]
+
+
+def _parse_ranking(text):
+    """(key, per, descending) for "protein per calorie", "highest protein", ... or None."""
+    ratio = _RATIO.search(text)
+    if ratio and NUTRIENT_WORDS[ratio.group("nutrient")] != NUTRIENT_WORDS[ratio.group("per")]:
+        return _nutrient_key(ratio.group("nutrient")), _nutrient_key(ratio.group("per")), True
+
+    rankings = [
+        (_nutrient_key(match.group("nutrient")), _RANK_DIRECTIONS[match.group("direction")])
+        for match in _RANKING.finditer(text)
+    ]
+    if not rankings:
+        return None
+
+    # "high protein, least calories" -> protein per calorie
+    highs = [key for key, descending in rankings if descending]
+    lows = [key for key, descending in rankings if not descending]
+    if highs and lows and highs[0] != lows[0]:
+        return highs[0], lows[0], True
+    key, descending = rankings[0]
+    return key, None, descending
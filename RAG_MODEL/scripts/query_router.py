@@ -0,0 +1,199 @@
+"""
+Query routing between the fitness and nutrition collections.
+
+"How do I do a barbell squat" does not need the nutrition collection, and
+the foods it returns only take prompt space. The router decides, per
+question, which collections to search and how many results to take from
+each, from two cheap signals:
+
+- keywords: exercise words ("workout", "reps", "squat") against food words
+  ("eat", "snack", "calories"), plus the facets query_intent.py already
+  found (body part / equipment / type filters are exercise facets,
+  nutrient limits and rankings are food facets);
+- centroids: the question's cosine similarity to the mean document
+  embedding of each collection, computed at ingest time and stored in
+  vector_db/centroids.json. The margin between the two similarities is
+  calibrated with the collections' own documents, so +1 means "as close to
+  the exercises as a typical exercise document" and -1 the same for foods
+  (short questions sit closer to one centroid than to the other regardless
+  of topic, so the raw margin has an offset).
+
+Both are combined into a probability that the question is about exercises.
+Only when it is above CONFIDENCE (or below 1 - CONFIDENCE), and the question
+does not contain words from both sides, is a single collection searched;
+otherwise both are, with the 2·k results split in
+proportion to the probability. Without centroids the keywords decide
+alone, and a question with no signal at all searches both as before.
+"""
+
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+from lexical_index import tokenize
+
+
+# --- Configuration ---
+CENTROIDS_FILE = "centroids.json"
+FITNESS_COLLECTION = "fitness_knowledge"
+NUTRITION_COLLECTION = "nutrition_knowledge"
+
+CONFIDENCE = 0.8           # Probability needed to search a single collection
+KEYWORD_WEIGHT = 1.5       # Log-odds per keyword or facet found
+CENTROID_WEIGHT = 2.0      # Log-odds of a question as close to one collection as its typical document
+MIN_SHARE = 2              # Results kept from the weaker collection when both are searched
+PAGE_SIZE = 1000
+
+FITNESS_KEYWORDS = {
+    "exercise", "exercises", "workout", "workouts", "train", "training", "lift", "lifting", "gym",
+    "rep", "reps", "set", "sets", "routine", "stretch", "stretches", "stretching", "cardio", "strength",
+    "muscle", "muscles", "squat", "squats", "deadlift", "deadlifts", "press", "curl", "curls", "row",
+    "rows", "lunge", "lunges", "plank", "planks", "pushup", "pushups", "pullup", "pullups", "crunch",
+    "crunches", "fly", "flyes", "raise", "raises", "dip", "dips", "warm", "mobility", "form",
+}
+NUTRITION_KEYWORDS = {
+    "eat", "eating", "ate", "food", "foods", "meal", "meals", "snack", "snacks", "diet", "nutrition",
+    "nutrient", "nutrients", "calorie", "calories", "kcal", "protein", "carb", "carbs", "carbohydrate",
+    "carbohydrates", "fat", "fats", "fiber", "fibre", "sugar", "sugars", "vitamin", "vitamins",
+    "breakfast", "lunch", "dinner", "drink", "drinks", "fruit", "fruits", "vegetable", "vegetables",
+    "recipe", "recipes", "healthy", "vegan", "vegetarian",
+}
+# Exercise facets that identify an exercise question (level words also describe diets)
+FITNESS_FACETS = ("body_part", "equipment", "type")
+
+
+def collection_mean(collection, page_size=PAGE_SIZE):
+    """(mean of a collection's normalized embeddings, count), or None if it is empty."""
+    total, count = None, 0
+    for offset in range(0, collection.count(), page_size):
+        page = np.asarray(
+            collection.get(include=["embeddings"], limit=page_size, offset=offset)["embeddings"], dtype=np.float32
+        )
+        if not len(page):
+            continue
+        total = page.sum(axis=0) if total is None else total + page.sum(axis=0)
+        count += len(page)
+    if total is None or not np.linalg.norm(total):
+        return None
+    return total / count, count
+
+
+def save_centroid(vector_db_path, collection):
+    """Record a collection's mean embedding in vector_db/centroids.json."""
+    mean = collection_mean(collection)
+    centroids = load_centroids(vector_db_path)
+    if mean is None:
+        centroids.pop(collection.name, None)
+    else:
+        vector, count = mean
+        centroids[collection.name] = {
+            "embedding_model": (collection.metadata or {}).get("embedding_model"),
+            "count": count,
+            "mean": [round(float(value), 6) for value in vector],
+        }
+
+    path = Path(vector_db_path) / CENTROIDS_FILE
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(centroids, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def load_centroids(vector_db_path):
+    """Load every collection's centroid entry, or {} if ingestion has not recorded any."""
+    try:
+        return json.loads((Path(vector_db_path) / CENTROIDS_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+class Route:
+    """Per-collection result counts for one question (0 = not searched)."""
+
+    def __init__(self, k_fitness, k_nutrition, p_fitness=None, reason="no signal"):
+        self.k_fitness = k_fitness
+        self.k_nutrition = k_nutrition
+        self.p_fitness = p_fitness
+        self.reason = reason
+
+    @property
+    def ks(self):
+        return self.k_fitness, self.k_nutrition
+
+    @property
+    def searches(self):
+        return (self.k_fitness > 0) + (self.k_nutrition > 0)
+
+    def describe(self):
+        """Short human-readable summary, for logs."""
+        p = f"p(fitness)={self.p_fitness:.2f}, " if self.p_fitness is not None else ""
+        return f"fitness k={self.k_fitness}, nutrition k={self.k_nutrition} ({p}{self.reason})"
+
+
+class QueryRouter:
+    """Decides which collections a question is searched in."""
+
+    def __init__(self, centroids=None, confidence=CONFIDENCE):
+        self.confidence = confidence
+        self.centroids = {}
+        self._difference = None
+        self._calibration = None
+
+        entries = {name: entry for name, entry in (centroids or {}).items() if entry.get("mean")}
+        if FITNESS_COLLECTION not in entries or NUTRITION_COLLECTION not in entries:
+            return
+        if entries[FITNESS_COLLECTION].get("embedding_model") != entries[NUTRITION_COLLECTION].get("embedding_model"):
+            return  # Similarities in two embedding spaces are not comparable
+
+        means = {name: np.asarray(entries[name]["mean"], dtype=np.float32)
+                 for name in (FITNESS_COLLECTION, NUTRITION_COLLECTION)}
+        self.centroids = {name: mean / np.linalg.norm(mean) for name, mean in means.items()}
+        self._difference = self.centroids[FITNESS_COLLECTION] - self.centroids[NUTRITION_COLLECTION]
+        # Average margin of each collection's documents (linear, so the mean embedding gives it)
+        fitness, nutrition = (float(means[name] @ self._difference) for name in (FITNESS_COLLECTION, NUTRITION_COLLECTION))
+        if fitness > nutrition:
+            self._calibration = ((fitness + nutrition) / 2, (fitness - nutrition) / 2)
+
+    def keyword_evidence(self, query, intent=None):
+        """(exercise hits, food hits) among the question's words and parsed facets."""
+        tokens = tokenize(query)
+        fitness = sum(token in FITNESS_KEYWORDS for token in tokens)
+        nutrition = sum(token in NUTRITION_KEYWORDS for token in tokens)
+        if intent:
+            fitness += sum(field in intent.categorical for field in FITNESS_FACETS)
+            nutrition += bool(intent.limits) + 2 * bool(intent.ranking)
+        return fitness, nutrition
+
+    def centroid_margin(self, query_embedding):
+        """
+        Calibrated cos(question, fitness centroid) - cos(question, nutrition
+        centroid): about +1 for exercise-like and -1 for food-like questions.
+        None without centroids.
+        """
+        if self._calibration is None or query_embedding is None:
+            return None
+        midpoint, half_gap = self._calibration
+        return (float(np.asarray(query_embedding, dtype=np.float32) @ self._difference) - midpoint) / half_gap
+
+    def route(self, query, query_embedding=None, intent=None, k=5):
+        """Route a question; query_embedding is its vector in the collections' embedding model."""
+        fitness, nutrition = self.keyword_evidence(query, intent)
+        margin = self.centroid_margin(query_embedding)
+        if not fitness and not nutrition and margin is None:
+            return Route(k, k)
+
+        logit = KEYWORD_WEIGHT * (fitness - nutrition) + CENTROID_WEIGHT * (margin or 0.0)
+        p_fitness = 1.0 / (1.0 + math.exp(-max(min(logit, 30.0), -30.0)))
+        reason = f"keywords {fitness}/{nutrition}" + (f", centroid margin {margin:+.3f}" if margin is not None else "")
+
+        # Words from both sides ("what to eat after a leg workout") always search both
+        mixed = fitness and nutrition
+        if p_fitness >= self.confidence and not mixed:
+            return Route(k, 0, p_fitness, reason)
+        if p_fitness <= 1.0 - self.confidence and not mixed:
+            return Route(0, k, p_fitness, reason)
+
+        # Unsure: search both, giving the likelier collection more of the 2·k results
+        k_fitness = min(max(round(2 * k * p_fitness), min(MIN_SHARE, k)), 2 * k - min(MIN_SHARE, k))
+        return Route(k_fitness, 2 * k - k_fitness, p_fitness, reason)
@@ -0,0 +1,174 @@
+"""
+Cross-encoder reranking of retrieved documents.
+
+The bi-encoder search ranks documents by how close their embedding is to the
+question's, which is cheap but coarse: weak hits from one collection take
+prompt space from strong hits in the other. A cross-encoder reads question
+and document together and scores their relevance directly. The Reranker
+scores an over-fetched candidate pool from all collections in one batched
+predict() call and keeps the best top_n overall.
+
+Reranking runs under a latency budget. The model call happens on a single
+background thread; if it does not finish within the budget (cold model,
+busy CPU, a request queued behind another one) the candidates are returned
+in their original vector order, so a request never waits longer than the
+budget for it. A call still waiting for the thread when its budget runs
+out is cancelled, and no call is queued while another one is waiting, so
+under load requests fall back right away instead of piling up stale work
+for the thread; a call that already started finishes and caches its
+scores.
+
+Scores are cached per (normalized question, document) pair; documents are
+keyed by a hash of their text, which also covers nutrient-table rows that
+have no collection id.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from embedding_cache import text_hash
+from metrics import log
+from response_cache import normalize_query
+
+
+# --- Configuration ---
+DEFAULT_MODEL = os.environ.get("FITGENIE_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+DEFAULT_BUDGET_MS = float(os.environ.get("FITGENIE_RERANK_BUDGET_MS", "150"))
+DEFAULT_CACHE_SIZE = 4096   # (question, document) scores kept in memory
+BATCH_SIZE = 32             # Pairs per cross-encoder forward pass
+
+_models = {}
+_model_lock = threading.Lock()
+
+
+def load_cross_encoder(model_name=DEFAULT_MODEL):
+    """Load a CrossEncoder once per process (sentence_transformers is imported on first use)."""
+    with _model_lock:
+        if model_name not in _models:
+            from sentence_transformers import CrossEncoder
+
+            log(f"🧠 Loading rerank model '{model_name}'...")
+            _models[model_name] = CrossEncoder(model_name, device="cpu")
+        return _models[model_name]
+
+
+class Reranker:
+    """Budgeted, cached cross-encoder reranking of (document, metadata) hits."""
+
+    def __init__(self, model_name=DEFAULT_MODEL, budget_ms=DEFAULT_BUDGET_MS, cache_size=DEFAULT_CACHE_SIZE):
+        self.model_name = model_name
+        self.budget_ms = budget_ms
+        self.cache_size = cache_size
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._failed = False
+        self._queued = 0            # Predictions submitted to the pool that have not started yet
+        self._stats = {"reranked": 0, "fallbacks": 0, "busy": 0, "cancelled": 0, "pairs_scored": 0,
+                       "pairs_cached": 0}
+
+    def warm_up(self):
+        """Start loading the model in the background so the first request does not pay for it."""
+        self._pool.submit(self._load)
+
+    def _load(self):
+        try:
+            return load_cross_encoder(self.model_name)
+        except Exception as e:
+            if not self._failed:
+                print(f"⚠️  Rerank model unavailable, keeping vector order: {e}")
+            self._failed = True
+            return None
+
+    def _cached(self, keys):
+        with self._lock:
+            found = {}
+            for key in keys:
+                if key in self._scores:
+                    self._scores.move_to_end(key)
+                    found[key] = self._scores[key]
+            return found
+
+    def _store(self, scores):
+        with self._lock:
+            self._scores.update(scores)
+            while len(self._scores) > self.cache_size:
+                self._scores.popitem(last=False)
+
+    def _submit(self, query, pending):
+        """Queue a prediction, or return None if another one is still waiting for the thread."""
+        with self._lock:
+            if self._queued:
+                self._stats["busy"] += 1
+                return None
+            self._queued += 1
+            self._stats["pairs_scored"] += len(pending)
+        return self._pool.submit(self._predict, query, pending)
+
+    def _predict(self, query, pending):
+        """Score the (key, document) pairs in one batched call and cache the scores."""
+        with self._lock:
+            self._queued -= 1
+        model = self._load()
+        if model is None:
+            return None
+        values = model.predict([(query, document) for _, document in pending], batch_size=BATCH_SIZE)
+        scores = {key: float(value) for (key, _), value in zip(pending, values)}
+        self._store(scores)
+        return scores
+
+    def rerank(self, query, hits, top_n, budget_ms=None):
+        """
+        Return (best top_n hits, reranked). hits are (document, metadata)
+        pairs in fallback order; reranked is False when the budget ran out
+        or the model is unavailable, and the first top_n hits are returned.
+        """
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        if len(hits) <= 1 or self._failed:
+            return hits[:top_n], False
+
+        normalized = normalize_query(query)
+        keys = [(normalized, text_hash(document)) for document, _ in hits]
+        scores = self._cached(keys)
+        pending = list({key: document for key, (document, _) in zip(keys, hits) if key not in scores}.items())
+
+        with self._lock:
+            self._stats["pairs_cached"] += len(keys) - len(pending)
+
+        if pending:
+            start = time.perf_counter()
+            future, scored = self._submit(query, pending), None
+            if future is None:
+                log("⏳ Rerank busy with an earlier request, keeping vector order")
+            else:
+                try:
+                    scored = future.result(timeout=max(budget_ms, 0) / 1000)
+                except TimeoutError:
+                    if future.cancel():
+                        # Never started: drop it rather than leave stale work queued
+                        with self._lock:
+                            self._queued -= 1
+                            self._stats["cancelled"] += 1
+                            self._stats["pairs_scored"] -= len(pending)
+                    log(f"⏳ Rerank exceeded its {budget_ms:.0f} ms budget, keeping vector order")
+                except Exception as e:
+                    print(f"⚠️  Rerank failed, keeping vector order: {e}")
+            if scored is None:
+                with self._lock:
+                    self._stats["fallbacks"] += 1
+                return hits[:top_n], False
+            scores.update(scored)
+            log(f"🎯 Reranked {len(hits)} candidates ({len(pending)} scored) in "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+        with self._lock:
+            self._stats["reranked"] += 1
+        order = sorted(range(len(hits)), key=lambda i: -scores[keys[i]])
+        return [hits[i] for i in order[:top_n]], True
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "cached_scores": len(self._scores)}
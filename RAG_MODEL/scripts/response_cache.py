@@ -0,0 +1,187 @@
+"""
+Semantic response cache for the FitGenie RAG pipeline.
+
+Users keep asking the same handful of questions, and every one of them pays
+for two retrievals plus a full Gemini call. This cache sits in front of
+get_rag_response() with two tiers:
+
+1. Exact tier: the normalized question text (case, punctuation and spacing
+   folded) maps straight to a cached answer.
+2. Semantic tier: if no exact match exists, the question's embedding is
+   compared with the embeddings of cached questions and the closest answer
+   is reused when the cosine similarity is above a threshold.
+
+Entries are evicted least-recently-used beyond `max_entries` and expire
+after `ttl_seconds`. Every entry also remembers the ingestion version it was
+produced under (see incremental.read_ingest_stamp()), so re-ingesting the
+collections invalidates all previously cached answers. An optional `scope`
+(the query's metadata filters, see query_intent.py) keeps the semantic tier
+from answering "beginner leg workout" with the cached "expert leg workout".
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+# --- Configuration ---
+DEFAULT_MAX_ENTRIES = int(os.environ.get("FITGENIE_RESPONSE_CACHE_SIZE", "512"))
+DEFAULT_TTL_SECONDS = float(os.environ.get("FITGENIE_RESPONSE_CACHE_TTL", "3600"))
+DEFAULT_SIMILARITY_THRESHOLD = float(os.environ.get("FITGENIE_RESPONSE_CACHE_THRESHOLD", "0.95"))
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Fold case, punctuation and whitespace so trivially different questions match."""
+    query = _PUNCTUATION.sub(" ", query.lower())
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class _Entry:
+    __slots__ = ("answer", "embedding", "created_at", "version", "scope")
+
+    def __init__(self, answer, embedding, created_at, version, scope=None):
+        self.answer = answer
+        self.embedding = embedding
+        self.created_at = created_at
+        self.version = version
+        self.scope = scope
+
+
+class ResponseCache:
+    """Two-tier (exact + semantic) LRU/TTL cache of generated answers."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 similarity_threshold=DEFAULT_SIMILARITY_THRESHOLD, version_fn=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.version_fn = version_fn or (lambda: None)
+
+        self._entries = OrderedDict()  # normalized query -> _Entry, oldest first
+        self._lock = threading.Lock()
+        self._matrix = None            # Stacked embeddings for the semantic tier
+        self._matrix_keys = []
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+
+    def _is_fresh(self, entry, now, version):
+        return entry.version == version and now - entry.created_at <= self.ttl_seconds
+
+    def _drop(self, key):
+        del self._entries[key]
+        self._matrix = None
+
+    def get_exact(self, query):
+        """Look the question up in the exact tier only. Does not count a miss."""
+        key = normalize_query(query)
+        now = time.time()
+        version = self.version_fn()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not self._is_fresh(entry, now, version):
+                self._drop(key)
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits_exact += 1
+            return entry.answer
+
+    def get_semantic(self, query_embedding, scope=None):
+        """
+        Look up the most similar cached question by embedding, among the
+        entries cached with the same scope.
+
+        Counts a miss when nothing is close enough, so callers should try
+        get_exact() first and call this once per question.
+        """
+        now = time.time()
+        version = self.version_fn()
+        query_embedding = _unit(query_embedding)
+
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if not self._is_fresh(entry, now, version)]:
+                self._drop(key)
+
+            if self._matrix is None:
+                self._matrix_keys = [key for key, entry in self._entries.items() if entry.embedding is not None]
+                self._matrix = (
+                    np.stack([self._entries[key].embedding for key in self._matrix_keys])
+                    if self._matrix_keys else None
+                )
+
+            if self._matrix is not None and self._matrix.shape[1] == query_embedding.shape[0]:
+                scores = self._matrix @ query_embedding
+                for i, key in enumerate(self._matrix_keys):
+                    if self._entries[key].scope != scope:
+                        scores[i] = -np.inf
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    key = self._matrix_keys[best]
+                    self._entries.move_to_end(key)
+                    self.hits_semantic += 1
+                    return self._entries[key].answer
+
+            self.misses += 1
+            return None
+
+    def get(self, query, query_embedding=None, scope=None):
+        """Try the exact tier, then (given an embedding) the semantic tier."""
+        answer = self.get_exact(query)
+        if answer is not None:
+            return answer
+
+        if query_embedding is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        return self.get_semantic(query_embedding, scope)
+
+    def put(self, query, answer, query_embedding=None, scope=None):
+        """Cache an answer for a question (and its embedding, for the semantic tier)."""
+        key = normalize_query(query)
+        embedding = _unit(query_embedding) if query_embedding is not None else None
+        entry = _Entry(answer, embedding, time.time(), self.version_fn(), scope)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def invalidate(self):
+        """Drop every cached answer."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self):
+        """Return hit/miss counters and the overall hit rate."""
+        with self._lock:
+            hits = self.hits_exact + self.hits_semantic
+            lookups = hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits_exact": self.hits_exact,
+                "hits_semantic": self.hits_semantic,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
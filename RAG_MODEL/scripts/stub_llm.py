@@ -0,0 +1,103 @@
+"""
+Deterministic local stand-in for a Gemini GenerativeModel.
+
+Lets the RAG pipeline, the HTTP server and the benchmarks run entirely
+offline. It mimics the parts of the google.generativeai API the pipeline
+uses: generate_content(prompt) returns an object with `.text`, and
+generate_content(prompt, stream=True) returns an iterator of such chunks.
+The answer is built from the question and the titles/foods found in the
+prompt's context, so the same prompt always produces the same answer.
+Latency can optionally grow with the prompt length, to model the prefill
+cost of a real model when comparing prompt sizes. Slow calls and failures
+can be injected at a given rate, to exercise the fault handling of
+generation_client.py.
+"""
+
+import random
+import re
+import time
+
+
+# --- Configuration ---
+DEFAULT_LATENCY = 0.05      # Seconds until the first chunk
+DEFAULT_CHUNK_DELAY = 0.005  # Seconds between streamed chunks
+WORDS_PER_CHUNK = 8
+CHARS_PER_TOKEN = 4
+
+_QUESTION = re.compile(r"\*\*User's Question:\*\*\s*(.*?)\s*\*\*", re.S)
+_ITEM = re.compile(r"^(?:Exercise Title|Food): (.+)$", re.M)
+
+
+class StubGenerationError(RuntimeError):
+    """Injected failure (stands in for a 5xx / quota error from the API)."""
+
+
+class StubResponse:
+    """Mimics a generate_content response (or a streamed chunk)."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGenerationModel:
+    """Offline, deterministic replacement for genai.GenerativeModel."""
+
+    def __init__(self, model_name="stub-llm", latency=DEFAULT_LATENCY, chunk_delay=DEFAULT_CHUNK_DELAY,
+                 prefill_per_1k_tokens=0.0, slow_rate=0.0, slow_latency=1.0, failure_rate=0.0, seed=None):
+        self.model_name = model_name
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.prefill_per_1k_tokens = prefill_per_1k_tokens  # Extra seconds per 1000 prompt tokens
+        self.slow_rate = slow_rate          # Share of calls that take slow_latency extra seconds
+        self.slow_latency = slow_latency
+        self.failure_rate = failure_rate    # Share of calls that raise StubGenerationError
+        self._random = random.Random(seed)
+        self.calls = 0
+
+    def first_token_delay(self, prompt):
+        delay = self.latency + self.prefill_per_1k_tokens * len(prompt) / CHARS_PER_TOKEN / 1000
+        if self.slow_rate and self._random.random() < self.slow_rate:
+            delay += self.slow_latency
+        return delay
+
+    def _maybe_fail(self, delay):
+        """Injected failures surface after part of the normal latency, like a server error."""
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            time.sleep(delay / 2)
+            raise StubGenerationError(f"{self.model_name}: injected failure")
+
+    def answer_for(self, prompt):
+        """Build the deterministic answer text for a prompt."""
+        match = _QUESTION.search(prompt)
+        question = match.group(1) if match else prompt.strip()[:80]
+        items = _ITEM.findall(prompt)[:3]
+
+        answer = f"For \"{question}\", "
+        if items:
+            answer += "the most relevant options are " + ", ".join(items) + "."
+        else:
+            answer += "I could not find matching information in the databases."
+        return answer + " Stay consistent and keep up the great work!"
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        answer = self.answer_for(prompt)
+        delay = self.first_token_delay(prompt)
+
+        if stream:
+            return self._stream(answer, delay)
+
+        self._maybe_fail(delay)
+        time.sleep(delay + self.chunk_delay * (len(answer.split()) // WORDS_PER_CHUNK))
+        return StubResponse(answer)
+
+    def _stream(self, answer, delay):
+        words = answer.split(" ")
+        self._maybe_fail(delay)
+        time.sleep(delay)
+
+        for i in range(0, len(words), WORDS_PER_CHUNK):
+            if i:
+                time.sleep(self.chunk_delay)
+            chunk = " ".join(words[i:i + WORDS_PER_CHUNK])
+            yield StubResponse(chunk if i + WORDS_PER_CHUNK >= len(words) else chunk + " ")
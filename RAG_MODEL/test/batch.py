@@ -0,0 +1,267 @@
+"""
+Batch question answering for the FitGenie RAG pipeline.
+
+Answers a whole file of questions (plan generation, evaluation sets)
+instead of one typed question at a time:
+
+1. all questions are embedded in one batched encoder call,
+2. retrieval and prompt assembly run for every question in a thread pool,
+3. generation calls are issued concurrently, at most --concurrency at a
+   time and at most --rpm per minute (the LLM quota),
+4. every answer is appended to the output file as soon as it completes.
+
+Input is JSONL with one {"id": ..., "query": ...} object per line (a bare
+JSON string works too; the id then defaults to the line number). Identical
+questions are generated once. Re-running with the same output file resumes:
+questions that already have an answer are skipped, failed ones are retried.
+
+    python batch.py questions.jsonl -o answers.jsonl --concurrency 8 --rpm 60
+    python batch.py questions.jsonl --stub-llm
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import app
+import metrics
+from stub_llm import StubGenerationModel
+
+
+# --- Configuration ---
+DEFAULT_CONCURRENCY = 8     # Generation calls in flight at once
+DEFAULT_RPM = 60            # Generation calls started per minute (0 = unlimited)
+DEFAULT_BURST = 1           # Calls that may start back to back before the rate applies
+PREPARE_WORKERS = 4         # Threads running retrieval + prompt assembly
+PROGRESS_EVERY = 10         # Print a progress line every N answers
+
+
+class RateLimiter:
+    """
+    Spaces out calls to at most `per_minute` per minute, allowing bursts of
+    `burst` calls (generic cell rate algorithm, i.e. a token bucket).
+    """
+
+    def __init__(self, per_minute, burst=DEFAULT_BURST):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self.burst = max(1, burst)
+        self._tat = 0.0  # Theoretical arrival time of the next call
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            tat = max(self._tat, now)
+            delay = tat - (self.burst - 1) * self.interval - now
+            self._tat = tat + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def load_questions(path):
+    """Read the input JSONL into [{"id", "query"}], skipping blank and malformed lines."""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                print(f"⚠️  Line {number}: not valid JSON, skipped")
+                continue
+            if isinstance(item, str):
+                item = {"query": item}
+            if not isinstance(item, dict) or not str(item.get("query", "")).strip():
+                print(f"⚠️  Line {number}: no query, skipped")
+                continue
+            questions.append({"id": str(item.get("id", number)), "query": str(item["query"]).strip()})
+    return questions
+
+
+def load_answered(path):
+    """Ids that already have an answer in the output file (for resuming)."""
+    answered = set()
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Partially written line from an interrupted run
+                if record.get("answer") is not None and not record.get("error"):
+                    answered.add(str(record["id"]))
+    except FileNotFoundError:
+        pass
+    return answered
+
+
+def open_output(path):
+    """
+    Open the output file for appending. A line cut off by an interrupted run
+    is terminated first, so the next record does not get glued onto it.
+    """
+    partial = False
+    try:
+        with open(path, "rb") as f:
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                partial = f.read(1) != b"\n"
+    except FileNotFoundError:
+        pass
+
+    output = open(path, "a", encoding="utf-8")
+    if partial:
+        output.write("\n")
+    return output
+
+
+class BatchRunner:
+    """Runs many questions through the pipeline with bounded, rate-limited generation."""
+
+    def __init__(self, fitness_collection, nutrition_collection, generation_model, output,
+                 k=5, concurrency=DEFAULT_CONCURRENCY, rpm=DEFAULT_RPM, burst=DEFAULT_BURST):
+        self.fitness_collection = fitness_collection
+        self.nutrition_collection = nutrition_collection
+        self.generation_model = generation_model
+        self.output = output
+        self.k = k
+        self.limiter = RateLimiter(rpm, burst)
+        self._slots = asyncio.Semaphore(concurrency)
+        self._prepare_pool = ThreadPoolExecutor(max_workers=PREPARE_WORKERS, thread_name_prefix="prepare")
+        self._generate_pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="generate")
+        self.counts = {"answered": 0, "cached": 0, "failed": 0}
+        self.total = 0
+        self._start = time.perf_counter()
+
+    def _prepare(self, query, query_embeddings):
+        return app.prepare_rag_prompt(
+            query, self.fitness_collection, self.nutrition_collection, k=self.k, query_embeddings=query_embeddings
+        )
+
+    def _generate(self, prompt):
+        with metrics.span("generation"):
+            return self.generation_model.generate_content(prompt).text
+
+    def _write(self, items, answer, cached, error, seconds):
+        for item in items:
+            record = {"id": item["id"], "query": item["query"], "answer": answer, "cached": cached,
+                      "error": error, "latency_ms": round(seconds * 1000, 1)}
+            self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.output.flush()
+
+        self.counts["failed" if error else "cached" if cached else "answered"] += len(items)
+        done = sum(self.counts.values())
+        if done % PROGRESS_EVERY < len(items) or done == self.total:
+            elapsed = time.perf_counter() - self._start
+            print(f"  ✓ {done}/{self.total} ({done / max(elapsed, 1e-9):.1f} questions/sec, "
+                  f"{self.counts['failed']} failed)")
+
+    async def _answer(self, items, query_embeddings):
+        """Retrieve, then generate under the concurrency and rate limits, then write."""
+        loop = asyncio.get_running_loop()
+        query = items[0]["query"]
+        start = time.perf_counter()
+        try:
+            cached_answer, prompt, query_embedding, scope = await loop.run_in_executor(
+                self._prepare_pool, self._prepare, query, query_embeddings
+            )
+            if cached_answer is not None:
+                self._write(items, cached_answer, True, None, time.perf_counter() - start)
+                return
+
+            async with self._slots:
+                await self.limiter.wait()
+                answer = await loop.run_in_executor(self._generate_pool, self._generate, prompt)
+            app.response_cache.put(query, answer, query_embedding, scope)
+            self._write(items, answer, False, None, time.perf_counter() - start)
+        except Exception as e:
+            self._write(items, None, False, f"{type(e).__name__}: {e}", time.perf_counter() - start)
+
+    async def run(self, questions):
+        """Answer all questions; identical questions share one generation."""
+        groups = {}
+        for item in questions:
+            groups.setdefault(item["query"], []).append(item)
+        self.total = len(questions)
+        self._start = time.perf_counter()
+
+        # One batched encoder call for every distinct question
+        queries = list(groups)
+        targets = app.search_targets(self.fitness_collection, self.nutrition_collection)
+        start = time.perf_counter()
+        embeddings = app.embed_queries(queries, targets)
+        print(f"🧠 Embedded {len(queries)} distinct questions in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        await asyncio.gather(*(
+            self._answer(groups[query], query_embeddings) for query, query_embeddings in zip(queries, embeddings)
+        ))
+        self._prepare_pool.shutdown()
+        self._generate_pool.shutdown()
+        return time.perf_counter() - self._start
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions with the FitGenie pipeline")
+    parser.add_argument("input", help="JSONL file with one {\"id\", \"query\"} object per line")
+    parser.add_argument("-o", "--output", help="JSONL file the answers are appended to (default: <input>.answers.jsonl)")
+    parser.add_argument("--k", type=int, default=5, help="Results per collection (default: 5)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Generation calls in flight at once")
+    parser.add_argument("--rpm", type=float, default=DEFAULT_RPM, help="Generation calls per minute, 0 for no limit")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST, help="Calls allowed back to back before --rpm applies")
+    parser.add_argument("--stub-llm", action="store_true", help="Use the offline stub LLM instead of Gemini")
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="Stub LLM latency in seconds")
+    parser.add_argument("--verbose", action="store_true", help="Print the per-question retrieval details")
+    args = parser.parse_args()
+
+    if args.output is None:
+        args.output = str(Path(args.input).with_suffix(".answers.jsonl"))
+    return args
+
+
+def main():
+    args = parse_args()
+    metrics.QUIET = not args.verbose
+
+    questions = load_questions(args.input)
+    answered = load_answered(args.output)
+    pending = [item for item in questions if item["id"] not in answered]
+    print(f"📋 {len(questions)} questions, {len(questions) - len(pending)} already answered, {len(pending)} to go")
+    if not pending:
+        return
+
+    if args.stub_llm:
+        generation_model = StubGenerationModel(latency=args.stub_latency)
+        fitness_collection, nutrition_collection = app.open_collections()
+        print(f"🧪 Using local stub LLM ({args.stub_latency * 1000:.0f} ms latency)")
+    else:
+        fitness_collection, nutrition_collection, generation_model = app.initialize_models()
+        if not generation_model:
+            return
+
+    with open_output(args.output) as output:
+        runner = BatchRunner(
+            fitness_collection, nutrition_collection, generation_model, output,
+            k=args.k, concurrency=args.concurrency, rpm=args.rpm, burst=args.burst
+        )
+        seconds = asyncio.run(runner.run(pending))
+
+    counts = runner.counts
+    print(f"\n✅ {sum(counts.values())} questions in {seconds:.1f} s "
+          f"({sum(counts.values()) / max(seconds, 1e-9):.1f}/sec): {counts['answered']} generated, "
+          f"{counts['cached']} from cache, {counts['failed']} failed")
+    if counts["failed"]:
+        print("   Re-run the same command to retry the failed questions")
+    print(f"💾 Answers: {args.output}")
+    metrics.print_stage_summary()
+
+
+if __name__ == "__main__":
+    main()
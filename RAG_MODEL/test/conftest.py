@@ -0,0 +1,6 @@
+"""Shared pytest setup: the pipeline modules live in ../scripts, like app.py imports them."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
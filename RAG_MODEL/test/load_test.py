@@ -0,0 +1,154 @@
+"""
+Load test for the FitGenie HTTP API (server.py).
+
+Opens --concurrency keep-alive connections, each sending POST /ask requests
+back to back for --duration seconds, and reports sustained requests/sec,
+latency percentiles and how many requests were rejected with 429. The
+queries repeat, so start the server with --no-response-cache to measure
+the whole pipeline rather than the response cache.
+
+    python server.py --stub-llm --no-response-cache &
+    python load_test.py --concurrency 32 --duration 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+
+# --- Configuration ---
+QUERIES = [
+    "exercises for chest",
+    "beginner leg workout",
+    "exercises with dumbbells",
+    "high protein foods",
+    "low calorie snacks",
+    "foods with fiber",
+    "how do I do a barbell squat",
+    "best stretches for lower back",
+]
+
+
+async def send_ask(reader, writer, host, query):
+    """Send one POST /ask on an open connection and return (status, body)."""
+    body = json.dumps({"query": query}).encode("utf-8")
+    writer.write(
+        f"POST /ask HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    payload = await reader.readexactly(int(headers.get("content-length", "0")))
+    return status, payload, headers.get("connection", "").lower() != "close"
+
+
+async def client(worker_id, host, port, deadline, results):
+    reader = writer = None
+    sent = 0
+
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        if writer is None:
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+            except OSError:
+                results.append(("error", time.perf_counter() - start))
+                await asyncio.sleep(0.05)  # Server down or out of file descriptors: don't spin
+                continue
+
+        query = QUERIES[(worker_id + sent) % len(QUERIES)]
+        sent += 1
+
+        start = time.perf_counter()
+        try:
+            status, _, keep_alive = await send_ask(reader, writer, host, query)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            status, keep_alive = "error", False
+        results.append((status, time.perf_counter() - start))
+
+        if status == 429:
+            await asyncio.sleep(0.05)  # Back off briefly, as Retry-After asks
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+
+    if writer is not None:
+        writer.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def run(args):
+    results = []
+    start = time.monotonic()
+    deadline = start + args.duration
+
+    await asyncio.gather(*(
+        client(i, args.host, args.port, deadline, results)
+        for i in range(args.concurrency)
+    ))
+    elapsed = time.monotonic() - start
+
+    ok = [latency for status, latency in results if status == 200]
+    summary = {
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": len(results),
+        "ok": len(ok),
+        "rejected_429": sum(1 for status, _ in results if status == 429),
+        "errors": sum(1 for status, _ in results if status not in (200, 429)),
+        "ok_per_sec": round(len(ok) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(ok, 50) * 1000, 1),
+            "p95": round(percentile(ok, 95) * 1000, 1),
+            "p99": round(percentile(ok, 99) * 1000, 1),
+        },
+    }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the FitGenie HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON only")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(summary))
+        return
+
+    print("=" * 60)
+    print(f"📈 {summary['ok_per_sec']} successful requests/sec sustained over {summary['duration_s']}s")
+    print(f"   Requests: {summary['requests']} ({summary['ok']} ok, "
+          f"{summary['rejected_429']} rejected with 429, {summary['errors']} errors)")
+    latency = summary["latency_ms"]
+    print(f"   Latency: p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
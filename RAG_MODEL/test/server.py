@@ -0,0 +1,642 @@
+"""
+Async HTTP API for the FitGenie RAG pipeline.
+
+Exposes the same Retrieve -> Augment -> Generate pipeline as the terminal
+chat in app.py, for the React front end and other clients:
+
+    POST /ask      {"query": "...", "k": 5, "stream": false}
+                   -> {"answer": "...", "latency_ms": ...}
+                   With "stream": true the answer is sent as a chunked
+                   text/plain response while it is generated.
+    GET  /health   -> {"status": "ok"}
+    GET  /stats    -> in-flight/queued/rejected counters, cache hit rate and
+                      query encoder batching
+    GET  /metrics  -> per-stage latency histograms in Prometheus text format
+
+Built on plain asyncio streams (no extra dependencies). One ChromaDB client
+and one LLM client are shared by all requests, HTTP/1.1 keep-alive lets
+clients reuse connections, every request has a deadline, and at most
+--max-inflight pipelines run at once. When all slots are busy and
+--max-queue requests are already waiting, new requests get 429 Too Many
+Requests right away instead of piling up.
+
+With --workers N the server pre-forks N worker processes to use more than
+one core. The parent loads what the pipeline reads but never writes (BM25
+indexes, facet vocabularies, router centroids, nutrient table, embedding
+model weights, see app.preload) once and then forks, so the workers share
+it copy-on-write instead of each loading a copy; gc.freeze() keeps the
+garbage collector from dirtying those pages. --workers serves the flat
+vector backend, whose memory-mapped files are shared through the page
+cache as well (a ChromaDB client does not survive fork()), and the parent
+never calls the Gemini SDK, whose gRPC channel does not either: when no
+model choice is persisted, a short-lived child probes for one before the
+workers are forked. All workers accept on the same
+listening socket, whose accept queue is their common request queue. The
+limits, caches, /stats and /metrics are per worker. A worker that exits
+after it was ready is replaced; one that fails while starting up (bad
+configuration, missing index) stops the whole server instead of being
+restarted in a loop.
+
+Run with a local stub LLM (no API key or network needed):
+
+    python server.py --stub-llm
+    python server.py --stub-llm --workers 4
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import app
+import metrics
+from query_encoder import encoder_stats
+from response_cache import ResponseCache
+from stub_llm import StubGenerationModel
+
+
+# --- Configuration ---
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_MAX_INFLIGHT = 8        # Pipelines running at once
+DEFAULT_MAX_QUEUE = 16          # Requests allowed to wait for a slot
+DEFAULT_TIMEOUT = 30.0          # Seconds per request, including queueing
+MAX_BODY_BYTES = 64 * 1024
+KEEP_ALIVE_TIMEOUT = 15.0
+DEFAULT_WORKERS = 1             # Processes serving the listening socket (see --workers)
+RESTART_DELAY = 1.0             # Seconds before a worker that exited is replaced
+
+REASONS = {
+    200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 429: "Too Many Requests",
+    500: "Internal Server Error", 504: "Gateway Timeout",
+}
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
+
+
+class Saturated(Exception):
+    """Raised when every pipeline slot is busy and the wait queue is full."""
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class RagService:
+    """Shares the collections/LLM across requests and bounds concurrent pipelines."""
+
+    def __init__(self, fitness_collection, nutrition_collection, generation_model,
+                 max_inflight=DEFAULT_MAX_INFLIGHT, max_queue=DEFAULT_MAX_QUEUE, timeout=DEFAULT_TIMEOUT):
+        self.fitness_collection = fitness_collection
+        self.nutrition_collection = nutrition_collection
+        self.generation_model = generation_model
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        # The pipeline is blocking (ChromaDB, encoder, LLM SDK), so it runs
+        # in a pool with exactly one thread per slot
+        self._executor = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="rag")
+        self._slots = asyncio.Semaphore(max_inflight)
+        self.inflight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def _acquire_slot(self, deadline):
+        """Wait for a pipeline slot, or raise Saturated if the queue is full."""
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Saturated()
+
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), max(0.0, deadline - time.monotonic()))
+        finally:
+            self.waiting -= 1
+        metrics.observe("queue_wait", time.perf_counter() - start)
+        self.inflight += 1
+
+    def _release_slot(self, _future=None):
+        self.inflight -= 1
+        self._slots.release()
+
+    def _answer(self, query, k):
+        return app.get_rag_response(
+            query, self.fitness_collection, self.nutrition_collection, self.generation_model, k=k
+        )
+
+    async def ask(self, query, k):
+        """Run the full pipeline for one question within the request deadline."""
+        deadline = time.monotonic() + self.timeout
+        await self._acquire_slot(deadline)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, self._answer, query, k)
+        # The slot is freed when the pipeline really finishes, even if the
+        # client already got a timeout, so the in-flight bound always holds
+        future.add_done_callback(self._release_slot)
+
+        answer = await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - time.monotonic()))
+        self.completed += 1
+        return answer
+
+    async def stream(self, query, k):
+        """Async iterator over the streamed answer, holding one slot throughout."""
+        deadline = time.monotonic() + self.timeout
+        await self._acquire_slot(deadline)
+
+        loop = asyncio.get_running_loop()
+        chunks = app.stream_rag_response(
+            query, self.fitness_collection, self.nutrition_collection, self.generation_model, k=k
+        )
+        done = object()
+        pending = None
+        try:
+            while True:
+                remaining = max(0.0, deadline - time.monotonic())
+                pending = loop.run_in_executor(self._executor, next, chunks, done)
+                chunk = await asyncio.wait_for(asyncio.shield(pending), remaining)
+                pending = None
+                if chunk is done:
+                    break
+                yield chunk
+            self.completed += 1
+        finally:
+            # After a timeout or disconnect a pool thread may still be inside
+            # next(chunks): like ask(), keep the slot until it returns
+            if pending is None:
+                self._close_stream(loop, chunks)
+            else:
+                pending.add_done_callback(lambda _future: self._close_stream(loop, chunks))
+
+    def _close_stream(self, loop, chunks):
+        """Run the answer generator's cleanup on the pool, then free its slot."""
+        closing = loop.run_in_executor(self._executor, chunks.close)
+        closing.add_done_callback(self._release_slot)
+
+    def stats(self):
+        return {
+            "pid": os.getpid(),
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "response_cache": app.response_cache.stats(),
+            "query_encoders": encoder_stats(),
+        }
+
+
+async def read_request(reader):
+    """Parse one HTTP/1.1 request. Returns None when the client closed the connection."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length")
+    if length < 0:
+        raise HttpError(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+
+    return method.upper(), target.split("?", 1)[0], version, headers, body
+
+
+def wants_keep_alive(version, headers):
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+async def send_response(writer, status, payload, keep_alive, extra_headers=None, content_type="application/json"):
+    if isinstance(payload, str):
+        body = payload.encode("utf-8")
+    else:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    headers = {
+        "Content-Type": content_type,
+        "Content-Length": str(len(body)),
+        "Connection": "keep-alive" if keep_alive else "close",
+        **CORS_HEADERS,
+        **(extra_headers or {}),
+    }
+    head = f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+async def send_stream(writer, chunks, keep_alive):
+    """
+    Send an async iterator of text chunks with chunked transfer encoding.
+
+    The first chunk is awaited before the headers go out, so a full queue or
+    a timeout can still be reported as a normal 429/504 response. Returns
+    whether the connection can be kept open.
+    """
+    chunks = chunks.__aiter__()
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = ""
+
+    headers = {
+        "Content-Type": "text/plain; charset=utf-8",
+        "Transfer-Encoding": "chunked",
+        "Connection": "keep-alive" if keep_alive else "close",
+        **CORS_HEADERS,
+    }
+    head = "HTTP/1.1 200 OK\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+    writer.write(head.encode("latin-1"))
+
+    async def write_chunk(chunk):
+        data = chunk.encode("utf-8")
+        if data:
+            writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+            await writer.drain()
+
+    try:
+        await write_chunk(first)
+        async for chunk in chunks:
+            await write_chunk(chunk)
+    except Exception as e:
+        # Headers are already out; the only honest signal left is to drop the connection
+        print(f"❌ Stream aborted: {e!r}")
+        return False
+
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+    return keep_alive
+
+
+def parse_ask(body):
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise HttpError(400, "Body must be JSON")
+
+    query = str(payload.get("query", "")).strip()
+    if not query:
+        raise HttpError(400, "Missing 'query'")
+
+    try:
+        k = max(1, min(int(payload.get("k", 5)), 20))
+    except (TypeError, ValueError):
+        raise HttpError(400, "'k' must be an integer")
+
+    return query, k, bool(payload.get("stream", False))
+
+
+async def handle_request(service, writer, method, path, version, headers, body):
+    keep_alive = wants_keep_alive(version, headers)
+
+    if method == "OPTIONS":
+        await send_response(writer, 204, None, keep_alive)
+    elif path == "/health":
+        await send_response(writer, 200, {"status": "ok"}, keep_alive)
+    elif path == "/stats":
+        await send_response(writer, 200, service.stats(), keep_alive)
+    elif path == "/metrics":
+        await send_response(writer, 200, metrics.export_prometheus(), keep_alive,
+                            content_type="text/plain; version=0.0.4; charset=utf-8")
+    elif path == "/ask":
+        if method != "POST":
+            raise HttpError(405, "Use POST")
+
+        query, k, stream = parse_ask(body)
+        start = time.perf_counter()
+
+        if stream:
+            keep_alive = await send_stream(writer, service.stream(query, k), keep_alive)
+        else:
+            answer = await service.ask(query, k)
+            await send_response(writer, 200, {
+                "answer": answer,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            }, keep_alive)
+    else:
+        raise HttpError(404, f"No route for {path}")
+
+    return keep_alive
+
+
+async def handle_connection(service, reader, writer):
+    """Serve requests on one connection until the client closes it."""
+    try:
+        while True:
+            try:
+                request = await asyncio.wait_for(read_request(reader), KEEP_ALIVE_TIMEOUT)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                break
+            except HttpError as e:
+                await send_response(writer, e.status, {"error": e.message}, keep_alive=False)
+                break
+
+            if request is None:
+                break
+
+            method, path, version, headers, body = request
+            try:
+                keep_alive = await handle_request(service, writer, method, path, version, headers, body)
+            except Saturated:
+                keep_alive = wants_keep_alive(version, headers)
+                await send_response(writer, 429, {"error": "Server busy, retry later"}, keep_alive,
+                                    extra_headers={"Retry-After": "1"})
+            except asyncio.TimeoutError:
+                service.timed_out += 1
+                keep_alive = wants_keep_alive(version, headers)
+                await send_response(writer, 504, {"error": "Request timed out"}, keep_alive)
+            except HttpError as e:
+                keep_alive = wants_keep_alive(version, headers)
+                await send_response(writer, e.status, {"error": e.message}, keep_alive)
+            except Exception as e:
+                print(f"❌ Error handling {method} {path}: {e}")
+                keep_alive = False
+                await send_response(writer, 500, {"error": "Internal error"}, keep_alive)
+
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def build_service(args, collections=None):
+    """
+    Open the shared collections and LLM client once for the whole server
+    (or, with --workers, once per worker around the collections the parent
+    opened before forking).
+    """
+    if args.stub_llm:
+        generation_model = StubGenerationModel(latency=args.stub_latency)
+        fitness_collection, nutrition_collection = collections or app.open_collections()
+        print(f"🧪 Using local stub LLM ({args.stub_latency * 1000:.0f} ms latency)")
+    elif collections:
+        generation_model = app.resolve_generation_model()
+        if generation_model is None:
+            raise SystemExit(1)
+        fitness_collection, nutrition_collection = collections
+    else:
+        fitness_collection, nutrition_collection, generation_model = app.initialize_models()
+        if not fitness_collection:
+            raise SystemExit(1)
+
+    # Warm up so the first request does not pay for loading collections/encoder
+    for handle in (fitness_collection, nutrition_collection):
+        if isinstance(handle, app.LazyHandle):
+            handle.resolve()
+    app.embed_query("warm up", [fitness_collection, nutrition_collection])
+
+    return RagService(
+        fitness_collection, nutrition_collection, generation_model,
+        max_inflight=args.max_inflight, max_queue=args.max_queue, timeout=args.timeout
+    )
+
+
+async def serve(service, host, port, sock=None, ready=None):
+    """
+    Serve on host:port, or on an already listening socket shared with other
+    workers; ready() is called once the server accepts connections.
+    """
+    handler = lambda reader, writer: handle_connection(service, reader, writer)
+    if sock is None:
+        server = await asyncio.start_server(handler, host, port)
+        print(f"🚀 FitGenie API listening on http://{host}:{port} "
+              f"(max {service.max_inflight} in flight, {service.max_queue} queued, {service.timeout:.0f}s timeout)")
+    else:
+        server = await asyncio.start_server(handler, sock=sock)
+        print(f"🚀 Worker {os.getpid()} ready")
+    if ready is not None:
+        ready()
+    async with server:
+        await server.serve_forever()
+
+
+def open_shared_state(args):
+    """Parent of --workers: open the collections and load the read-only data and models before forking."""
+    fitness_collection, nutrition_collection = app.open_collections()
+    start = time.perf_counter()
+    app.preload(fitness_collection, nutrition_collection)
+    print(f"⏱️  Loaded shared indexes and models in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return fitness_collection, nutrition_collection
+
+
+def run_worker(args, sock, collections, ready=None):
+    """Body of a forked worker: build its own service around the shared state and serve the socket."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the whole group; the parent stops the workers
+    if "torch" in sys.modules:
+        # Each worker gets its share of the cores instead of a full set of intra-op threads
+        sys.modules["torch"].set_num_threads(max(1, (os.cpu_count() or 1) // args.workers))
+
+    service = build_service(args, collections)
+    asyncio.run(serve(service, args.host, args.port, sock=sock, ready=ready))
+
+
+def use_flat_backend():
+    """--workers serves the flat backend; an explicitly configured other backend is refused."""
+    if app.VECTOR_BACKEND == "flat":
+        return
+    if "FITGENIE_VECTOR_BACKEND" in os.environ:
+        raise SystemExit(f"--workers needs FITGENIE_VECTOR_BACKEND=flat: the {app.VECTOR_BACKEND} backend "
+                         "cannot be shared across fork() and every worker would load its own index")
+    app.VECTOR_BACKEND = "flat"
+    print("ℹ️  --workers serves the flat vector backend (memory-mapped, shared by the workers)")
+
+
+def resolve_model_choice():
+    """
+    Parent of --workers: make sure a Gemini model choice is persisted for
+    the workers without calling the Gemini SDK in this process. Without a
+    persisted choice a short-lived child probes for one (and persists it).
+    Returns False when no model is available.
+    """
+    if app.load_model_choice():
+        return True
+
+    sys.stdout.flush()
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = 0 if app.resolve_generation_model() is not None else 1
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status) == 0
+
+
+def _reached_ready(fd):
+    """Did the worker behind a readiness pipe report ready before exiting? Closes the pipe."""
+    try:
+        return os.read(fd, 1) == b"1"
+    finally:
+        os.close(fd)
+
+
+def serve_workers(args):
+    """
+    Pre-fork --workers processes sharing one listening socket. Workers that
+    exit after startup are replaced; a worker failing during startup stops
+    the server with a non-zero exit status.
+    """
+    if not hasattr(os, "fork"):
+        raise SystemExit("--workers needs os.fork(), which this platform does not have")
+
+    use_flat_backend()
+    # Checked once here: a missing or invalid API key would otherwise fail
+    # in every worker, and the workers would race to probe and persist the model choice
+    if not args.stub_llm and not resolve_model_choice():
+        raise SystemExit(1)
+
+    sock = socket.create_server((args.host, args.port))
+    collections = open_shared_state(args)
+    gc.freeze()  # Objects loaded so far are never collected, so their pages stay shared
+
+    workers = {}   # pid -> (worker number, read end of its readiness pipe)
+    stopping = False
+    failed = False
+
+    def stop(_signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def spawn(number):
+        ready_read, ready_write = os.pipe()
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                os.close(ready_read)
+                run_worker(args, sock, collections, ready=lambda: os.write(ready_write, b"1"))
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(ready_write)
+        workers[pid] = (number, ready_read)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for number in range(args.workers):
+        spawn(number)
+    print(f"🚀 FitGenie API listening on http://{args.host}:{args.port} with {args.workers} workers "
+          f"(each max {args.max_inflight} in flight, {args.max_queue} queued, {args.timeout:.0f}s timeout)")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        if pid not in workers:
+            continue
+        number, ready_read = workers.pop(pid)
+        started = _reached_ready(ready_read)
+        if stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        if not started:
+            print(f"❌ Worker {pid} exited with status {code} during startup, stopping the server")
+            failed = True
+            stop(None, None)
+            continue
+        print(f"⚠️  Worker {pid} exited with status {code}, restarting")
+        time.sleep(RESTART_DELAY)
+        if not stopping:
+            spawn(number)
+
+    sock.close()
+    if failed:
+        raise SystemExit(1)
+    print("\n👋 Server stopped")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="FitGenie RAG HTTP API")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-inflight", type=int, default=DEFAULT_MAX_INFLIGHT, help="Pipelines running at once")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE, help="Requests allowed to wait for a slot")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Per-request deadline in seconds")
+    parser.add_argument("--stub-llm", action="store_true", help="Use the offline stub LLM instead of Gemini")
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="Stub LLM latency in seconds")
+    parser.add_argument(
+        "--no-response-cache",
+        action="store_true",
+        help="Run every request through the whole pipeline, e.g. for load tests with repeated questions"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Pre-forked worker processes sharing the loaded indexes and models; "
+             "needs the flat vector backend (default: 1, no fork)"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.no_response_cache:
+        app.response_cache = ResponseCache(max_entries=0)  # Keeps nothing
+    if args.workers > 1:
+        serve_workers(args)
+        return
+
+    service = build_service(args)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped")
+
+
+if __name__ == "__main__":
+    main()
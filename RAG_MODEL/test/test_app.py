@@ -0,0 +1,49 @@
+import numpy as np
+
+import app
+import metrics
+from flat_index import FlatCollection
+
+
+def collection():
+    vectors = np.eye(4, dtype=np.float32)
+    return FlatCollection(
+        "fitness_knowledge",
+        ["ex-1", "ex-2", "ex-3", "ex-4"],
+        ["Dumbbell Curl", "Barbell Curl", "Barbell Row", "Cable Fly"],
+        [{"equipment": "Dumbbell"}, {"equipment": "Barbell"}, {"equipment": "Barbell"}, {"equipment": "Cable"}],
+        vectors.astype(np.float16),
+    )
+
+
+def test_vector_search_marks_hits_outside_the_filter():
+    results = app.vector_search(collection(), [0.9, 0.5, 0.1, 0.0], k=3, where={"equipment": "Dumbbell"})
+
+    assert results["ids"][0] == ["ex-1", "ex-2", "ex-3"]
+    flags = [bool(meta.get(app.OUTSIDE_FILTERS_KEY)) for meta in results["metadatas"][0]]
+    assert flags == [False, True, True]
+
+
+def test_vector_search_without_filter_marks_nothing():
+    results = app.vector_search(collection(), [0.9, 0.5, 0.1, 0.0], k=2)
+    assert not any(app.OUTSIDE_FILTERS_KEY in meta for meta in results["metadatas"][0])
+
+
+def test_context_document_labels_outside_hits():
+    assert app.context_document("Barbell Curl", {app.OUTSIDE_FILTERS_KEY: True}).startswith(app.OUTSIDE_FILTERS_LABEL)
+    assert app.context_document("Dumbbell Curl", {}) == "Dumbbell Curl"
+    assert app.OUTSIDE_FILTERS_LABEL.strip() in app.build_prompt("dumbbell only", "Dumbbell Curl")
+
+
+def test_failed_stream_records_the_request_as_an_error(monkeypatch):
+    class FailingModel:
+        def generate_content(self, prompt, stream=False):
+            raise RuntimeError("quota exceeded")
+
+    monkeypatch.setattr(metrics, "_registry", {})
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(app, "prepare_rag_prompt", lambda *args, **kwargs: (None, "prompt", None, None))
+
+    assert list(app.stream_rag_response("squat", None, None, FailingModel())) == [app.ERROR_ANSWER]
+    exported = metrics.export_prometheus()
+    assert 'fitgenie_stage_duration_seconds_count{outcome="error",stage="request"} 1' in exported
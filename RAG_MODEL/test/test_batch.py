@@ -0,0 +1,27 @@
+import json
+
+from batch import load_answered, open_output
+
+
+def test_resume_after_a_cut_off_line_keeps_the_next_record(tmp_path):
+    path = tmp_path / "answers.jsonl"
+    path.write_text(json.dumps({"id": "1", "answer": "Squats."}) + "\n" + '{"id": "2", "answ', encoding="utf-8")
+
+    with open_output(path) as output:
+        output.write(json.dumps({"id": "3", "answer": "Oats."}) + "\n")
+
+    assert load_answered(path) == {"1", "3"}
+    assert path.read_text(encoding="utf-8").endswith('"answ\n{"id": "3", "answer": "Oats."}\n')
+
+
+def test_complete_and_new_files_get_no_blank_line(tmp_path):
+    complete = tmp_path / "complete.jsonl"
+    complete.write_text(json.dumps({"id": "1", "answer": "Squats."}) + "\n", encoding="utf-8")
+    empty = tmp_path / "empty.jsonl"
+    empty.touch()
+
+    for path in (complete, empty, tmp_path / "new.jsonl"):
+        with open_output(path) as output:
+            output.write(json.dumps({"id": "2", "answer": "Oats."}) + "\n")
+        assert "\n\n" not in path.read_text(encoding="utf-8")
+        assert path.read_text(encoding="utf-8").startswith("{")
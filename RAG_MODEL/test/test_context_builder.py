@@ -0,0 +1,49 @@
+from context_builder import SEPARATOR, build_context, estimate_tokens, interleave, shingles, trim_document
+
+
+SQUAT = "Title: Barbell Squat\nBodyPart: Quadriceps\nDesc: Stand with the bar on your back and sit down between your heels."
+SQUAT_VARIANT = "Title: Barbell Squat\nBodyPart: Quadriceps\nDesc: Stand with the bar on your back and sit down between your heels!"
+PRESS = "Title: Bench Press\nBodyPart: Chest\nDesc: Lower the bar to your chest and press it back up."
+
+
+def test_trim_drops_placeholder_fields():
+    assert trim_document("Title: Plank\nEquipment: nan\nLevel: \nRating: unknown") == "Title: Plank"
+
+
+def test_near_duplicates_are_dropped():
+    context, stats = build_context([SQUAT, SQUAT_VARIANT, PRESS])
+
+    assert stats.kept == [0, 2]
+    assert stats.duplicates == 1
+    assert context == SQUAT + SEPARATOR + PRESS
+
+
+def test_empty_documents_are_not_duplicates():
+    context, stats = build_context(["", "   \n\t", "Title: nan\nEquipment: none", "---", SQUAT, "", PRESS])
+
+    assert stats.kept == [4, 6]
+    assert stats.empty == 5
+    assert stats.duplicates == 0
+    assert "5 empty" in stats.describe()
+    assert context == SQUAT + SEPARATOR + PRESS
+
+
+def test_budget_skips_long_documents_but_keeps_shorter_ones():
+    long_document = "Desc: " + " ".join(f"word{i}" for i in range(200))
+    budget = estimate_tokens(SQUAT) + estimate_tokens(SEPARATOR) + estimate_tokens(PRESS)
+
+    context, stats = build_context([SQUAT, long_document, PRESS], token_budget=budget)
+
+    assert stats.kept == [0, 2]
+    assert stats.over_budget == 1
+    assert stats.tokens <= budget
+    assert stats.tokens_saved > 0
+
+
+def test_shingles_of_text_without_words_is_empty():
+    assert shingles("--- !!") == set()
+    assert len(shingles("one two")) == 1
+
+
+def test_interleave_alternates_ranks():
+    assert interleave(["a1", "a2", "a3"], ["b1"]) == ["a1", "b1", "a2", "a3"]
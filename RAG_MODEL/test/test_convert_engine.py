@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from convert_engine import convert_csv
+
+
+TEXT_FIELDS = [("Exercise Title", "Title", ""), ("Body Part", "BodyPart", "")]
+METADATA_COLUMNS = {"title": "Title", "body_part": "BodyPart"}
+
+
+def write_csv(path, header, rows):
+    path.write_text("\n".join([header] + rows) + "\n", encoding="utf-8")
+
+
+def test_convert_writes_json_array(tmp_path):
+    source = tmp_path / "exercises.csv"
+    output = tmp_path / "processed_data.json"
+    write_csv(source, ",Title,BodyPart", ["0,Barbell Squat,Quadriceps", "1,Bench Press,Chest"])
+
+    total = convert_csv(source, output, "megagym", TEXT_FIELDS, METADATA_COLUMNS, chunksize=1)
+
+    documents = json.loads(output.read_text(encoding="utf-8"))
+    assert total == 2
+    assert [doc["doc_id"] for doc in documents] == ["megagym-0", "megagym-1"]
+    assert documents[1]["metadata"] == {"title": "Bench Press", "body_part": "Chest"}
+    assert not (tmp_path / "processed_data.json.tmp").exists()
+
+
+def test_failed_conversion_keeps_previous_output(tmp_path):
+    source = tmp_path / "exercises.csv"
+    output = tmp_path / "processed_data.json"
+    write_csv(source, ",Title,BodyPart", ["0,Barbell Squat,Quadriceps"])
+    convert_csv(source, output, "megagym", TEXT_FIELDS, METADATA_COLUMNS)
+    previous = output.read_bytes()
+
+    write_csv(source, ",Title", ["0,Barbell Squat"])  # BodyPart column missing
+    with pytest.raises(KeyError):
+        convert_csv(source, output, "megagym", TEXT_FIELDS, METADATA_COLUMNS)
+
+    assert output.read_bytes() == previous
+    assert not (tmp_path / "processed_data.json.tmp").exists()
+
+
+def test_failed_arrow_conversion_keeps_previous_output(tmp_path):
+    pytest.importorskip("pyarrow")
+    from columnar import load_documents
+
+    source = tmp_path / "exercises.csv"
+    output = tmp_path / "processed_data.arrow"
+    write_csv(source, ",Title,BodyPart", ["0,Barbell Squat,Quadriceps", "1,Bench Press,Chest"])
+    convert_csv(source, output, "megagym", TEXT_FIELDS, METADATA_COLUMNS)
+    previous = output.read_bytes()
+
+    write_csv(source, ",Title", ["0,Barbell Squat"])
+    with pytest.raises(KeyError):
+        convert_csv(source, output, "megagym", TEXT_FIELDS, METADATA_COLUMNS)
+
+    assert output.read_bytes() == previous
+    assert not (tmp_path / "processed_data.arrow.tmp").exists()
+    _, count, documents = load_documents(output)
+    assert count == 2
+    assert [doc["doc_id"] for doc in documents] == ["megagym-0", "megagym-1"]
@@ -0,0 +1,100 @@
+import pandas as pd
+import pytest
+
+from entity_resolution import match_records, normalize_title
+from exercisedb import ID_PREFIX, merge_datasets, movement_modifiers
+
+
+def megagym_doc(index, title, equipment="Dumbbell"):
+    return {
+        "doc_id": f"megagym-{index}",
+        "text_to_embed": f"Exercise Title: {title}",
+        "metadata": {"title": title, "equipment": equipment},
+    }
+
+
+def exercisedb_frame(rows):
+    """ExerciseDB rows in the shape load_exercisedb() returns: (id, title, equipment)."""
+    return pd.DataFrame(
+        {
+            "Title": [title for _, title, _ in rows],
+            "Desc": [f"1. Do the {title.lower()}." for _, title, _ in rows],
+            "Type": "Strength",
+            "BodyPart": "Biceps",
+            "Equipment": [equipment for _, _, equipment in rows],
+            "Level": "",
+            "Rating": "",
+            "Muscles": "biceps",
+        },
+        index=[identifier for identifier, _, _ in rows],
+    )
+
+
+def test_normalize_title_strips_variant_markers():
+    assert normalize_title("Dumbbell Curl (male) v. 2") == "dumbbell curl"
+
+
+def test_each_right_title_is_matched_once_by_the_closest_left_title():
+    left = ["Dumbbell biceps curl squat", "Dumbbell biceps curl", "Dumbbell biceps curl reverse"]
+    right = ["Dumbbell Biceps Curl"]
+
+    matches, _ = match_records(left, right, threshold=0.6)
+
+    assert matches == {1: 0}
+
+
+def test_losing_left_title_falls_back_to_its_next_match():
+    left = ["Barbell bench press", "Barbell bench press (v. 2)", "Plank"]
+    right = ["Barbell Bench Press", "Barbell Bench Presses"]
+
+    matches, _ = match_records(left, right, threshold=0.6)
+
+    assert matches[0] != matches[1]
+    assert set(matches.values()) == {0, 1}
+    assert 2 not in matches
+
+
+def test_incompatible_pairs_are_vetoed():
+    matches, _ = match_records(["Dumbbell curl"], ["Dumbbell Curl"], compatible=lambda i, j: False)
+
+    assert matches == {}
+
+
+def test_merge_keeps_every_colliding_exercise():
+    megagym = [megagym_doc(0, "Dumbbell Biceps Curl"), megagym_doc(1, "Plank", "Body Only")]
+    exercises = exercisedb_frame([
+        ("0001", "Dumbbell biceps curl squat", "Dumbbell"),
+        ("0002", "Dumbbell biceps curl", "Dumbbell"),
+        ("0003", "Dumbbell biceps curl reverse", "Dumbbell"),
+    ])
+
+    documents, stats = merge_datasets(megagym, exercises, threshold=0.6, source="exercises.csv")
+
+    assert stats["merged"] == 1 and stats["added"] == 2
+    assert len(documents) == 4
+    assert documents[0]["metadata"]["merged_from"] == f"{ID_PREFIX}-0002"
+    assert "Do the dumbbell biceps curl." in documents[0]["text_to_embed"]
+    assert documents[1]["metadata"]["merged_from"] == ""
+    added = {doc["metadata"]["title"] for doc in documents[2:]}
+    assert added == {"Dumbbell biceps curl squat", "Dumbbell biceps curl reverse"}
+
+
+def test_movement_modifiers_are_read_from_normalised_titles():
+    assert movement_modifiers("Dumbbell Step-Up Split Squat") == {"step-up"}
+    assert movement_modifiers("One Arm Dumbbell Row") == movement_modifiers("Single-arm dumbbell row")
+    assert movement_modifiers("Barbell Bench Press") == frozenset()
+
+
+@pytest.mark.parametrize("exercise, megagym_title, equipment", [
+    ("Dumbbell rear lateral raise", "UP Dumbbell Lateral Raise", "Dumbbell"),
+    ("Barbell reverse grip decline bench press", "Wide-Grip Decline Barbell Bench Press", "Barbell"),
+    ("Dumbbell step-up split squat", "Dumbbell split squat", "Dumbbell"),
+])
+def test_different_movements_are_not_merged(exercise, megagym_title, equipment):
+    megagym = [megagym_doc(0, megagym_title, equipment)]
+    exercises = exercisedb_frame([("0001", exercise, equipment)])
+
+    documents, stats = merge_datasets(megagym, exercises, source="exercises.csv")
+
+    assert stats["merged"] == 0 and stats["added"] == 1
+    assert documents[0]["metadata"]["merged_from"] == ""
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from flat_index import FlatCollection, has_flat_index, index_dir, load_flat_index, quantize, save_flat_index
+
+
+METADATAS = [
+    {"body_part": "Chest", "level": "Beginner", "calories_kcal": 50},
+    {"body_part": "Chest", "level": "Expert", "calories_kcal": 150},
+    {"body_part": "Lats", "level": "Beginner", "calories_kcal": 250.5},
+    {"body_part": "Quadriceps", "level": "Intermediate"},
+]
+
+
+def embeddings():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(len(METADATAS), 8)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def collection(dtype="float16"):
+    vectors, scales = quantize(embeddings(), dtype)
+    return FlatCollection("fitness_knowledge", ["a", "b", "c", "d"], ["A", "B", "C", "D"], METADATAS, vectors,
+                          scales=scales, full=embeddings() if dtype == "int8" else None)
+
+
+def ids(flat, where):
+    return flat.get(where=where)["ids"]
+
+
+@pytest.mark.parametrize("where,expected", [
+    ({"body_part": "Chest"}, ["a", "b"]),
+    ({"body_part": {"$eq": "Lats"}}, ["c"]),
+    ({"body_part": {"$ne": "Chest"}}, ["c", "d"]),
+    ({"body_part": {"$in": ["Lats", "Quadriceps", "Neck"]}}, ["c", "d"]),
+    ({"body_part": {"$nin": ["Chest"]}}, ["c", "d"]),
+    ({"body_part": "Neck"}, []),
+    ({"calories_kcal": {"$lt": 150}}, ["a"]),
+    ({"calories_kcal": {"$lte": 150}}, ["a", "b"]),
+    ({"calories_kcal": {"$gt": 150}}, ["c"]),
+    ({"calories_kcal": {"$gte": 0}}, ["a", "b", "c"]),
+    ({"$and": [{"body_part": "Chest"}, {"level": "Beginner"}]}, ["a"]),
+    ({"$or": [{"level": "Expert"}, {"body_part": "Quadriceps"}]}, ["b", "d"]),
+    ({"$and": [{"level": {"$in": ["Beginner", "Expert"]}}, {"calories_kcal": {"$gt": 100}}]}, ["b", "c"]),
+])
+def test_where_matches_chroma_semantics(where, expected):
+    assert ids(collection(), where) == expected
+
+
+def test_missing_keys_never_match_negations():
+    flat = FlatCollection("x", ["a", "b"], ["A", "B"], [{"level": "Beginner"}, {}], np.eye(2, dtype=np.float16))
+
+    assert ids(flat, {"level": {"$ne": "Expert"}}) == ["a"]
+    assert ids(flat, {"level": {"$nin": ["Expert"]}}) == ["a"]
+
+
+def test_unsupported_operator_is_an_error():
+    with pytest.raises(ValueError):
+        ids(collection(), {"level": {"$contains": "Beg"}})
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_search_finds_the_exact_neighbours_within_the_filter(dtype):
+    flat = collection(dtype)
+    query = embeddings()[1]
+
+    rows, distances = flat.search(query, k=2)
+    assert rows[0] == 1 and distances[0] == pytest.approx(0.0, abs=1e-2)
+
+    results = flat.query([query], n_results=2, where={"body_part": {"$ne": "Chest"}})
+    exact = np.argsort(-(embeddings()[2:] @ query))
+    assert results["ids"][0] == [["c", "d"][i] for i in exact]
+    assert results["distances"][0] == sorted(results["distances"][0])
+
+
+def test_empty_filter_result_returns_no_hits():
+    results = collection().query([embeddings()[0]], n_results=3, where={"body_part": "Neck"})
+
+    assert results["ids"] == [[]]
+
+
+def test_saved_index_round_trip(tmp_path):
+    path = save_flat_index(tmp_path / "flat", "fitness_knowledge", ["a", "b", "c", "d"], ["A", "B", "C", "D"],
+                           METADATAS, embeddings(), dtype="int8", collection_metadata={"embedding_model": "m"})
+    flat = load_flat_index(path)
+
+    assert flat.count() == 4 and flat.metadata == {"embedding_model": "m"}
+    assert flat.get(ids=["c", "zz", "a"], where={"level": "Beginner"})["ids"] == ["c", "a"]
+    assert flat.query([embeddings()[3]], n_results=1)["ids"] == [["d"]]
+
+
+def test_has_flat_index_once_exported(tmp_path):
+    assert not has_flat_index(tmp_path, "fitness_knowledge")
+
+    save_flat_index(index_dir(tmp_path, "fitness_knowledge"), "fitness_knowledge", ["a", "b", "c", "d"],
+                    ["A", "B", "C", "D"], METADATAS, embeddings())
+
+    assert has_flat_index(tmp_path, "fitness_knowledge")
@@ -0,0 +1,118 @@
+import time
+
+import pytest
+
+from generation_client import CircuitBreaker, GenerationClient, GenerationError
+from stub_llm import StubGenerationModel
+
+PROMPT = "**User's Question:** best chest exercise **Context:**\nExercise Title: Push-up\n"
+
+
+def client(*models, **kwargs):
+    kwargs.setdefault("backoff_base", 0.0)
+    return GenerationClient([(model.model_name, model) for model in models], **kwargs)
+
+
+def test_failed_call_falls_back_to_the_next_model():
+    primary = StubGenerationModel("primary", latency=0.01, failure_rate=1.0)
+    backup = StubGenerationModel("backup", latency=0.01)
+    generation = client(primary, backup, hedge=False)
+
+    response = generation.generate_content(PROMPT)
+
+    assert response.text == backup.answer_for(PROMPT)
+    assert (primary.calls, backup.calls) == (1, 1)
+    assert generation.stats()["retries"] == 1
+
+
+def test_streamed_call_falls_back_before_the_first_chunk():
+    primary = StubGenerationModel("primary", latency=0.01, failure_rate=1.0)
+    backup = StubGenerationModel("backup", latency=0.01, chunk_delay=0.0)
+    generation = client(primary, backup, hedge=False)
+
+    answer = "".join(chunk.text for chunk in generation.generate_content(PROMPT, stream=True))
+
+    assert answer == backup.answer_for(PROMPT)
+
+
+def test_every_model_failing_raises_generation_error():
+    generation = client(StubGenerationModel("only", latency=0.01, failure_rate=1.0), max_attempts=2)
+
+    with pytest.raises(GenerationError):
+        generation.generate_content(PROMPT)
+    assert generation.stats()["errors"] == 1
+
+
+def test_circuit_opens_then_half_opens_for_one_trial_then_closes():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()  # Only one trial call
+
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_trial_reopens_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == "open" and breaker.opens == 2
+
+
+def test_open_circuit_skips_the_model():
+    primary = StubGenerationModel("primary", latency=0.01, failure_rate=1.0)
+    backup = StubGenerationModel("backup", latency=0.01)
+    generation = client(primary, backup, hedge=False, failure_threshold=1, cooldown=60)
+
+    generation.generate_content(PROMPT)
+    generation.generate_content(PROMPT)
+
+    assert primary.calls == 1
+    assert generation.stats()["circuits"]["primary"]["state"] == "open"
+
+
+def test_hedges_are_capped_by_the_hedge_ratio():
+    primary = StubGenerationModel("primary", latency=0.15)
+    backup = StubGenerationModel("backup", latency=0.01)
+    generation = client(primary, backup, default_hedge_delay=0.02, max_hedge_ratio=0.5)
+
+    for _ in range(4):
+        generation.generate_content(PROMPT)
+
+    stats = generation.stats()
+    assert stats["requests"] == 4
+    assert stats["hedges"] == 2 and stats["hedge_wins"] == 2
+
+
+def test_deadline_raises_and_counts_a_timeout():
+    generation = client(StubGenerationModel("slow", latency=0.3), timeout=0.05, max_attempts=1)
+
+    start = time.perf_counter()
+    with pytest.raises(GenerationError):
+        generation.generate_content(PROMPT)
+
+    assert time.perf_counter() - start < 0.25
+    assert generation.stats()["timeouts"] == 1
+
+
+def test_straggler_failing_after_the_deadline_counts_once():
+    # Fails after half its latency, i.e. after the deadline already counted it
+    model = StubGenerationModel("slow", latency=0.2, failure_rate=1.0)
+    generation = client(model, timeout=0.02, max_attempts=1, failure_threshold=2)
+
+    with pytest.raises(GenerationError):
+        generation.generate_content(PROMPT)
+    time.sleep(0.15)
+
+    assert generation.stats()["circuits"]["slow"]["state"] == "closed"
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from incremental import HASH_KEY, STAGING_SUFFIX, content_hash, plan_sync, sync_collection
+
+
+def embed(texts):
+    """Deterministic stand-in for the sentence encoder."""
+    return np.array([[len(text), text.count(" ") + 1, 1.0] for text in texts], dtype=np.float32)
+
+
+def test_content_hash_ignores_stored_hash():
+    metadata = {"title": "Squat"}
+    assert content_hash("squat", metadata) == content_hash("squat", {**metadata, HASH_KEY: "old"})
+    assert content_hash("squat", metadata) != content_hash("squat", {"title": "Front Squat"})
+
+
+def test_plan_sync_finds_changed_and_stale():
+    metadatas = [{HASH_KEY: "a"}, {HASH_KEY: "b2"}, {HASH_KEY: "c"}]
+    changed, stale = plan_sync(metadatas, ["1", "2", "3"], {"1": "a", "2": "b", "4": "d"})
+    assert changed == [1, 2]
+    assert stale == ["4"]
+
+
+def test_sync_reports_whether_anything_changed(tmp_path):
+    chromadb = pytest.importorskip("chromadb")
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    documents = ["barbell squat", "bench press"]
+    metadatas = [{"title": "Squat"}, {"title": "Bench"}]
+    ids = ["ex-1", "ex-2"]
+
+    collection, changed = sync_collection(client, "fitness", documents, metadatas, ids, embed_fn=embed)
+    assert changed and collection.count() == 2
+
+    _, changed = sync_collection(client, "fitness", documents, metadatas, ids, embed_fn=embed)
+    assert not changed
+
+    collection, changed = sync_collection(client, "fitness", documents[:1], metadatas[:1], ids[:1], embed_fn=embed)
+    assert changed and collection.count() == 1
+
+
+def test_rebuild_swaps_in_the_new_collection(tmp_path):
+    chromadb = pytest.importorskip("chromadb")
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    sync_collection(client, "fitness", ["barbell squat"], [{"title": "Squat"}], ["ex-1"], embed_fn=embed)
+
+    collection, changed = sync_collection(
+        client, "fitness", ["deadlift"], [{"title": "Deadlift"}], ["ex-2"], rebuild=True, embed_fn=embed
+    )
+
+    assert changed and collection.get()["ids"] == ["ex-2"]
+    assert [c.name for c in client.list_collections()] == ["fitness"]  # No staging or backup left over
+
+
+def test_failed_swap_keeps_the_live_collection(tmp_path, monkeypatch):
+    chromadb = pytest.importorskip("chromadb")
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    live, _ = sync_collection(client, "fitness", ["barbell squat"], [{"title": "Squat"}], ["ex-1"], embed_fn=embed)
+
+    collection_type, modify = type(live), type(live).modify
+
+    def failing_modify(self, name=None, **kwargs):
+        if self.name.endswith(STAGING_SUFFIX):
+            raise RuntimeError("rename failed")
+        return modify(self, name=name, **kwargs)
+
+    monkeypatch.setattr(collection_type, "modify", failing_modify)
+    with pytest.raises(RuntimeError):
+        sync_collection(client, "fitness", ["deadlift"], [{"title": "Deadlift"}], ["ex-2"], rebuild=True, embed_fn=embed)
+
+    assert client.get_collection("fitness").get()["ids"] == ["ex-1"]
@@ -0,0 +1,65 @@
+import io
+import random
+
+import pytest
+
+from ingest_knowledge import iter_chunks, iter_sentences
+
+
+def synthetic_text(seed, paragraphs=6):
+    """Paragraphs of sentences made of unique words, so every word can be traced."""
+    rng = random.Random(seed)
+    counter = iter(range(1_000_000))
+    blocks = []
+    for _ in range(paragraphs):
+        sentences = []
+        for _ in range(rng.randint(1, 12)):
+            words = [f"w{next(counter)}" + "x" * rng.randint(0, 12) for _ in range(rng.randint(1, 25))]
+            sentences.append(" ".join(words) + rng.choice(".!?"))
+        blocks.append(" ".join(sentences))
+    return "\n\n".join(blocks)
+
+
+def chunks_of(text, chunk_chars, overlap_chars, block_chars):
+    return list(iter_chunks(io.StringIO(text), chunk_chars, overlap_chars, block_chars))
+
+
+@pytest.mark.parametrize("block_chars", [7, 64, 1000, 65536])
+@pytest.mark.parametrize("chunk_chars,overlap_chars", [(200, 50), (120, 0), (80, 60), (800, 150)])
+def test_chunks_respect_size_and_keep_every_word(block_chars, chunk_chars, overlap_chars):
+    for seed in range(8):
+        text = synthetic_text(seed)
+        chunks = chunks_of(text, chunk_chars, overlap_chars, block_chars)
+
+        assert chunks
+        assert max(len(chunk) for chunk in chunks) <= chunk_chars
+
+        # Words are unique, so the input must be an in-order subsequence of the chunk words
+        remaining = iter(" ".join(chunks).split())
+        assert all(word in remaining for word in text.split())
+
+
+def test_overlap_repeats_trailing_sentences():
+    text = "One two three. Four five six. Seven eight nine. Ten eleven twelve."
+    chunks = chunks_of(text, 40, 15, 64)
+
+    # "Seven eight nine." is longer than the overlap, so it is not repeated
+    assert chunks == ["One two three. Four five six.", "Four five six. Seven eight nine.", "Ten eleven twelve."]
+
+
+def test_paragraph_break_ends_a_chunk_without_overlap():
+    chunks = chunks_of("First paragraph here.\n\nSecond paragraph here.", 200, 50, 64)
+
+    assert chunks == ["First paragraph here.", "Second paragraph here."]
+
+
+def test_long_words_are_split():
+    sentences = list(iter_sentences(io.StringIO("a" * 25 + " end."), 10))
+
+    assert [sentence for sentence, _ in sentences] == ["a" * 10, "a" * 10, "a" * 5, "end."]
+    assert sentences[-1][1]
+
+
+def test_overlap_must_be_smaller_than_chunk():
+    with pytest.raises(ValueError):
+        chunks_of("Text.", 50, 50, 64)
@@ -0,0 +1,49 @@
+from lexical_index import BM25Index, load_lexical_index, build_lexical_index, reciprocal_rank_fusion, tokenize
+
+
+DOCUMENTS = {
+    "deadlift": "Barbell Deadlift: lift the barbell from the floor",
+    "curl": "Dumbbell Curl: curl the dumbbell to the shoulder",
+    "row": "Barbell Row: pull the barbell to the waist",
+    "yogurt": "Greek yogurt, plain, nonfat",
+}
+
+
+def index():
+    return BM25Index.build(list(DOCUMENTS), list(DOCUMENTS.values()))
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("How do I do a Barbell-Deadlift?") == ["barbell", "deadlift"]
+
+
+def test_rare_terms_outweigh_common_ones():
+    hits = index().search("barbell deadlift", k=3)
+
+    assert [doc_id for doc_id, _ in hits] == ["deadlift", "row"]
+    assert hits[0][1] > hits[1][1] > 0
+
+
+def test_search_without_known_terms_returns_nothing():
+    assert index().search("the of and") == []
+    assert index().search("kettlebell") == []
+
+
+def test_k_limits_the_results():
+    assert len(index().search("barbell dumbbell", k=2)) == 2
+
+
+def test_saved_index_gives_the_same_results(tmp_path):
+    built = build_lexical_index(tmp_path, "fitness_knowledge", list(DOCUMENTS), list(DOCUMENTS.values()))
+    loaded = load_lexical_index(tmp_path, "fitness_knowledge")
+
+    assert len(loaded) == len(built) == 4
+    assert loaded.search("greek yogurt") == built.search("greek yogurt")
+    assert load_lexical_index(tmp_path, "missing") is None
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "d"]])
+
+    assert fused[:3] == ["b", "c", "a"]
+    assert set(fused) == {"a", "b", "c", "d"}
@@ -0,0 +1,70 @@
+import pytest
+
+import metrics
+from metrics import Histogram
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """An empty metrics registry, recording enabled."""
+    monkeypatch.setattr(metrics, "_registry", {})
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    return metrics._registry
+
+
+def test_buckets_are_cumulative_with_inclusive_upper_bounds():
+    hist = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        hist.observe(value, stage="search")
+
+    assert hist.export() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{stage="search",le="0.1"} 2',
+        'latency_seconds_bucket{stage="search",le="1"} 3',
+        'latency_seconds_bucket{stage="search",le="+Inf"} 4',
+        'latency_seconds_sum{stage="search"} 3.650000',
+        'latency_seconds_count{stage="search"} 4',
+    ]
+
+
+def test_label_sets_are_separate_series_in_sorted_order():
+    hist = Histogram("latency_seconds", "Latency.", buckets=(1.0,))
+    hist.observe(0.5, stage="search", collection="nutrition")
+    hist.observe(0.5, stage="search", collection="fitness")
+
+    counts = [line for line in hist.export() if line.startswith("latency_seconds_count")]
+    assert counts == [
+        'latency_seconds_count{collection="fitness",stage="search"} 1',
+        'latency_seconds_count{collection="nutrition",stage="search"} 1',
+    ]
+
+
+def test_label_values_are_escaped():
+    hist = Histogram("latency_seconds", "Latency.", buckets=(1.0,))
+    hist.observe(0.5, model='say "hi"\\\n')
+
+    assert 'latency_seconds_count{model="say \\"hi\\"\\\\\\n"} 1' in hist.export()
+
+
+def test_span_records_errors_with_an_error_outcome(registry):
+    with metrics.span("generation", model="stub"):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.span("generation", model="stub"):
+            raise RuntimeError("boom")
+
+    exported = metrics.export_prometheus()
+    assert 'fitgenie_stage_duration_seconds_count{model="stub",stage="generation"} 1' in exported
+    assert 'fitgenie_stage_duration_seconds_count{model="stub",outcome="error",stage="generation"} 1' in exported
+
+
+def test_disabled_metrics_record_nothing(registry, monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+
+    assert metrics.span("generation") is metrics._NO_SPAN
+    with metrics.span("generation"):
+        pass
+    metrics.observe("ttft", 0.2)
+
+    assert metrics.export_prometheus() == ""
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from nutrient_store import NutrientStore, parse_quantity
+
+
+def food(doc_id, name, serving, calories, protein, sugars):
+    return {"doc_id": doc_id, "metadata": {
+        "name": name, "serving_size": serving, "calories": calories,
+        "protein": protein, "sugars": sugars, "source_file": "nutrition.csv",
+    }}
+
+
+ITEMS = [
+    food("n-0", "Chicken breast", "100 g", 165, "31 g", "0 g"),
+    food("n-1", "Banana", "100 g", 89, "1.1 g", "12 g"),
+    food("n-2", "Almonds", "50 g", 290, "10.5 g", "2.2 g"),   # Scaled to 100 g
+    food("n-3", "Egg white", "100 g", 52, "10900 mg", ""),    # mg converted to g, sugar missing
+]
+
+
+def store():
+    return NutrientStore.build(ITEMS)
+
+
+def names(store, rows):
+    return [str(store.names[row]) for row in rows]
+
+
+def test_parse_quantity():
+    assert parse_quantity("12.5 mg") == (12.5, "mg")
+    assert parse_quantity("84") == (84.0, "")
+    assert parse_quantity("2 µg") == (2.0, "mcg")
+    assert parse_quantity("about 3 g") is None
+
+
+def test_values_are_per_100_g_in_the_common_unit():
+    table = store()
+
+    assert set(table.columns) == {"calories_kcal", "protein_g", "sugars_g"}
+    assert table.values[table.column("calories_kcal"), 2] == pytest.approx(580)
+    assert table.values[table.column("protein_g"), 3] == pytest.approx(10.9)
+    assert np.isnan(table.values[table.column("sugars_g"), 3])
+
+
+def test_range_filters():
+    table = store()
+
+    assert names(table, table.filter([("calories_kcal", "$lt", 100)])) == ["Banana", "Egg white"]
+    assert names(table, table.filter([("protein_g", "$gte", 10), ("calories_kcal", "$lte", 165)])) == [
+        "Chicken breast", "Egg white",
+    ]
+    assert names(table, table.filter([("sugars_g", "$gt", 0)])) == ["Banana", "Almonds"]
+    assert len(table.filter([("unknown_column", "$lt", 1)])) == len(table)
+
+
+def test_rankings_skip_missing_values():
+    table = store()
+
+    assert names(table, table.search(ranking=("protein_g", None, True), n=2)) == ["Chicken breast", "Almonds"]
+    assert names(table, table.search(ranking=("sugars_g", None, False))) == ["Chicken breast", "Almonds", "Banana"]
+    assert names(table, table.search(ranking=("protein_g", "calories_kcal", True), n=1)) == ["Egg white"]
+
+
+def test_unknown_column_and_operator_are_errors():
+    with pytest.raises(KeyError):
+        store().column("iron_mg")
+    with pytest.raises(ValueError):
+        store().range("protein_g", "$eq", 1)
+
+
+def test_save_load_round_trip(tmp_path):
+    path = tmp_path / "nutrient_store.npz"
+    store().save(path)
+    loaded = NutrientStore.load(path)
+
+    assert names(loaded, loaded.search([("calories_kcal", "$lt", 100)])) == ["Banana", "Egg white"]
+    assert loaded.row_metadata(0) == {"name": "Chicken breast", "doc_id": "n-0", "calories": "165",
+                                      "protein": "31 g", "sugars": "0 g"}
+    assert "Protein per kcal: 0.21 g" in loaded.describe_row(3, key="protein_g", per="calories_kcal")
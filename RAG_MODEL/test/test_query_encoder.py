@@ -0,0 +1,96 @@
+import threading
+
+import numpy as np
+import pytest
+
+import query_encoder
+from query_encoder import QueryEncoder
+
+
+class FakeModel:
+    """Encodes a text as a one-hot vector of its length; blocks until released."""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = fail
+
+    def encode(self, texts, **kwargs):
+        self.started.set()
+        self.release.wait(5)
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        vectors = np.zeros((len(texts), 16), dtype=np.float32)
+        vectors[np.arange(len(texts)), [len(text) for text in texts]] = 1.0
+        return vectors
+
+
+@pytest.fixture
+def model(monkeypatch):
+    fake = FakeModel()
+    monkeypatch.setattr(query_encoder, "load_encoder", lambda *args, **kwargs: fake)
+    return fake
+
+
+def test_questions_waiting_behind_a_batch_share_the_next_one(model):
+    encoder = QueryEncoder("fake", max_batch=8, max_wait_ms=1, cache=False)
+    first = encoder.submit("a")
+    assert model.started.wait(5)  # "a" is being encoded and blocks the model
+
+    texts = ["bb", "ccc", "dddd", "bb"]
+    futures = [encoder.submit(text) for text in texts]
+    model.release.set()
+
+    assert first.result(5).argmax() == 1
+    assert [future.result(5).argmax() for future in futures] == [2, 3, 4, 2]
+    assert model.batches == [["a"], ["bb", "ccc", "dddd"]]  # Duplicates are encoded once
+
+    stats = encoder.stats()
+    assert stats["requests"] == 5 and stats["batches"] == 2 and stats["encoded"] == 4
+    assert stats["largest_batch"] == 3 and stats["mean_batch"] == 2.0
+    encoder.close()
+
+
+def test_batches_are_capped_at_max_batch(model):
+    encoder = QueryEncoder("fake", max_batch=2, max_wait_ms=1, cache=False)
+    encoder.submit("a")
+    assert model.started.wait(5)
+
+    futures = [encoder.submit("x" * size) for size in range(2, 7)]
+    model.release.set()
+    for future in futures:
+        future.result(5)
+
+    assert [len(batch) for batch in model.batches] == [1, 2, 2, 1]
+    encoder.close()
+
+
+def test_a_failed_batch_fails_its_callers_only(model):
+    model.fail = True
+    model.release.set()
+    encoder = QueryEncoder("fake", max_wait_ms=0, cache=False)
+
+    with pytest.raises(RuntimeError):
+        encoder.encode("a", timeout=5)
+    assert encoder.stats()["errors"] == 1
+
+    model.fail = False
+    assert encoder.encode("bb", timeout=5).argmax() == 2
+    encoder.close()
+
+
+def test_cached_questions_skip_the_queue(model, tmp_path):
+    from embedding_cache import EmbeddingCache
+
+    model.release.set()
+    cache = EmbeddingCache(tmp_path / "cache.sqlite")
+    encoder = QueryEncoder("fake", max_wait_ms=0, cache=cache, backend="onnx-int8")
+
+    assert encoder.encode("ccc", timeout=5).argmax() == 3
+    assert encoder.encode("ccc", timeout=5).argmax() == 3
+    assert encoder.stats()["cache_hits"] == 1
+    assert model.batches == [["ccc"]]
+    assert encoder.cache_key == "fake@onnx-int8"
+    encoder.close()
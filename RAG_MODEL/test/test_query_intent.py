@@ -0,0 +1,77 @@
+from query_intent import build_ranges, build_vocabulary, numeric_nutrients, parse_amount, parse_query_intent
+
+
+VOCABULARIES = {
+    "body_part": ["Quadriceps", "Hamstrings", "Glutes", "Calves", "Chest", "Lower Back", "Lats", "Abdominals"],
+    "equipment": ["Dumbbell", "Barbell", "Body Only", "Kettlebells", "Other"],
+    "level": ["Beginner", "Intermediate", "Expert"],
+    "type": ["Strength", "Stretching", "Plyometrics"],
+}
+
+
+def test_facets_and_synonyms_become_a_where_clause():
+    intent = parse_query_intent("Beginner leg workout with dumbbells", VOCABULARIES)
+
+    assert intent.categorical == {
+        "body_part": ["Calves", "Glutes", "Hamstrings", "Quadriceps"],
+        "equipment": ["Dumbbell"],
+        "level": ["Beginner"],
+    }
+    assert intent.categorical_where() == {"$and": [
+        {"body_part": {"$in": ["Calves", "Glutes", "Hamstrings", "Quadriceps"]}},
+        {"equipment": "Dumbbell"},
+        {"level": "Beginner"},
+    ]}
+
+
+def test_longer_terms_win_over_their_parts():
+    intent = parse_query_intent("stretches for the lower back", VOCABULARIES)
+
+    assert intent.categorical == {"body_part": ["Lower Back"], "type": ["Stretching"]}
+
+
+def test_synonyms_outside_the_vocabulary_and_generic_values_are_ignored():
+    intent = parse_query_intent("arm exercises with other gear", VOCABULARIES)
+
+    assert not intent
+    assert intent.categorical_where() is None
+
+
+def test_nutrient_limits():
+    intent = parse_query_intent("snacks under 200 kcal with at least 20 g of protein", {})
+
+    assert intent.limits == [("calories_kcal", "$lt", 200.0), ("protein_g", "$gte", 20.0)]
+    assert intent.range_where() == {"$and": [{"calories_kcal": {"$lt": 200.0}}, {"protein_g": {"$gte": 20.0}}]}
+    assert intent.describe() == "calories_kcal lt 200, protein_g gte 20"
+
+
+def test_milligram_limit_on_a_gram_nutrient_is_dropped():
+    assert parse_query_intent("less than 500 mg sugar", {}).limits == []
+
+
+def test_rankings():
+    assert parse_query_intent("highest protein foods", {}).ranking == ("protein_g", None, True)
+    assert parse_query_intent("lowest sugar cereal", {}).ranking == ("sugars_g", None, False)
+    assert parse_query_intent("best protein per calorie", {}).ranking == ("protein_g", "calories_kcal", True)
+    assert parse_query_intent("high protein, least calories", {}).ranking == ("protein_g", "calories_kcal", True)
+    assert parse_query_intent("low calorie snacks", {}).ranking is None
+
+
+def test_signature_changes_with_the_filters():
+    plain = parse_query_intent("chest exercises", VOCABULARIES)
+    filtered = parse_query_intent("chest exercises with a barbell", VOCABULARIES)
+
+    assert plain.signature() != filtered.signature()
+    assert parse_query_intent("hello", VOCABULARIES).signature() is None
+
+
+def test_amount_and_metadata_helpers():
+    assert parse_amount("12.5 g") == 12.5
+    assert parse_amount("n/a") is None
+    assert numeric_nutrients({"calories": 84, "protein": "10.2 g", "sugars": ""}) == {
+        "calories_kcal": 84.0, "protein_g": 10.2,
+    }
+
+    metadatas = [{"level": "Beginner", "rating": 3}, {"level": "unknown", "rating": 9.5}, {"level": "Beginner"}]
+    assert build_vocabulary(metadatas, ["level"]) == {"level": {"Beginner": 2}}
+    assert build_ranges(metadatas, ["rating"]) == {"rating": [3, 9.5]}
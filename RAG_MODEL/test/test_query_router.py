@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from query_intent import QueryIntent
+from query_router import FITNESS_COLLECTION, NUTRITION_COLLECTION, QueryRouter
+
+
+FITNESS_MEAN = [1.0, 0.2, 0.0]
+NUTRITION_MEAN = [0.2, 1.0, 0.0]
+
+
+def centroids(nutrition_model="model"):
+    return {
+        FITNESS_COLLECTION: {"embedding_model": "model", "mean": FITNESS_MEAN},
+        NUTRITION_COLLECTION: {"embedding_model": nutrition_model, "mean": NUTRITION_MEAN},
+    }
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_no_signal_searches_both():
+    route = QueryRouter().route("tell me something", k=5)
+
+    assert route.ks == (5, 5)
+    assert route.searches == 2
+
+
+def test_keywords_pick_a_single_collection():
+    router = QueryRouter()
+
+    assert router.route("best squat workout for strength", k=5).ks == (5, 0)
+    assert router.route("healthy breakfast foods with protein", k=5).ks == (0, 5)
+
+
+def test_words_from_both_sides_search_both():
+    route = QueryRouter().route("what to eat after a leg workout", k=5)
+
+    assert route.searches == 2
+    assert sum(route.ks) == 10
+
+
+def test_parsed_facets_count_as_evidence():
+    router = QueryRouter()
+    intent = QueryIntent(limits=[("calories_kcal", "$lt", 200.0)], ranking=("protein_g", None, True))
+
+    assert router.keyword_evidence("something", intent) == (0, 3)
+    assert router.keyword_evidence("something", QueryIntent({"body_part": ["Chest"], "level": ["Beginner"]})) == (1, 0)
+
+
+def test_centroid_margin_is_calibrated_to_the_collection_means():
+    router = QueryRouter(centroids())
+
+    assert router.centroid_margin(FITNESS_MEAN) == pytest.approx(1.0)
+    assert router.centroid_margin(NUTRITION_MEAN) == pytest.approx(-1.0)
+    assert router.route("what is good?", unit(FITNESS_MEAN), k=5).ks == (5, 0)
+    assert router.route("what is good?", unit(NUTRITION_MEAN), k=5).ks == (0, 5)
+
+
+def test_unsure_routes_split_the_results():
+    route = QueryRouter(centroids()).route("what is good?", unit([1.0, 1.0, 0.0]), k=5)
+
+    assert route.searches == 2
+    assert sum(route.ks) == 10
+    assert min(route.ks) >= 2
+
+
+def test_centroids_from_different_models_are_ignored():
+    router = QueryRouter(centroids(nutrition_model="other"))
+
+    assert router.centroid_margin(FITNESS_MEAN) is None
+    assert router.route("what is good?", unit(FITNESS_MEAN), k=5).ks == (5, 5)
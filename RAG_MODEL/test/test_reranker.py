@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+import reranker
+from reranker import Reranker
+
+
+HITS = [("Barbell Row", {"id": 1}), ("Dumbbell Curl", {"id": 2}), ("Greek yogurt", {"id": 3})]
+
+
+class FakeCrossEncoder:
+    """Scores a pair by whether the question mentions the document's first word; blocks until released."""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def predict(self, pairs, batch_size=None):
+        self.started.set()
+        self.release.wait(5)
+        self.calls.append([document for _, document in pairs])
+        return [float(document.split()[0].lower() in query.lower()) for query, document in pairs]
+
+
+@pytest.fixture
+def model(monkeypatch):
+    fake = FakeCrossEncoder()
+    monkeypatch.setattr(reranker, "load_cross_encoder", lambda *args, **kwargs: fake)
+    return fake
+
+
+def test_rerank_orders_by_score_and_caches(model):
+    model.release.set()
+    ranker = Reranker(budget_ms=5000)
+
+    hits, reranked = ranker.rerank("greek yogurt or a dumbbell?", HITS, top_n=2)
+    assert reranked
+    assert [document for document, _ in hits] == ["Dumbbell Curl", "Greek yogurt"]
+
+    assert ranker.rerank("Greek yogurt or a dumbbell", HITS, top_n=2) == (hits, True)
+    assert len(model.calls) == 1
+    assert ranker.stats()["pairs_cached"] == 3
+
+
+def test_over_budget_requests_do_not_pile_up(model):
+    ranker = Reranker(budget_ms=5000)
+    results = {}
+
+    # First request occupies the rerank thread
+    first = threading.Thread(target=lambda: results.setdefault("first", ranker.rerank("row", HITS, 3)))
+    first.start()
+    assert model.started.wait(5)
+
+    # Second waits for the thread; a third meanwhile is not queued behind it
+    second = threading.Thread(target=lambda: results.setdefault("second", ranker.rerank("curl", HITS, 3)))
+    second.start()
+    deadline = time.monotonic() + 5
+    while not ranker._queued and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert ranker.rerank("yogurt", HITS, 3) == (HITS, False)
+    assert ranker.stats()["busy"] == 1
+
+    model.release.set()
+    first.join(5)
+    second.join(5)
+    assert results["first"][1] and results["second"][1]
+    assert len(model.calls) == 2
+
+
+def test_unstarted_prediction_is_cancelled_on_timeout(model):
+    ranker = Reranker(budget_ms=5000)
+    first = threading.Thread(target=lambda: ranker.rerank("row", HITS, 3))
+    first.start()
+    assert model.started.wait(5)
+
+    assert ranker.rerank("curl", HITS, 3, budget_ms=10) == (HITS, False)
+    stats = ranker.stats()
+    assert stats["cancelled"] == 1 and stats["fallbacks"] == 1
+    assert ranker._queued == 0
+
+    model.release.set()
+    first.join(5)
+    assert len(model.calls) == 1  # The cancelled batch never reached the model
@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+
+from response_cache import ResponseCache, normalize_query
+
+
+def unit(*components):
+    vector = np.array(components, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class Version:
+    """Stands in for read_ingest_stamp(): bump() is a re-ingestion."""
+
+    def __init__(self):
+        self.value = 1
+
+    def __call__(self):
+        return self.value
+
+    def bump(self):
+        self.value += 1
+
+
+def test_normalize_query_folds_case_punctuation_and_spacing():
+    assert normalize_query("  Best   CHEST exercise?! ") == "best chest exercise"
+
+
+def test_exact_tier_matches_normalized_question():
+    cache = ResponseCache()
+    cache.put("Best chest exercise?", "Push-ups")
+
+    assert cache.get("best chest exercise") == "Push-ups"
+    assert cache.get("best leg exercise") is None
+    assert cache.stats()["hits_exact"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_semantic_tier_matches_close_embeddings_only():
+    cache = ResponseCache(similarity_threshold=0.9)
+    cache.put("best chest exercise", "Push-ups", unit(1, 0, 0))
+
+    assert cache.get("top exercise for the chest", unit(1, 0.1, 0)) == "Push-ups"
+    assert cache.get("best leg exercise", unit(0, 1, 0)) is None
+    stats = cache.stats()
+    assert (stats["hits_semantic"], stats["misses"]) == (1, 1)
+
+
+def test_semantic_tier_only_answers_within_the_same_scope():
+    cache = ResponseCache(similarity_threshold=0.9)
+    cache.put("beginner leg workout", "Squats", unit(1, 0, 0), scope=("level", "Beginner"))
+
+    assert cache.get("expert leg workout", unit(1, 0, 0), scope=("level", "Expert")) is None
+    assert cache.get("easy leg workout", unit(1, 0, 0), scope=("level", "Beginner")) == "Squats"
+
+
+def test_entries_expire_after_the_ttl():
+    cache = ResponseCache(ttl_seconds=0.05)
+    cache.put("best chest exercise", "Push-ups", unit(1, 0, 0))
+    time.sleep(0.06)
+
+    assert cache.get("best chest exercise", unit(1, 0, 0)) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("squat", "a")
+    cache.put("bench press", "b")
+    cache.get("squat")  # "bench press" is now the least recently used
+    cache.put("deadlift", "c")
+
+    assert cache.get("bench press") is None
+    assert cache.get("squat") == "a" and cache.get("deadlift") == "c"
+
+
+def test_reingestion_invalidates_both_tiers():
+    version = Version()
+    cache = ResponseCache(similarity_threshold=0.9, version_fn=version)
+    cache.put("best chest exercise", "Push-ups", unit(1, 0, 0))
+    version.bump()
+
+    assert cache.get_semantic(unit(1, 0, 0)) is None
+    cache.put("best leg exercise", "Squats")
+    version.bump()
+    assert cache.get_exact("best leg exercise") is None
+
+    cache.put("best chest exercise", "Dips", unit(1, 0, 0))
+    assert cache.get("best chest exercise") == "Dips"
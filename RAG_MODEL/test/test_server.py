@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import gc
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+import server
+
+
+def parse(raw):
+    async def scenario():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await server.read_request(reader)
+    return asyncio.run(scenario())
+
+
+def test_read_request_parses_body():
+    body = b'{"query": "squat"}'
+    method, path, version, headers, parsed = parse(
+        b"POST /ask?x=1 HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)
+    )
+    assert (method, path, version, parsed) == ("POST", "/ask", "HTTP/1.1", body)
+    assert headers["content-length"] == str(len(body))
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-5", b"1.5"])
+def test_read_request_rejects_invalid_content_length(length):
+    with pytest.raises(server.HttpError) as error:
+        parse(b"POST /ask HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n{}")
+    assert error.value.status == 400
+
+
+def test_read_request_rejects_large_body():
+    with pytest.raises(server.HttpError) as error:
+        parse(b"POST /ask HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (server.MAX_BODY_BYTES + 1))
+    assert error.value.status == 413
+
+
+def test_stream_timeout_keeps_slot_until_generation_returns(monkeypatch):
+    release = threading.Event()
+    closed = threading.Event()
+
+    def slow_stream(*args, **kwargs):
+        try:
+            yield "first"
+            release.wait(5)
+            yield "second"
+        finally:
+            closed.set()
+
+    monkeypatch.setattr(server.app, "stream_rag_response", slow_stream)
+
+    async def scenario():
+        service = server.RagService(None, None, None, max_inflight=1, max_queue=0, timeout=0.2)
+        chunks = service.stream("squat", 5)
+        assert await chunks.__anext__() == "first"
+        with pytest.raises(asyncio.TimeoutError):
+            await chunks.__anext__()
+
+        # The pool thread is still blocked in next(): the slot must stay taken
+        assert service.inflight == 1
+        release.set()
+        for _ in range(200):
+            if service.inflight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert service.inflight == 0
+        assert closed.is_set()
+
+    asyncio.run(scenario())
+
+
+def test_stream_frees_slot_after_last_chunk(monkeypatch):
+    monkeypatch.setattr(server.app, "stream_rag_response", lambda *args, **kwargs: (chunk for chunk in ["a", "b"]))
+
+    async def scenario():
+        service = server.RagService(None, None, None, max_inflight=1, timeout=5)
+        assert [chunk async for chunk in service.stream("squat", 5)] == ["a", "b"]
+        await asyncio.sleep(0.05)
+        assert (service.inflight, service.completed) == (0, 1)
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def prefork(monkeypatch):
+    """serve_workers() with the shared state stubbed out; returns the list of forked pids."""
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGINT)}
+    monkeypatch.setattr(server, "open_shared_state", lambda args: (None, None))
+    monkeypatch.setattr(server.app, "VECTOR_BACKEND", "flat")
+    monkeypatch.setattr(server, "RESTART_DELAY", 0.0)
+    forked, fork = [], os.fork
+
+    def counting_fork():
+        pid = fork()
+        if pid:
+            forked.append(pid)
+        return pid
+
+    monkeypatch.setattr(os, "fork", counting_fork)
+    yield forked
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+    gc.unfreeze()
+
+
+def worker_args(workers):
+    return argparse.Namespace(host="127.0.0.1", port=0, workers=workers, stub_llm=True,
+                              max_inflight=1, max_queue=1, timeout=1.0)
+
+
+def test_worker_failing_at_startup_stops_the_server(prefork, monkeypatch):
+    def failing_worker(args, sock, collections, ready=None):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        raise SystemExit(1)
+
+    monkeypatch.setattr(server, "run_worker", failing_worker)
+    with pytest.raises(SystemExit) as error:
+        server.serve_workers(worker_args(2))
+
+    assert error.value.code == 1
+    assert len(prefork) == 2  # Nothing was restarted
+
+
+def test_worker_exiting_after_ready_is_restarted(prefork, monkeypatch, tmp_path):
+    marker = tmp_path / "restarted"
+
+    def worker(args, sock, collections, ready=None):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        ready()
+        if not marker.exists():
+            marker.touch()
+            return  # Exits after startup: replaced by the parent
+        os.kill(os.getppid(), signal.SIGTERM)  # The replacement stops the server
+        time.sleep(10)
+
+    monkeypatch.setattr(server, "run_worker", worker)
+    server.serve_workers(worker_args(1))
+
+    assert len(prefork) == 2
+
+
+def test_workers_default_to_the_flat_backend(monkeypatch):
+    monkeypatch.delenv("FITGENIE_VECTOR_BACKEND", raising=False)
+    monkeypatch.setattr(server.app, "VECTOR_BACKEND", "chroma")
+    server.use_flat_backend()
+    assert server.app.VECTOR_BACKEND == "flat"
+
+    monkeypatch.setenv("FITGENIE_VECTOR_BACKEND", "chroma")
+    monkeypatch.setattr(server.app, "VECTOR_BACKEND", "chroma")
+    with pytest.raises(SystemExit):
+        server.use_flat_backend()
+
+
+def test_model_is_probed_in_a_child_process(monkeypatch, tmp_path):
+    probed_in = tmp_path / "pid"
+
+    def resolve_generation_model():
+        probed_in.write_text(str(os.getpid()))
+        return object()
+
+    monkeypatch.setattr(server.app, "load_model_choice", lambda: None)
+    monkeypatch.setattr(server.app, "resolve_generation_model", resolve_generation_model)
+    assert server.resolve_model_choice()
+    assert int(probed_in.read_text()) != os.getpid()
+
+    monkeypatch.setattr(server.app, "resolve_generation_model", lambda: None)
+    assert not server.resolve_model_choice()
+
+    monkeypatch.setattr(server.app, "load_model_choice", lambda: "gemini-2.5-flash")
+    monkeypatch.setattr(server.app, "resolve_generation_model", lambda: pytest.fail("probed with a persisted choice"))
+    assert server.resolve_model_choice()